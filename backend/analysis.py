@@ -0,0 +1,466 @@
+"""
+Pattern analysis primitives shared by the API and the scan worker processes:
+normalisation/similarity, best matching window search, dip/tepe detection and
+the per-symbol scan kernels (one call per symbol; results are plain dicts so
+they cross process boundaries cheaply).
+"""
+import logging
+from typing import List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+import kernels
+from metrics import timed_phase
+
+
+logger = logging.getLogger(__name__)
+
+
+class PeakTroughPoint(BaseModel):
+    point_type: str  # "dip" or "tepe"
+    point_number: int
+    date: str
+    price: float
+    percentage_change: Optional[float] = None
+
+class PatternCriteria(BaseModel):
+    """Her dip/tepe noktası için özelleştirilebilir kriterler"""
+    # 1. Dip -> 1. Tepe yükseliş
+    rise_1_min: float = 100
+    rise_1_max: float = 160
+    # 1. Tepe -> 2. Dip düşüş
+    drop_1_min: float = 40
+    drop_1_max: float = 60
+    # 2. Dip -> 2. Tepe yükseliş (1. tepeyi geçmeli)
+    rise_2_min: float = 20
+    rise_2_max: float = 50
+    # 2. Tepe -> 3. Dip düşüş
+    drop_2_min: float = 20
+    drop_2_max: float = 30
+    # 3. Dip -> 3. Tepe yükseliş (2. tepeyi geçmeli)
+    rise_3_min: float = 15
+    rise_3_max: float = 40
+    # 3. Tepe -> 4. Dip düşüş
+    drop_3_min: float = 15
+    drop_3_max: float = 30
+    # 4. Dip -> 4. Tepe yükseliş
+    rise_4_min: float = 10
+    rise_4_max: float = 30
+    # 4. Tepe -> 5. Dip düşüş
+    drop_4_min: float = 10
+    drop_4_max: float = 25
+    # 5. Dip -> 5. Tepe yükseliş
+    rise_5_min: float = 5
+    rise_5_max: float = 20
+    # 5. Tepe -> 6. Dip düşüş
+    drop_5_min: float = 10
+    drop_5_max: float = 40
+
+
+
+@timed_phase("normalize")
+def normalize_prices(prices: np.ndarray) -> np.ndarray:
+    """Normalize prices to 0-1 range (same arithmetic as sklearn's MinMaxScaler)"""
+    if len(prices) == 0:
+        return prices
+    prices = np.asarray(prices, dtype=np.float64)
+    low = np.nanmin(prices)
+    span = np.nanmax(prices) - low
+    # Flat series: scale 1, i.e. all zeros
+    scale = 1.0 / span if span >= 10 * np.finfo(np.float64).eps else 1.0
+    return prices * scale - low * scale
+
+
+def euclidean(u: np.ndarray, v: np.ndarray) -> float:
+    diff = u - v
+    return float(np.sqrt(np.dot(diff, diff)))
+
+
+def pearson_correlation(x: np.ndarray, y: np.ndarray) -> float:
+    """Pearson r as scipy.stats.pearsonr computes it; 0.0 for constant or too short input"""
+    if len(x) < 2 or len(x) != len(y):
+        return 0.0
+    xm = x - x.mean()
+    ym = y - y.mean()
+    norm_x = np.sqrt(np.dot(xm, xm))
+    norm_y = np.sqrt(np.dot(ym, ym))
+    if norm_x == 0 or norm_y == 0:
+        return 0.0
+    r = float(np.dot(xm / norm_x, ym / norm_y))
+    if np.isnan(r):
+        return 0.0
+    return max(-1.0, min(1.0, r))
+
+
+@timed_phase("score")
+def calculate_similarity(prices1: np.ndarray, prices2: np.ndarray) -> tuple:
+    """Calculate similarity between two price series"""
+    if len(prices1) == 0 or len(prices2) == 0:
+        return 0.0, 0.0
+    
+    # Normalize both series
+    norm1 = normalize_prices(prices1)
+    norm2 = normalize_prices(prices2)
+    
+    # Resample to same length if needed
+    if len(norm1) != len(norm2):
+        min_len = min(len(norm1), len(norm2))
+        indices1 = np.linspace(0, len(norm1)-1, min_len).astype(int)
+        indices2 = np.linspace(0, len(norm2)-1, min_len).astype(int)
+        norm1 = norm1[indices1]
+        norm2 = norm2[indices2]
+    
+    # Calculate Euclidean distance (lower is more similar)
+    distance = euclidean(norm1, norm2)
+    # Convert to similarity (0-1 scale)
+    max_distance = np.sqrt(len(norm1))  # Max possible distance for normalized data
+    similarity = max(0, 1 - (distance / max_distance))
+    
+    # Calculate correlation
+    correlation = pearson_correlation(norm1, norm2)
+    
+    return similarity, correlation
+
+
+
+@timed_phase("score")
+def find_best_matching_window(ref_prices: np.ndarray, target_prices: np.ndarray, target_dates: list) -> dict:
+    """
+    Sliding window ile hedef hissenin tüm geçmişinde referans kalıba en benzer dönemi bul.
+    
+    ref_prices: Referans kalıbın fiyatları
+    target_prices: Hedef hissenin TÜM geçmiş fiyatları
+    target_dates: Hedef hissenin tarihleri
+    
+    Returns: {
+        'similarity': float,
+        'correlation': float,
+        'start_idx': int,
+        'end_idx': int,
+        'start_date': str,
+        'end_date': str,
+        'prices': np.ndarray,
+        'after_1m_change': float or None,
+        'after_3m_change': float or None
+    }
+    """
+    if len(ref_prices) < 10 or len(target_prices) < len(ref_prices):
+        return None
+    
+    window_size = len(ref_prices)
+
+    # Normalize reference pattern once
+    ref_norm = normalize_prices(ref_prices)
+
+    # Slide window across target history (kernels.best_window)
+    # Step size: her 5 günde bir kontrol et (performans için)
+    step_size = max(1, window_size // 10)
+    start_idx = kernels.backend().best_window(ref_norm, np.asarray(target_prices, dtype=np.float64), step_size)
+    if start_idx < 0:
+        return None
+
+    end_idx = start_idx + window_size
+    window_prices = target_prices[start_idx:end_idx]
+    window_norm = normalize_prices(window_prices)
+    distance = euclidean(ref_norm, window_norm)
+    similarity = max(0, 1 - (distance / np.sqrt(len(ref_norm))))
+    correlation = pearson_correlation(ref_norm, window_norm)
+
+    # Kalıptan sonraki performansı hesapla
+    after_1m_change = None
+    after_3m_change = None
+    pattern_end_price = window_prices[-1]
+
+    # 1 ay sonra (~22 işlem günü)
+    after_1m_idx = end_idx + 22
+    if after_1m_idx < len(target_prices):
+        after_1m_price = target_prices[after_1m_idx]
+        after_1m_change = round((after_1m_price - pattern_end_price) / pattern_end_price * 100, 2)
+
+    # 3 ay sonra (~66 işlem günü)
+    after_3m_idx = end_idx + 66
+    if after_3m_idx < len(target_prices):
+        after_3m_price = target_prices[after_3m_idx]
+        after_3m_change = round((after_3m_price - pattern_end_price) / pattern_end_price * 100, 2)
+
+    return {
+        'similarity': similarity,
+        'correlation': correlation,
+        'start_idx': start_idx,
+        'end_idx': end_idx,
+        'start_date': target_dates[start_idx] if start_idx < len(target_dates) else '',
+        'end_date': target_dates[end_idx - 1] if end_idx - 1 < len(target_dates) else '',
+        'prices': window_prices,
+        'after_1m_change': after_1m_change,
+        'after_3m_change': after_3m_change,
+        'pattern_end_price': round(pattern_end_price, 2)
+    }
+
+
+
+@timed_phase("score")
+def calculate_partial_similarity(ref_prices: np.ndarray, target_prices: np.ndarray, start_percent: float = 30) -> tuple:
+    """
+    Kalıbın başlangıç kısmını karşılaştır - devam eden kalıpları bulmak için.
+    ref_prices: Referans hissenin tam kalıbı
+    target_prices: Karşılaştırılacak hissenin mevcut fiyatları
+    start_percent: Referans kalıbın ilk yüzde kaçı karşılaştırılacak
+    """
+    if len(ref_prices) < 10 or len(target_prices) < 10:
+        return 0.0, 0.0, 0.0
+    
+    # Referans kalıbın başlangıç kısmını al
+    ref_start_len = max(10, int(len(ref_prices) * start_percent / 100))
+    ref_start = ref_prices[:ref_start_len]
+    
+    # Target'ın son kısmını al (mevcut durumu)
+    target_recent = target_prices[-ref_start_len:] if len(target_prices) >= ref_start_len else target_prices
+    
+    # Normalize
+    ref_norm = normalize_prices(ref_start)
+    target_norm = normalize_prices(target_recent)
+    
+    # Aynı uzunluğa getir
+    min_len = min(len(ref_norm), len(target_norm))
+    if min_len < 5:
+        return 0.0, 0.0, 0.0
+    
+    indices1 = np.linspace(0, len(ref_norm)-1, min_len).astype(int)
+    indices2 = np.linspace(0, len(target_norm)-1, min_len).astype(int)
+    ref_norm = ref_norm[indices1]
+    target_norm = target_norm[indices2]
+    
+    # Benzerlik hesapla
+    distance = euclidean(ref_norm, target_norm)
+    max_distance = np.sqrt(len(ref_norm))
+    similarity = max(0, 1 - (distance / max_distance))
+    
+    # Korelasyon
+    correlation = pearson_correlation(ref_norm, target_norm)
+    
+    # Kalıp ilerleme yüzdesi (target ne kadarını tamamlamış)
+    pattern_progress = (len(target_recent) / len(ref_prices)) * 100
+    
+    return similarity, correlation, pattern_progress
+
+
+# Dip/tepe adayları: +-5 bar içindeki yerel min/max
+PIVOT_WINDOW = 5
+
+
+def _pivot_points(prices: np.ndarray, dates: List[str], found) -> List[PeakTroughPoint]:
+    """(index, is_tepe, number, percentage) arrays from the kernels -> points"""
+    idx, tepe, number, pct = found
+    return [
+        PeakTroughPoint(
+            point_type="tepe" if tepe[k] else "dip",
+            point_number=int(number[k]),
+            date=dates[idx[k]],
+            price=round(prices[idx[k]], 2),
+            percentage_change=None if np.isnan(pct[k]) else round(pct[k], 2),
+        )
+        for k in range(len(idx))
+    ]
+
+
+@timed_phase("pivots")
+def find_peaks_troughs(prices: np.ndarray, dates: List[str]) -> List[PeakTroughPoint]:
+    """
+    Find peaks and troughs based on the specified criteria:
+    - 1st dip: Starting point before 100% rise
+    - 1st peak: 100-160% rise from 1st dip, followed by 40-60% drop
+    - 2nd dip: After 40-60% drop from 1st peak
+    - 2nd peak: Exceeds 1st peak, then drops 20-30%
+    - And so on...
+    """
+    if len(prices) < 10:
+        return []
+
+    kernel = kernels.backend()
+    prices = np.asarray(prices, dtype=np.float64)
+    is_min, is_max = kernel.extrema(prices, PIVOT_WINDOW)
+    candidates = np.flatnonzero(is_min | is_max)
+    return _pivot_points(prices, dates, kernel.classic(prices, candidates, is_min, is_max, 12))  # En fazla 12 nokta
+
+
+
+@timed_phase("pivots")
+def find_peaks_troughs_with_criteria(prices: np.ndarray, dates: List[str], criteria: PatternCriteria) -> List[PeakTroughPoint]:
+    """
+    Kullanıcının belirlediği kriterlere göre dip ve tepe noktalarını bul.
+    """
+    if len(prices) < 10:
+        return []
+
+    kernel = kernels.backend()
+    prices = np.asarray(prices, dtype=np.float64)
+    is_min, is_max = kernel.extrema(prices, PIVOT_WINDOW)
+    candidates = np.flatnonzero(is_min | is_max)
+    # Kriterler: n. yükseliş / düşüş için (min, max)
+    rise_min, rise_max, drop_min, drop_max = (
+        np.array([getattr(criteria, f"{move}_{n}_{bound}") for n in range(1, 6)], dtype=np.float64)
+        for move, bound in (("rise", "min"), ("rise", "max"), ("drop", "min"), ("drop", "max"))
+    )
+    return _pivot_points(prices, dates, kernel.criteria(prices, candidates, is_min, is_max,
+                                                        rise_min, rise_max, drop_min, drop_max))
+
+
+# Scan kernels: one symbol's closes in, one result dict (or None) out.
+# The API runs them in-process; scan_pool.py runs them in worker processes.
+def scan_similar(symbol: str, prices: np.ndarray, dates: List[str],
+                 ref_prices, min_similarity: float) -> Optional[dict]:
+    """find-similar: best matching window of the reference pattern in the symbol's history"""
+    ref_prices = np.asarray(ref_prices, dtype=float)
+    if len(prices) < len(ref_prices) + 66:  # En az kalıp + 3 ay sonrası kadar veri olmalı
+        return None
+
+    best_match = find_best_matching_window(ref_prices, prices, dates)
+    if not best_match or best_match['similarity'] < min_similarity:
+        return None
+
+    # O dönemdeki dip/tepe noktalarını bul
+    window_prices = best_match['prices']
+    window_dates = dates[best_match['start_idx']:best_match['end_idx']]
+    peaks_troughs = find_peaks_troughs(window_prices, window_dates)
+
+    return {
+        "symbol": symbol,
+        "similarity_score": round(best_match['similarity'] * 100, 2),
+        "correlation": round(best_match['correlation'] * 100, 2),
+        "start_date": best_match['start_date'],
+        "end_date": best_match['end_date'],
+        "peaks_troughs": [p.model_dump() for p in peaks_troughs],
+        "current_price": round(float(prices[-1]), 2),
+        "price_change_percent": round(float((window_prices[-1] - window_prices[0]) / window_prices[0] * 100), 2),
+        "after_pattern_1m": best_match['after_1m_change'],
+        "after_pattern_3m": best_match['after_3m_change'],
+        "pattern_end_price": best_match['pattern_end_price'],
+    }
+
+
+def scan_advanced(symbol: str, prices: np.ndarray, dates: List[str],
+                  criteria, min_points_match: int) -> Optional[dict]:
+    """advanced-pattern: dip/tepe sequence under the user's rise/drop criteria"""
+    if len(prices) < 30:
+        return None
+    if not isinstance(criteria, PatternCriteria):
+        criteria = PatternCriteria(**criteria)
+
+    peaks_troughs = find_peaks_troughs_with_criteria(prices, dates, criteria)
+    # En az belirtilen sayıda nokta eşleşmeli
+    if len(peaks_troughs) < min_points_match:
+        return None
+
+    # Eşleşme skoru (bulunan nokta sayısı / maksimum nokta sayısı; 6 dip + 5 tepe = 11)
+    match_score = (len(peaks_troughs) / 11) * 100
+    return {
+        "symbol": symbol,
+        "peaks_troughs": [p.model_dump() for p in peaks_troughs],
+        "current_price": round(float(prices[-1]), 2),
+        "price_change_percent": round(float((prices[-1] - prices[0]) / prices[0] * 100), 2),
+        "matching_points_count": len(peaks_troughs),
+        "match_score": round(match_score, 1),
+        "dip_count": len([p for p in peaks_troughs if p.point_type == "dip"]),
+        "peak_count": len([p for p in peaks_troughs if p.point_type == "tepe"]),
+    }
+
+
+def drawn_ratios(prices) -> List[float]:
+    """Percentage change between consecutive points"""
+    return [(prices[i + 1] - prices[i]) / prices[i] * 100 for i in range(len(prices) - 1)]
+
+
+@timed_phase("score")
+def scan_drawn(symbol: str, prices: np.ndarray, dates: List[str],
+               drawn_prices, min_similarity: float) -> Optional[dict]:
+    """search-by-pattern: dip/tepe window whose moves best match the drawn points"""
+    drawn_prices = np.asarray(drawn_prices, dtype=float)
+    pattern_length = len(drawn_prices)
+    if len(prices) < pattern_length * 5:
+        return None
+
+    peaks_troughs = find_peaks_troughs(prices, dates)
+    if len(peaks_troughs) < pattern_length:
+        return None
+
+    ratios = drawn_ratios(drawn_prices)
+    best_match = None
+    best_similarity = 0
+
+    # Sliding window through peaks/troughs
+    for start_idx in range(len(peaks_troughs) - pattern_length + 1):
+        window_pts = peaks_troughs[start_idx:start_idx + pattern_length]
+        window_prices = [pt.price for pt in window_pts]
+        window_ratios = drawn_ratios(window_prices)
+
+        # Calculate similarity based on ratio differences
+        total_diff = 0
+        for dr, wr in zip(ratios, window_ratios):
+            # Both should have same direction (positive/negative)
+            if (dr > 0) != (wr > 0):
+                total_diff += 100  # Penalty for wrong direction
+            else:
+                total_diff += abs(dr - wr)
+
+        similarity = max(0, 100 - total_diff / len(ratios)) / 100
+        if similarity <= best_similarity:
+            continue
+        best_similarity = similarity
+
+        # After-pattern performance from the window's last point
+        end_idx = dates.index(window_pts[-1].date) if window_pts[-1].date in dates else None
+        after_1m_change = None
+        after_3m_change = None
+        pattern_end_price = window_prices[-1]
+        if end_idx is not None:
+            # 1 month after (~22 trading days), 3 months after (~66 trading days)
+            if end_idx + 22 < len(prices):
+                after_1m_change = round(float((prices[end_idx + 22] - pattern_end_price) / pattern_end_price * 100), 2)
+            if end_idx + 66 < len(prices):
+                after_3m_change = round(float((prices[end_idx + 66] - pattern_end_price) / pattern_end_price * 100), 2)
+
+        best_match = {
+            'start_date': window_pts[0].date,
+            'end_date': window_pts[-1].date,
+            'peaks_troughs': window_pts,
+            'after_1m_change': after_1m_change,
+            'after_3m_change': after_3m_change,
+            'pattern_end_price': round(pattern_end_price, 2)
+        }
+
+    if not best_match or best_similarity < min_similarity:
+        return None
+
+    match_prices = np.array([pt.price for pt in best_match['peaks_troughs']])
+    correlation = pearson_correlation(normalize_prices(drawn_prices), normalize_prices(match_prices))
+
+    return {
+        "symbol": symbol,
+        "similarity_score": round(best_similarity * 100, 2),
+        "correlation": round(float(correlation) * 100, 2),
+        "start_date": best_match['start_date'],
+        "end_date": best_match['end_date'],
+        "peaks_troughs": [p.model_dump() for p in best_match['peaks_troughs']],
+        "current_price": round(float(prices[-1]), 2),
+        "price_change_percent": round(float((match_prices[-1] - match_prices[0]) / match_prices[0] * 100), 2),
+        "after_pattern_1m": best_match['after_1m_change'],
+        "after_pattern_3m": best_match['after_3m_change'],
+        "pattern_end_price": best_match['pattern_end_price'],
+    }
+
+
+SCAN_KERNELS = {"similar": scan_similar, "advanced": scan_advanced, "drawn": scan_drawn}
+# Result field each scan ranks by (descending)
+SCAN_RANK_KEYS = {"similar": "similarity_score", "advanced": "match_score", "drawn": "similarity_score"}
+
+
+def rank_results(results: List[dict], kind: str, limit: int, order: Optional[dict] = None) -> List[dict]:
+    """
+    Top `limit` results by the scan's score. Ties keep universe order
+    (`order`: symbol -> position), so merged chunks rank like one sequential pass.
+    """
+    key = SCAN_RANK_KEYS[kind]
+    if order is None:
+        return sorted(results, key=lambda r: r[key], reverse=True)[:limit]
+    return sorted(results, key=lambda r: (-r[key], order.get(r["symbol"], len(order))))[:limit]
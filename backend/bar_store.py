@@ -0,0 +1,260 @@
+"""
+OHLCV bars shared by all workers and hosts through MongoDB.
+
+Daily and hourly bars live in time-series collections (bars_1d / bars_1h,
+timeField "date", metaField "symbol") with a compound (symbol, date) index.
+On servers without time-series support a regular collection with a unique
+(symbol, date) index is used instead. Time-series collections cannot have a
+unique index and are rewritten by range delete + insert, so each symbol's
+rewrite holds a short lease in `locks`: two workers refreshing the same
+symbol at once would otherwise both delete, then both insert every bar. `bar_sync` records when each symbol
+was last fetched from the market data provider, so a cold worker can tell
+whether the shared copy is fresh before going to the network.
+
+The store is built on the server's Motor `db`: bulk writes and whole-frame
+reads go through its synchronous pymongo delegate (they run inside
+PriceStore, usually on a worker thread), scans read Close columns through
+Motor.
+"""
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from pymongo.errors import CollectionInvalid, DuplicateKeyError, OperationFailure
+
+from resample import BIST_TZ
+from series import PriceSeries
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+BAR_FIELDS = {"Open": "open", "High": "high", "Low": "low", "Close": "close", "Volume": "volume"}
+# How often a writer waiting for another worker's symbol lease checks again
+LEASE_POLL_SECONDS = 0.05
+
+
+def _utc_naive(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """Dates as stored: naive UTC (daily bars are stored at midnight)"""
+    index = pd.DatetimeIndex(index)
+    return index.tz_convert("UTC").tz_localize(None) if index.tz is not None else index
+
+
+def _as_local_time(value: datetime) -> datetime:
+    """Naive UTC datetime from Mongo -> naive local time used by PriceStore._fetched_at"""
+    return value.replace(tzinfo=timezone.utc).astimezone().replace(tzinfo=None)
+
+
+class MongoBarStore:
+    """Shared copy of one interval's bars (1d or 1h)"""
+
+    def __init__(self, db, interval: str, lease: timedelta = timedelta(seconds=60)):
+        self.interval = interval
+        # Longest a time-series rewrite holds (and a writer waits for) a symbol lease
+        self.lease = lease
+        self.intraday = interval != "1d"
+        self.name = f"bars_{interval}"
+        self._db = db
+        # Motor database -> pymongo database on the same client (the warm-up CLI passes pymongo directly)
+        self._sync_db = db.delegate if isinstance(db, AsyncIOMotorDatabase) else db
+        self.timeseries = False
+        self.ready = False
+
+    @property
+    def _collection(self):
+        return self._sync_db[self.name]
+
+    @property
+    def _sync(self):
+        return self._sync_db.bar_sync
+
+    @property
+    def _locks(self):
+        return self._sync_db.locks
+
+    def _collection_type(self) -> Optional[str]:
+        for info in self._sync_db.list_collections(filter={"name": self.name}):
+            return info.get("type", "collection")
+        return None
+
+    def init(self):
+        """Create the collection and indexes (idempotent, safe to race with other workers)"""
+        kind = self._collection_type()
+        if kind is None:
+            try:
+                self._sync_db.create_collection(
+                    self.name, timeseries={"timeField": "date", "metaField": "symbol", "granularity": "hours"}
+                )
+            except CollectionInvalid:
+                pass  # created concurrently by another worker
+            except OperationFailure as e:
+                logger.warning(f"Time-series collections unavailable ({e}); {self.name} is a regular collection")
+                try:
+                    self._sync_db.create_collection(self.name)
+                except CollectionInvalid:
+                    pass
+            kind = self._collection_type()
+        self.timeseries = kind == "timeseries"
+        # Time-series collections cannot have unique indexes; writes replace ranges instead
+        self._collection.create_index([("symbol", 1), ("date", 1)], unique=not self.timeseries)
+        self._sync.create_index([("symbol", 1), ("interval", 1)], unique=True)
+        self.ready = True
+        logger.info(f"Shared bars in {self.name} ({'time-series' if self.timeseries else 'regular'} collection)")
+
+    def _documents(self, symbol: str, df: pd.DataFrame) -> List[dict]:
+        dates = _utc_naive(df.index).to_pydatetime()
+        values = df[list(BAR_FIELDS)].to_numpy().tolist()
+        keys = list(BAR_FIELDS.values())
+        return [{"symbol": symbol, "date": date, **dict(zip(keys, row))} for date, row in zip(dates, values)]
+
+    def _operations(self, symbol: str, df: pd.DataFrame, changed_from: Optional[pd.Timestamp]) -> list:
+        if changed_from is not None:
+            df = df.loc[df.index >= changed_from]
+        docs = self._documents(symbol, df)
+        if self.timeseries:
+            query = {"symbol": symbol}
+            if changed_from is not None:
+                query["date"] = {"$gte": _utc_naive([changed_from])[0].to_pydatetime()}
+            return [DeleteMany(query)] + [InsertOne(doc) for doc in docs]
+        return [UpdateOne({"symbol": symbol, "date": doc["date"]}, {"$set": doc}, upsert=True) for doc in docs]
+
+    def _acquire(self, symbol: str, owner: str) -> bool:
+        """Take the symbol's rewrite lease if it is free or expired"""
+        lease_id = f"{self.name}:{symbol}"
+        now = datetime.now(timezone.utc)
+        try:
+            self._locks.update_one({"_id": lease_id}, {"$setOnInsert": {"owner": None, "expires": now}}, upsert=True)
+        except DuplicateKeyError:
+            pass  # inserted concurrently by another worker
+        result = self._locks.update_one(
+            {"_id": lease_id, "expires": {"$lte": now}},
+            {"$set": {"owner": owner, "expires": now + self.lease}},
+        )
+        return result.modified_count == 1
+
+    def _release(self, symbols: Iterable[str], owner: str):
+        now = datetime.now(timezone.utc)
+        for symbol in symbols:
+            self._locks.update_one({"_id": f"{self.name}:{symbol}", "owner": owner},
+                                   {"$set": {"owner": None, "expires": now}})
+
+    def _bulk_write(self, updates: Dict[str, Tuple[pd.DataFrame, Optional[pd.Timestamp]]]):
+        ops = [op for symbol, (df, changed_from) in updates.items()
+               for op in self._operations(symbol, df, changed_from)]
+        if not ops:
+            return
+        try:
+            # Time-series writes are delete-range-then-insert, which must stay ordered
+            self._collection.bulk_write(ops, ordered=self.timeseries)
+        except OperationFailure as e:
+            if not self.timeseries:
+                raise
+            # Deletes filtered on the time field need MongoDB 7; rewrite whole symbols instead
+            logger.info(f"Range delete rejected on {self.name} ({e}); rewriting full series")
+            ops = [op for symbol, (df, _) in updates.items() for op in self._operations(symbol, df, None)]
+            self._collection.bulk_write(ops, ordered=True)
+
+    def _rewrite_leased(self, updates: Dict[str, Tuple[pd.DataFrame, Optional[pd.Timestamp]]]):
+        """Time-series rewrite of each symbol under its lease; waits up to `lease` for other writers"""
+        pending = dict(updates)
+        deadline = time.monotonic() + self.lease.total_seconds()
+        while pending:
+            owner = f"{WORKER_ID}:{uuid.uuid4().hex[:8]}"
+            held = [s for s in pending if self._acquire(s, owner)]
+            if held:
+                try:
+                    self._bulk_write({s: pending.pop(s) for s in held})
+                finally:
+                    self._release(held, owner)
+                continue
+            if time.monotonic() >= deadline:
+                logger.warning(f"Shared {self.name} write skipped for {', '.join(pending)}: held by another worker")
+                return
+            time.sleep(LEASE_POLL_SECONDS)
+
+    def write(self, updates: Dict[str, Tuple[pd.DataFrame, Optional[pd.Timestamp]]], fetched: Iterable[str]):
+        """
+        Bulk upsert changed bars ({symbol: (frame, changed_from)}; None = whole
+        frame) and mark `fetched` symbols as fetched now.
+        """
+        if self.timeseries:
+            self._rewrite_leased(updates)
+        else:
+            # Upserts on the unique (symbol, date) index are safe to race
+            self._bulk_write(updates)
+
+        now = datetime.now(timezone.utc)
+        sync_ops = [
+            UpdateOne({"symbol": s, "interval": self.interval}, {"$set": {"fetched_at": now}}, upsert=True)
+            for s in fetched
+        ]
+        if sync_ops:
+            self._sync.bulk_write(sync_ops, ordered=False)
+
+    def fetched_at(self, symbols: Iterable[str]) -> Dict[str, datetime]:
+        """When each symbol was last fetched by any worker (local naive time)"""
+        cursor = self._sync.find(
+            {"symbol": {"$in": list(symbols)}, "interval": self.interval}, {"_id": 0, "symbol": 1, "fetched_at": 1}
+        )
+        return {doc["symbol"]: _as_local_time(doc["fetched_at"]) for doc in cursor}
+
+    def _frames(self, docs: List[dict], columns: List[str]) -> Dict[str, pd.DataFrame]:
+        if not docs:
+            return {}
+        df = pd.DataFrame(docs)
+        index = pd.DatetimeIndex(df["date"])
+        if self.intraday:
+            index = index.tz_localize("UTC").tz_convert(BIST_TZ)
+        df.index = index.rename("Datetime" if self.intraday else "Date")
+        renamed = df.rename(columns={v: k for k, v in BAR_FIELDS.items()})
+        return {symbol: group[columns] for symbol, group in renamed.groupby("symbol", sort=False)}
+
+    def read(self, symbols: Iterable[str], start: str) -> Dict[str, pd.DataFrame]:
+        """Full OHLCV bars since `start` for many symbols in one query"""
+        cursor = self._collection.find(
+            {"symbol": {"$in": list(symbols)}, "date": {"$gte": pd.Timestamp(start).to_pydatetime()}},
+            {"_id": 0},
+        ).sort([("symbol", 1), ("date", 1)])
+        return self._frames(list(cursor), list(BAR_FIELDS))
+
+    async def closes(self, symbols: List[str], start: str, end: str,
+                     fetched_after: Optional[datetime] = None) -> Dict[str, PriceSeries]:
+        """
+        Scan input: daily closes in [start, end) for symbols whose shared copy
+        was fetched after `fetched_after`, read with a projection so only
+        dates and closes cross the wire.
+        """
+        if fetched_after is not None:
+            sync_docs = await self._db.bar_sync.find(
+                {"symbol": {"$in": symbols}, "interval": self.interval},
+                {"_id": 0, "symbol": 1, "fetched_at": 1},
+            ).to_list(None)
+            symbols = [d["symbol"] for d in sync_docs if _as_local_time(d["fetched_at"]) > fetched_after]
+        if not symbols:
+            return {}
+        docs = await self._db[self.name].find(
+            {"symbol": {"$in": symbols},
+             "date": {"$gte": pd.Timestamp(start).to_pydatetime(), "$lt": pd.Timestamp(end).to_pydatetime()}},
+            {"_id": 0, "symbol": 1, "date": 1, "close": 1},
+        ).sort([("symbol", 1), ("date", 1)]).to_list(None)
+        series = {}
+        for symbol, group in groupby(docs, key=itemgetter("symbol")):
+            group = list(group)
+            days = np.array([d["date"] for d in group], dtype="datetime64[D]").astype(np.int32)
+            closes = np.array([d["close"] for d in group], dtype=np.float64)
+            # Duplicate dates (left by racing time-series writers) keep their last document
+            last = np.r_[days[1:] != days[:-1], True]
+            series[symbol] = PriceSeries(symbol, days[last], closes[last])
+        return series
+
@@ -0,0 +1,92 @@
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+DOWNSAMPLE_MODES = ("ohlc", "lttb")
+# Smallest max_points accepted: LTTB keeps the first and last point plus at least one bucket
+MIN_POINTS = 3
+
+
+def _bucket_starts(n: int, max_points: int, pinned: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    Evenly spaced bucket starts over n bars. Every pinned position becomes a
+    single-bar bucket so that bar survives unchanged.
+    """
+    starts = np.unique(np.linspace(0, n, max_points, endpoint=False).astype(np.int64))
+    if pinned is not None:
+        pins = np.asarray([p for p in pinned if 0 <= p < n], dtype=np.int64)
+        starts = np.union1d(starts, np.concatenate([pins, pins + 1]))
+        starts = starts[starts < n]
+    return starts
+
+
+def downsample_ohlcv(df: pd.DataFrame, max_points: int, pinned: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """
+    OHLC-preserving bucket aggregation: first open, max high, min low, last close,
+    summed volume, labelled with the bucket's first bar. Wicks survive because
+    high/low are bucket extremes; pinned positions (e.g. dip/tepe bars) are kept as-is.
+    Works on any frame with Open/High/Low/Close/Volume columns (other columns take
+    the bucket's first value).
+    """
+    n = len(df)
+    if max_points <= 0 or n <= max_points:
+        return df
+    starts = _bucket_starts(n, max_points, pinned)
+    ends = np.r_[starts[1:], n] - 1
+
+    out = df.iloc[starts].copy()
+    out["High"] = np.fmax.reduceat(df["High"].to_numpy(dtype=np.float64), starts)
+    out["Low"] = np.fmin.reduceat(df["Low"].to_numpy(dtype=np.float64), starts)
+    out["Close"] = df["Close"].to_numpy()[ends]
+    out["Volume"] = np.add.reduceat(np.nan_to_num(df["Volume"].to_numpy(dtype=np.float64)), starts)
+    return out
+
+
+def lttb_indices(y: np.ndarray, max_points: int, pinned: Optional[Iterable[int]] = None) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets selection over an evenly spaced line series.
+    Returns sorted indices of the kept points (first/last and pinned always kept).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = [0]
+    prev = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        if hi <= lo:
+            continue
+        # Average of the next bucket is the third triangle vertex
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        next_x = (next_lo + max(next_hi, next_lo + 1) - 1) / 2.0
+        next_y = y[next_lo:max(next_hi, next_lo + 1)].mean()
+        xs = np.arange(lo, hi)
+        areas = np.abs((prev - next_x) * (y[lo:hi] - y[prev]) - (prev - xs) * (next_y - y[prev]))
+        prev = lo + int(np.argmax(areas))
+        selected.append(prev)
+    selected.append(n - 1)
+
+    indices = np.asarray(selected, dtype=np.int64)
+    if pinned is not None:
+        pins = np.asarray([p for p in pinned if 0 <= p < n], dtype=np.int64)
+        indices = np.union1d(indices, pins)
+    return np.unique(indices)
+
+
+def downsample_frame(df: pd.DataFrame, max_points: Optional[int], mode: str = "ohlc",
+                     pinned: Optional[Iterable[int]] = None) -> pd.DataFrame:
+    """Reduce a bar frame to about max_points rows (no-op when max_points is None or not exceeded)"""
+    if max_points is None:
+        return df
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}")
+    if len(df) <= max_points:
+        return df
+    if mode == "lttb":
+        return df.iloc[lttb_indices(df["Close"].to_numpy(), max_points, pinned)]
+    return downsample_ohlcv(df, max_points, pinned)
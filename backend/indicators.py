@@ -0,0 +1,282 @@
+"""
+Technical indicators over OHLCV bars, vectorized and updated incrementally.
+
+    sma:N      simple moving average of Close            (N=20)
+    ema:N      exponential moving average of Close       (N=20)
+    rsi:N      Wilder relative strength index            (N=14)
+    bb:N:K     Bollinger bands, SMA(N) +- K std          (N=20, K=2) -> upper / middle / lower
+    atr:N      Wilder average true range                 (N=14)
+    vma:N      simple moving average of Volume           (N=20)
+
+Values are NaN until an indicator has its N bars of warm-up. The smoothed
+ones (EMA, RSI, ATR) are seeded with the simple mean of their first N
+inputs, as charting packages do; the std of the bands is the population
+std. Rolling means/stds are evaluated per window (sliding_window_view), so
+a value never depends on where a computation started.
+
+IndicatorSeries keeps one indicator of one bar series up to date the way
+ResampledSeries does for aggregates: `update(bars, changed_from)` reuses the
+values before the first changed bar and only computes the rest, the smoothed
+indicators continuing from their stored state at the bar before. Appending
+or revising the last bar costs O(N) instead of a pass over the history.
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# name -> default parameters (period, band width)
+INDICATORS = {
+    "sma": (20,),
+    "ema": (20,),
+    "rsi": (14,),
+    "bb": (20, 2.0),
+    "atr": (14,),
+    "vma": (20,),
+}
+MAX_INDICATORS = 8
+MAX_PERIOD = 500
+# Output columns of multi-line indicators (the others have a single line named after the spec)
+BAND_OUTPUTS = ("upper", "middle", "lower")
+
+
+class IndicatorSpec(NamedTuple):
+    name: str
+    period: int
+    width: float = 0.0
+
+    @property
+    def key(self) -> str:
+        """Canonical 'name:period[:width]' (the response key)"""
+        return f"{self.name}:{self.period}:{self.width:g}" if self.name == "bb" else f"{self.name}:{self.period}"
+
+    @property
+    def outputs(self) -> tuple:
+        return BAND_OUTPUTS if self.name == "bb" else (self.key,)
+
+
+def parse_indicators(text: Optional[str]) -> List[IndicatorSpec]:
+    """'sma:50,rsi,bb:20:2.5' -> specs (defaults filled in, duplicates dropped); ValueError if invalid"""
+    specs = []
+    for token in filter(None, (t.strip().lower() for t in (text or "").split(","))):
+        name, *params = token.split(":")
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator {name!r}; available: {', '.join(INDICATORS)}")
+        defaults = INDICATORS[name]
+        if len(params) > len(defaults):
+            raise ValueError(f"Too many parameters for {name}: {token!r}")
+        try:
+            period = int(params[0]) if params else defaults[0]
+            width = float(params[1]) if len(params) > 1 else (defaults[1] if len(defaults) > 1 else 0.0)
+        except ValueError:
+            raise ValueError(f"Invalid indicator parameters: {token!r}")
+        if not 1 <= period <= MAX_PERIOD or not 0 <= width <= 10:
+            raise ValueError(f"Indicator parameters out of range: {token!r}")
+        spec = IndicatorSpec(name, period, width)
+        if spec not in specs:
+            specs.append(spec)
+    if len(specs) > MAX_INDICATORS:
+        raise ValueError(f"At most {MAX_INDICATORS} indicators per request")
+    return specs
+
+
+# ---------------------------------------------------------------------------
+# Vectorized building blocks; each returns values for positions [start:]
+
+def _rolling(values: np.ndarray, n: int, start: int, reduce) -> np.ndarray:
+    out = np.full(len(values) - start, np.nan)
+    first = max(start, n - 1)
+    if first < len(values):
+        out[first - start:] = reduce(sliding_window_view(values[first - n + 1:], n), axis=1)
+    return out
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    y[0] = values[0], y[i] = (1 - alpha) * y[i-1] + alpha * values[i] along
+    axis 0 (per column for a 2-D array; leading NaNs stay NaN)
+    """
+    frame = pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+    return frame.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+
+def _previous(values: np.ndarray) -> np.ndarray:
+    """values shifted one bar forward along axis 0 (NaN first)"""
+    return np.concatenate([np.full((1,) + values.shape[1:], np.nan), values[:-1]])
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    previous = _previous(close)
+    # fmax skips NaN terms: the first bar (no previous close) and missing highs/lows
+    return np.nan_to_num(np.fmax(np.fmax(high - low, np.abs(high - previous)), np.abs(low - previous)))
+
+
+def relative_strength(gain: np.ndarray, loss: np.ndarray) -> np.ndarray:
+    """RSI from smoothed gains/losses: 100 without losses, 50 when flat, NaN during warm-up"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+    rsi = np.where(loss == 0, np.where(gain == 0, 50.0, 100.0), rsi)
+    rsi[np.isnan(gain)] = np.nan
+    return rsi
+
+
+def _smoothed(values: np.ndarray, n: int, alpha: float, start: int, state: Optional[np.ndarray],
+              offset: int = 0) -> np.ndarray:
+    """
+    Exponential smoothing of values[offset:] seeded with the mean of its
+    first n items (at position offset + n - 1). Continues from state[start-1]
+    when that is already past the seed.
+    """
+    seed = offset + n - 1
+    if state is not None and start > seed:
+        return _ewm(np.r_[state[start - 1], values[start:]], alpha)[1:]
+    out = np.full(len(values), np.nan)
+    if len(values) > seed:
+        out[seed:] = _ewm(np.r_[values[offset:seed + 1].mean(), values[seed + 1:]], alpha)
+    return out[start:]
+
+
+def smoothed_columns(values: np.ndarray, first: np.ndarray, n: int, alpha: float, offset: int = 0) -> np.ndarray:
+    """
+    _smoothed for every column of a (bars x series) matrix whose column j
+    starts at row first[j] (NaN above): each seeded over its own first n
+    inputs, with values identical to smoothing the column on its own
+    """
+    rows = len(values)
+    seed = first + offset + n - 1
+    columns = np.flatnonzero(seed < rows)
+    out = np.full(values.shape, np.nan)
+    if len(columns):
+        window = first[columns] + offset + np.arange(n)[:, None]
+        # Contiguous rows, so each seed mean sums in the same order as the 1-D mean
+        seeds = np.ascontiguousarray(np.take_along_axis(values[:, columns], window, axis=0).T).mean(axis=1)
+        x = values[:, columns].copy()
+        x[np.arange(rows)[:, None] < seed[columns]] = np.nan
+        x[seed[columns], np.arange(len(columns))] = seeds
+        out[:, columns] = _ewm(x, alpha)
+    return out
+
+
+def _sma(bars, spec, start, state):
+    return {spec.key: _rolling(bars["close"], spec.period, start, np.mean)}
+
+
+def _vma(bars, spec, start, state):
+    return {spec.key: _rolling(bars["volume"], spec.period, start, np.mean)}
+
+
+def _bands(bars, spec, start, state):
+    middle = _rolling(bars["close"], spec.period, start, np.mean)
+    spread = spec.width * _rolling(bars["close"], spec.period, start, np.std)
+    return {"upper": middle + spread, "middle": middle, "lower": middle - spread}
+
+
+def _ema(bars, spec, start, state):
+    n = spec.period
+    return {spec.key: _smoothed(bars["close"], n, 2.0 / (n + 1), start, state[spec.key] if state else None)}
+
+
+def _rsi(bars, spec, start, state):
+    n = spec.period
+    change = bars["close"] - _previous(bars["close"])
+    # Smoothed gains/losses start at bar 1 (bar 0 has no change)
+    gain = _smoothed(np.fmax(change, 0.0), n, 1.0 / n, start, state["_gain"] if state else None, offset=1)
+    loss = _smoothed(np.fmax(-change, 0.0), n, 1.0 / n, start, state["_loss"] if state else None, offset=1)
+    return {spec.key: relative_strength(gain, loss), "_gain": gain, "_loss": loss}
+
+
+def _atr(bars, spec, start, state):
+    n = spec.period
+    ranges = true_range(bars["high"], bars["low"], bars["close"])
+    return {spec.key: _smoothed(ranges, n, 1.0 / n, start, state[spec.key] if state else None)}
+
+
+_COMPUTE = {"sma": _sma, "vma": _vma, "bb": _bands, "ema": _ema, "rsi": _rsi, "atr": _atr}
+
+
+def _bar_arrays(bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+    arrays = {
+        name.lower(): bars[name].to_numpy(dtype=np.float64)
+        for name in ("High", "Low", "Close") if name in bars.columns
+    }
+    if "Volume" in bars.columns:
+        arrays["volume"] = np.nan_to_num(bars["Volume"].to_numpy(dtype=np.float64))
+    return arrays
+
+
+def compute(bars: pd.DataFrame, specs: List[IndicatorSpec]) -> Dict[IndicatorSpec, Dict[str, np.ndarray]]:
+    """One-off full computation: spec -> {output: values aligned with bars}"""
+    arrays = _bar_arrays(bars)
+    results = {}
+    for spec in specs:
+        values = _COMPUTE[spec.name](arrays, spec, 0, None)
+        results[spec] = {name: values[name] for name in spec.outputs}
+    return results
+
+
+class IndicatorSeries:
+    """
+    One indicator over a bar frame that grows or is revised at its end.
+    `update(bars, changed_from)` recomputes from the bar containing
+    changed_from (None = anything may have changed: full recompute).
+    """
+
+    __slots__ = ("spec", "_index", "_state")
+
+    def __init__(self, spec: IndicatorSpec):
+        self.spec = spec
+        self._index: Optional[pd.Index] = None
+        self._state: Dict[str, np.ndarray] = {}
+
+    @property
+    def values(self) -> Dict[str, np.ndarray]:
+        return {name: self._state[name] for name in self.spec.outputs}
+
+    def _resume_at(self, bars: pd.DataFrame, changed_from: Optional[pd.Timestamp]) -> int:
+        if changed_from is None or self._index is None or len(self._index) == 0 or len(bars) == 0:
+            return 0
+        if bars.index[0] != self._index[0]:
+            return 0
+        # The bar (or bucket) containing changed_from is the first one that may differ
+        start = int(np.searchsorted(bars.index, changed_from, side="right")) - 1
+        return min(max(start, 0), len(self._index))
+
+    def update(self, bars: pd.DataFrame, changed_from: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+        start = self._resume_at(bars, changed_from)
+        arrays, state, lo = _bar_arrays(bars), None, 0
+        if start:
+            # Only the last period + 1 bars before start feed the recomputed values
+            lo = max(0, start - self.spec.period - 1)
+            arrays = {name: values[lo:] for name, values in arrays.items()}
+            state = {name: values[lo:] for name, values in self._state.items()}
+        fresh = _COMPUTE[self.spec.name](arrays, self.spec, start - lo, state)
+        if start:
+            self._state = {name: np.concatenate([self._state[name][:start], v]) for name, v in fresh.items()}
+        else:
+            self._state = fresh
+        self._index = bars.index
+        return self.values
+
+
+def attach(bars: pd.DataFrame, values: Dict[IndicatorSpec, Dict[str, np.ndarray]]) -> pd.DataFrame:
+    """Copy of bars with one column per indicator line, so slicing/downsampling carries them along"""
+    columns = {
+        _column(spec, name): line
+        for spec, lines in values.items() for name, line in lines.items()
+    }
+    return bars.assign(**columns) if columns else bars
+
+
+def detach(df: pd.DataFrame, specs: List[IndicatorSpec], decimals: int = 4) -> Dict[str, object]:
+    """Response payload of the attached columns: key -> values, or key -> {line: values} for bands"""
+    payload = {}
+    for spec in specs:
+        lines = {name: np.round(df[_column(spec, name)].to_numpy(dtype=np.float64), decimals)
+                 for name in spec.outputs}
+        payload[spec.key] = lines[spec.key] if spec.outputs == (spec.key,) else lines
+    return payload
+
+
+def _column(spec: IndicatorSpec, line: str) -> str:
+    return spec.key if line == spec.key else f"{spec.key}.{line}"
@@ -0,0 +1,321 @@
+"""
+Inner loops of the pattern analysis (analysis.py) with an optional Numba backend.
+
+    extrema      local minima/maxima over a +-window neighbourhood
+    classic      dip/tepe state machine of find_peaks_troughs
+    criteria     dip/tepe state machine of find_peaks_troughs_with_criteria
+    best_window  sliding-window search of find_best_matching_window
+
+The state machines and the window search are written once, in the subset
+of Python that Numba compiles. When numba is installed they are compiled
+with njit on first use (cached next to this file, so later processes load
+machine code instead of recompiling); without numba, or with
+ANALYSIS_JIT=0, the very same functions run as plain Python, with the
+extrema scan and the window distances done by NumPy instead. numba is
+imported lazily, so workers that never scan do not pay for it.
+
+The loops return indices and percentages only; analysis.py turns them into
+PeakTroughPoint objects (and date strings) afterwards.
+"""
+import logging
+import os
+import threading
+from types import SimpleNamespace
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from range_stats import sliding_min_max
+
+logger = logging.getLogger(__name__)
+
+# Same zero-range cutoff as normalize_prices / MinMaxScaler
+_FLAT_SPAN = 10 * np.finfo(np.float64).eps
+# Capacity of the point buffers; neither state machine reports more points
+MAX_POINTS = 12
+
+
+# ---------------------------------------------------------------------------
+# Loops (compiled by numba when available, plain Python otherwise)
+
+def _extrema_loop(prices, window):
+    n = len(prices)
+    is_min = np.zeros(n, dtype=np.bool_)
+    is_max = np.zeros(n, dtype=np.bool_)
+    for i in range(window, n - window):
+        p = prices[i]
+        low = True
+        high = True
+        for j in range(1, window + 1):
+            a = prices[i - j]
+            b = prices[i + j]
+            if not (p <= a and p <= b):
+                low = False
+            if not (p >= a and p >= b):
+                high = False
+        is_min[i] = low
+        is_max[i] = high
+    return is_min, is_max
+
+
+def _classic_loop(prices, candidates, is_min, is_max, limit):
+    """
+    Walks the extrema (`candidates`: their indices, ascending) in order. A
+    flat point that is both a local min and max is taken twice, both times
+    as a dip, as the original list-membership test did. Returns the points'
+    (index, is_tepe, number, percentage) arrays, percentage NaN for none.
+    """
+    idx = np.empty(MAX_POINTS, dtype=np.int64)
+    peak = np.zeros(MAX_POINTS, dtype=np.bool_)
+    number = np.empty(MAX_POINTS, dtype=np.int64)
+    pct = np.empty(MAX_POINTS, dtype=np.float64)
+    count = 0
+    dip_count = 0
+    peak_count = 0
+    last_dip = -1
+    last_peak = -1
+    for i in candidates:
+        for k in range(2):
+            if k == 0:
+                if not is_min[i]:
+                    continue
+                dip = True
+            else:
+                if not is_max[i]:
+                    continue
+                dip = is_min[i]
+            if count == limit:
+                return idx[:count], peak[:count], number[:count], pct[:count]
+            price = prices[i]
+            if dip:
+                if last_peak >= 0:
+                    drop_pct = ((prices[last_peak] - price) / prices[last_peak]) * 100
+                    if (dip_count == 0 and drop_pct >= 40) or \
+                       (dip_count == 1 and 40 <= drop_pct <= 60) or \
+                       (dip_count == 2 and 20 <= drop_pct <= 30) or \
+                       (dip_count >= 3 and 15 <= drop_pct <= 40):
+                        dip_count += 1
+                        idx[count] = i
+                        peak[count] = False
+                        number[count] = dip_count
+                        pct[count] = -drop_pct
+                        count += 1
+                        last_dip = i
+                elif last_dip < 0:
+                    dip_count += 1
+                    idx[count] = i
+                    peak[count] = False
+                    number[count] = dip_count
+                    pct[count] = np.nan
+                    count += 1
+                    last_dip = i
+            elif last_dip >= 0:
+                rise_pct = ((price - prices[last_dip]) / prices[last_dip]) * 100
+                if (peak_count == 0 and 100 <= rise_pct <= 160) or \
+                   (peak_count >= 1 and last_peak >= 0 and price > prices[last_peak]):
+                    peak_count += 1
+                    idx[count] = i
+                    peak[count] = True
+                    number[count] = peak_count
+                    pct[count] = rise_pct
+                    count += 1
+                    last_peak = i
+    return idx[:count], peak[:count], number[:count], pct[:count]
+
+
+def _criteria_loop(prices, candidates, is_min, is_max, rise_min, rise_max, drop_min, drop_max):
+    """At most 6 dips and 5 tepe; criterion n applies to the n-th move (the last one repeats)"""
+    idx = np.empty(MAX_POINTS, dtype=np.int64)
+    peak = np.zeros(MAX_POINTS, dtype=np.bool_)
+    number = np.empty(MAX_POINTS, dtype=np.int64)
+    pct = np.empty(MAX_POINTS, dtype=np.float64)
+    count = 0
+    dip_count = 0
+    peak_count = 0
+    last_dip = -1
+    last_peak = -1
+    last_criterion = len(rise_min) - 1
+    for i in candidates:
+        for k in range(2):
+            if k == 0:
+                if not is_min[i]:
+                    continue
+                dip = True
+            else:
+                if not is_max[i]:
+                    continue
+                dip = is_min[i]
+            price = prices[i]
+            if dip:
+                if last_peak >= 0 and dip_count < 6:
+                    drop_pct = ((prices[last_peak] - price) / prices[last_peak]) * 100
+                    c = min(dip_count, last_criterion)
+                    if drop_min[c] <= drop_pct <= drop_max[c]:
+                        dip_count += 1
+                        idx[count] = i
+                        peak[count] = False
+                        number[count] = dip_count
+                        pct[count] = -drop_pct
+                        count += 1
+                        last_dip = i
+                elif last_dip < 0 and dip_count == 0:
+                    dip_count += 1
+                    idx[count] = i
+                    peak[count] = False
+                    number[count] = dip_count
+                    pct[count] = np.nan
+                    count += 1
+                    last_dip = i
+            elif last_dip >= 0 and peak_count < 5:
+                rise_pct = ((price - prices[last_dip]) / prices[last_dip]) * 100
+                c = min(peak_count, last_criterion)
+                if rise_min[c] <= rise_pct <= rise_max[c]:
+                    if peak_count == 0 or (last_peak >= 0 and price > prices[last_peak]):
+                        peak_count += 1
+                        idx[count] = i
+                        peak[count] = True
+                        number[count] = peak_count
+                        pct[count] = rise_pct
+                        count += 1
+                        last_peak = i
+    return idx[:count], peak[:count], number[:count], pct[:count]
+
+
+def _best_window_loop(ref_norm, target, step):
+    """
+    Start of the window most similar to ref_norm (-1 if none is > 0).
+    Early abandon: a window's squared distance is accumulated only until it
+    can no longer beat the best similarity so far.
+    """
+    w = len(ref_norm)
+    max_distance = np.sqrt(w)
+    best_start = -1
+    best_similarity = 0.0
+    for start in range(0, len(target) - w + 1, step):
+        low = np.inf
+        high = -np.inf
+        finite = True
+        for j in range(w):
+            x = target[start + j]
+            if np.isnan(x):
+                finite = False
+                break
+            if x < low:
+                low = x
+            if x > high:
+                high = x
+        if not finite:
+            continue
+        span = high - low
+        scale = 1.0 / span if span >= _FLAT_SPAN else 1.0
+        offset = low * scale
+        # Slightly loose bound: rounding never abandons a window that would win
+        bound = ((1.0 - best_similarity) * max_distance) ** 2 * (1.0 + 1e-9)
+        total = 0.0
+        for j in range(w):
+            d = (target[start + j] * scale - offset) - ref_norm[j]
+            total += d * d
+            if total > bound:
+                break
+        if total > bound:
+            continue
+        similarity = 1.0 - np.sqrt(total) / max_distance
+        if similarity > best_similarity:
+            best_similarity = similarity
+            best_start = start
+    return best_start
+
+
+# ---------------------------------------------------------------------------
+# NumPy versions of the loops that vectorize well
+
+def _extrema_numpy(prices, window):
+    n = len(prices)
+    is_min = np.zeros(n, dtype=bool)
+    is_max = np.zeros(n, dtype=bool)
+    if n > 2 * window:
+        neighbourhood = sliding_window_view(prices, 2 * window + 1)
+        center = prices[window:n - window]
+        # NaN anywhere in the neighbourhood makes both comparisons False, as in the loop
+        is_min[window:n - window] = center <= neighbourhood.min(axis=1)
+        is_max[window:n - window] = center >= neighbourhood.max(axis=1)
+    return is_min, is_max
+
+
+def _best_window_numpy(ref_norm, target, step):
+    """
+    One normalize + distance per window, in NumPy (normalize_prices
+    arithmetic); every window's min/max comes from one sliding_min_max pass
+    """
+    w = len(ref_norm)
+    max_distance = np.sqrt(w)
+    best_start = -1
+    best_similarity = 0
+    lows, highs = sliding_min_max(target, w)
+    for start in range(0, len(target) - w + 1, step):
+        window = target[start:start + w]
+        # A NaN low/span (NaN in the window) gives a NaN distance: never selected, as with nanmin
+        low = lows[start]
+        span = highs[start] - low
+        scale = 1.0 / span if span >= _FLAT_SPAN else 1.0
+        diff = (window * scale - low * scale) - ref_norm
+        similarity = max(0, 1 - np.sqrt(np.dot(diff, diff)) / max_distance)
+        if similarity > best_similarity:
+            best_similarity = similarity
+            best_start = start
+    return best_start
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+
+_python = SimpleNamespace(
+    name="python", extrema=_extrema_numpy, classic=_classic_loop, criteria=_criteria_loop,
+    best_window=_best_window_numpy,
+)
+_backend: Optional[SimpleNamespace] = None
+_lock = threading.Lock()
+
+
+def _compile() -> Optional[SimpleNamespace]:
+    if os.environ.get("ANALYSIS_JIT", "1") == "0":
+        return None
+    try:
+        import numba
+    except ImportError:
+        return None
+    try:
+        jit = numba.njit(cache=True, nogil=True, error_model="numpy")
+        compiled = SimpleNamespace(
+            name="numba", extrema=jit(_extrema_loop), classic=jit(_classic_loop), criteria=jit(_criteria_loop),
+            best_window=jit(_best_window_loop),
+        )
+        # Compile (or load from cache) now, so a failure falls back instead of surfacing mid-scan
+        prices = np.linspace(1.0, 2.0, 16)
+        is_min, is_max = compiled.extrema(prices, 5)
+        candidates = np.flatnonzero(is_min | is_max)
+        compiled.classic(prices, candidates, is_min, is_max, MAX_POINTS)
+        bounds = np.zeros(5)
+        compiled.criteria(prices, candidates, is_min, is_max, bounds, bounds, bounds, bounds)
+        compiled.best_window(prices[:4], prices, 1)
+        return compiled
+    except Exception as e:
+        logger.warning(f"Numba kernels unavailable, using Python: {e}")
+        return None
+
+
+def backend() -> SimpleNamespace:
+    """The active kernels (numba if it is installed and compiles, else Python); resolved once"""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _compile() or _python
+                logger.info(f"Analysis kernels: {_backend.name}")
+    return _backend
+
+
+def python_backend() -> SimpleNamespace:
+    return _python
+
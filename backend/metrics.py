@@ -0,0 +1,202 @@
+"""
+Prometheus metrics and per-request phase timers.
+
+MetricsMiddleware times every request and starts a phase recorder for it.
+Hot paths mark their work with `phase("fetch")` / `@timed_phase("score")`.
+Phases measure self time: when a phase starts inside another, the outer
+clock pauses, so the phases of a request never add up to more than its
+wall time. Totals are kept in a plain dict per request and observed into
+the histograms once, when the request ends. Scan worker processes record
+their own totals and return them with their results (scan_pool.py), so
+pooled scans are attributed too. Outside a request (CLI, benchmarks) a
+phase costs a single ContextVar lookup.
+
+Metrics are served by render() in the Prometheus text format. With
+PROMETHEUS_MULTIPROC_DIR set (one directory shared by all uvicorn
+workers), the values of all workers are aggregated.
+"""
+import functools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.multiprocess import MultiProcessCollector
+
+
+REQUEST_LATENCY = Histogram(
+    "bist_request_duration_seconds", "Request latency by endpoint",
+    ["method", "endpoint", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+PHASE_LATENCY = Histogram(
+    "bist_phase_duration_seconds", "Time per request spent in each phase (self time; summed over scan workers)",
+    ["endpoint", "phase"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SCANNED_SYMBOLS = Counter(
+    "bist_scan_symbols_total", "Symbols considered by universe scans, by outcome",
+    ["scan", "outcome"],  # scanned / matched / blocked / no_data / error
+)
+CACHE_REQUESTS = Counter(
+    "bist_cache_requests_total", "Cache lookups by result",
+    ["cache", "result"],  # hit / miss (/ stale for the price stores)
+)
+UPSTREAM_ERRORS = Counter(
+    "bist_upstream_errors_total", "Failed or empty market data downloads",
+    ["provider", "kind"],
+)
+
+
+# ---------------------------------------------------------------------------
+# Phase timers
+
+class _Recorder:
+    __slots__ = ("totals", "stack")
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+        # [phase, start of its current uninterrupted stretch]
+        self.stack = []
+
+
+_recorder: ContextVar[Optional[_Recorder]] = ContextVar("phase_recorder", default=None)
+
+
+@contextmanager
+def recording():
+    """Record phases in this context; yields the {phase: seconds} totals"""
+    recorder = _Recorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder.totals
+    finally:
+        _recorder.reset(token)
+
+
+@contextmanager
+def phase(name: str):
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    now = time.perf_counter()
+    stack = recorder.stack
+    if stack:
+        outer = stack[-1]
+        recorder.totals[outer[0]] = recorder.totals.get(outer[0], 0.0) + now - outer[1]
+    frame = [name, now]
+    stack.append(frame)
+    try:
+        yield
+    finally:
+        now = time.perf_counter()
+        recorder.totals[name] = recorder.totals.get(name, 0.0) + now - frame[1]
+        stack.pop()
+        if stack:
+            stack[-1][1] = now
+
+
+def timed_phase(name: str):
+    """Decorator form of phase()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder.get() is None:
+                return func(*args, **kwargs)
+            with phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_phases() -> Optional[Dict[str, float]]:
+    """Phase totals recorded so far in this context (None outside a request)"""
+    recorder = _recorder.get()
+    return None if recorder is None else dict(recorder.totals)
+
+
+def add_phases(totals: Dict[str, float]):
+    """Fold totals recorded elsewhere (a scan worker process) into the current request"""
+    recorder = _recorder.get()
+    if recorder is None:
+        return
+    for name, seconds in totals.items():
+        recorder.totals[name] = recorder.totals.get(name, 0.0) + seconds
+
+
+# ---------------------------------------------------------------------------
+# Middleware and exposition
+
+class MetricsMiddleware:
+    """ASGI middleware: request latency plus the request's phase totals"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        with recording() as totals:
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = scope.get("route")
+                endpoint = getattr(route, "path", None) or "unmatched"
+                REQUEST_LATENCY.labels(scope["method"], endpoint, str(status[0])).observe(elapsed)
+                for name, seconds in totals.items():
+                    PHASE_LATENCY.labels(endpoint, name).observe(seconds)
+                if totals:
+                    PHASE_LATENCY.labels(endpoint, "other").observe(max(0.0, elapsed - sum(totals.values())))
+
+
+def _registry():
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+class _CacheHitRatio:
+    """bist_cache_hit_ratio{cache} derived from the (possibly aggregated) lookup counters"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def collect(self):
+        counts: Dict[str, Dict[str, float]] = {}
+        for family in self.source.collect():
+            if family.name != "bist_cache_requests":
+                continue
+            for sample in family.samples:
+                if sample.name.endswith("_total"):
+                    by_result = counts.setdefault(sample.labels["cache"], {})
+                    by_result[sample.labels["result"]] = by_result.get(sample.labels["result"], 0.0) + sample.value
+        gauge = GaugeMetricFamily("bist_cache_hit_ratio", "Cache hits / lookups since start", labels=["cache"])
+        for cache, by_result in sorted(counts.items()):
+            total = sum(by_result.values())
+            if total:
+                gauge.add_metric([cache], by_result.get("hit", 0.0) / total)
+        yield gauge
+
+
+def render() -> tuple:
+    """(body, content type) of the Prometheus text exposition"""
+    registry = _registry()
+    derived = CollectorRegistry(auto_describe=False)
+    derived.register(_CacheHitRatio(registry))
+    return generate_latest(registry) + generate_latest(derived), CONTENT_TYPE_LATEST
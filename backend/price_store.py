@@ -0,0 +1,534 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorSeries, IndicatorSpec
+from metrics import CACHE_REQUESTS, UPSTREAM_ERRORS
+from range_stats import RangeStats
+from resample import BIST_TZ, ResampledSeries
+from series import PriceSeries, epoch_days
+from symbol_health import SymbolHealth
+
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+DAILY_HISTORY = timedelta(days=7 * 365)
+# Yahoo serves 1h bars for the last 730 days
+HOURLY_HISTORY = timedelta(days=729)
+# Symbols whose range statistics stay built (~45 kB per year of daily bars each)
+RANGE_STATS_SYMBOLS = int(os.environ.get("RANGE_STATS_SYMBOLS", "256"))
+DEFAULT_CACHE_DIR = Path(os.environ.get("PRICE_CACHE_DIR", Path(__file__).parent / ".price_cache"))
+
+
+def _clean_frame(df: pd.DataFrame, intraday: bool = False) -> pd.DataFrame:
+    """
+    Keep OHLCV columns on a tz-naive daily DatetimeIndex named 'Date', or for
+    intraday bars on an Europe/Istanbul DatetimeIndex named 'Datetime'
+    """
+    if df is None or df.empty:
+        index = pd.DatetimeIndex([], name="Datetime", tz=BIST_TZ) if intraday else pd.DatetimeIndex([], name="Date")
+        return pd.DataFrame(columns=OHLCV_COLUMNS, index=index, dtype="float64")
+    df = df[[c for c in OHLCV_COLUMNS if c in df.columns]].copy()
+    index = pd.DatetimeIndex(df.index)
+    if intraday:
+        index = index.tz_localize(BIST_TZ) if index.tz is None else index.tz_convert(BIST_TZ)
+        df.index = index.rename("Datetime")
+    else:
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        df.index = index.normalize().rename("Date")
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna(subset=["Close"]).astype("float64")
+
+
+def download_history(symbols: List[str], start: str, end: Optional[str] = None,
+                     interval: str = "1d") -> Dict[str, pd.DataFrame]:
+    """Download OHLCV for many symbols in a single yf.download call"""
+    if not symbols:
+        return {}
+    import yfinance as yf  # ~0.5 s to import; only the yfinance provider needs it
+
+    tickers = [f"{s}.IS" for s in symbols]
+    raw = yf.download(
+        tickers, start=start, end=end, interval=interval, group_by="ticker",
+        auto_adjust=True, actions=False, threads=True, progress=False
+    )
+    frames = {}
+    for symbol, ticker in zip(symbols, tickers):
+        try:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[ticker]
+            else:
+                df = raw
+            df = _clean_frame(df, intraday=interval != "1d")
+            if not df.empty:
+                frames[symbol] = df
+        except Exception as e:
+            logger.warning(f"Error parsing download for {ticker}: {e}")
+    return frames
+
+
+def _as_local(ts: Optional[pd.Timestamp]) -> Optional[pd.Timestamp]:
+    if ts is None:
+        return None
+    return ts.tz_localize(BIST_TZ) if ts.tzinfo is None else ts.tz_convert(BIST_TZ)
+
+
+def frame_version(df: pd.DataFrame) -> str:
+    """Content version of an OHLCV frame, deterministic across workers"""
+    if df.empty:
+        return "empty"
+    # Close sum catches retroactive (dividend/split) adjustments of older bars
+    key = f"{len(df)}|{df.index[0]}|{df.index[-1]}|{df.iloc[-1].tolist()}|{df['Close'].sum():.6f}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def quote_columns(symbols: List[str], close: np.ndarray, volume: np.ndarray, dates: pd.DatetimeIndex,
+                  missing: Optional[List[str]] = None) -> dict:
+    """
+    Quote payload from (dates x symbols) Close/Volume matrices with NaN where a
+    symbol has no bar: last price, previous close, daily change, volume, date.
+    """
+    if not symbols:
+        return {"symbols": [], "price": [], "prev_close": [], "change_percent": [],
+                "volume": [], "date": [], "missing": list(missing or [])}
+    n_rows = close.shape[0]
+    cols = np.arange(len(symbols))
+
+    # Last and previous valid row per column (columns have different trading days)
+    valid = ~np.isnan(close)
+    last_idx = n_rows - 1 - np.argmax(valid[::-1], axis=0)
+    valid[last_idx, cols] = False
+    has_prev = valid.any(axis=0)
+    prev_idx = np.where(has_prev, n_rows - 1 - np.argmax(valid[::-1], axis=0), last_idx)
+
+    price = close[last_idx, cols]
+    prev_close = close[prev_idx, cols]
+    change = (price - prev_close) / prev_close * 100
+    last_volume = np.nan_to_num(volume[last_idx, cols]).astype(np.int64)
+
+    return {
+        "symbols": list(symbols),
+        "price": np.round(price, 2).tolist(),
+        "prev_close": np.round(prev_close, 2).tolist(),
+        "change_percent": np.round(change, 2).tolist(),
+        "volume": last_volume.tolist(),
+        "date": list(dates[last_idx].strftime('%Y-%m-%d')),
+        "missing": list(missing or []),
+    }
+
+
+def merge_quotes(symbols: List[str], parts: Iterable[dict]) -> dict:
+    """Combine quote payloads for disjoint symbol sets, in `symbols` order"""
+    rows, missing = {}, set()
+    for part in parts:
+        keys = [k for k in part if k not in ("symbols", "missing")]
+        for i, symbol in enumerate(part["symbols"]):
+            rows[symbol] = {k: part[k][i] for k in keys}
+        missing.update(part["missing"])
+    available = [s for s in symbols if s in rows]
+    merged = {"symbols": available}
+    for key in ("price", "prev_close", "change_percent", "volume", "date"):
+        merged[key] = [rows[s][key] for s in available]
+    merged["missing"] = [s for s in symbols if s in missing]
+    return merged
+
+
+class PriceStore:
+    """
+    In-process OHLCV store keyed by symbol, for one source interval (1d or 1h).
+
+    Each symbol holds the last `history` of bars. Stale symbols are topped up
+    incrementally and many symbols are fetched in one batched download. An
+    aligned (date x symbol) panel of Close/Volume is rebuilt lazily whenever the
+    data changes, so cross-sectional queries are vectorized. Coarser intervals
+    (multi-hour, weekly, monthly) are aggregated locally and kept up to date
+    incrementally as new bars arrive. With a cache_dir, bars are persisted per
+    symbol and newer on-disk copies written by other processes are picked up.
+    Bars are fetched through `provider` (see providers.py), or yfinance if None;
+    symbols that keep coming back empty are parked by `health` instead of being
+    downloaded on every load. With a `shared` MongoBarStore, changed bars are
+    written through to MongoDB and a cold process loads fresh shared copies
+    instead of downloading them again.
+    """
+
+    def __init__(self, history: timedelta = DAILY_HISTORY, ttl: timedelta = timedelta(minutes=15),
+                 interval: str = "1d", cache_dir: Optional[Path] = None, provider=None,
+                 health: Optional[SymbolHealth] = None, shared=None):
+        self.history_window = history
+        self.provider = provider
+        self.health = health or SymbolHealth()
+        self.shared = shared
+        self.ttl = ttl
+        self.interval = interval
+        self.intraday = interval != "1d"
+        # Optional on-disk copy shared by all processes on the node (warm-up CLI, workers)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._fetched_at: Dict[str, datetime] = {}
+        self._data_versions: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._version = 0
+        self._panel_version = -1
+        self._panel: Dict[str, pd.DataFrame] = {}
+        # symbol -> interval -> {"series": ResampledSeries, "dirty": bool, "changed_from": Timestamp | None}
+        self._aggregates: Dict[str, Dict[str, dict]] = {}
+        # symbol -> (interval, IndicatorSpec) -> {"series": IndicatorSeries, "dirty": bool, "changed_from": ...}
+        self._indicators: Dict[str, Dict[tuple, dict]] = {}
+        # symbol -> (data version, RangeStats), least recently used first
+        self._range_stats: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def provider_name(self) -> str:
+        return getattr(self.provider, "name", "yfinance")
+
+    @property
+    def coverage_start(self) -> str:
+        return (datetime.now() - self.history_window).strftime('%Y-%m-%d')
+
+    def _is_fresh(self, symbol: str, now: datetime) -> bool:
+        fetched_at = self._fetched_at.get(symbol)
+        return fetched_at is not None and now - fetched_at < self.ttl
+
+    def put(self, symbol: str, df: pd.DataFrame, changed_from: Optional[pd.Timestamp] = None) -> bool:
+        """
+        Replace a symbol's bars. changed_from marks the first bar that may differ
+        from the previous frame (None = anything may have changed).
+        Returns False if the bars were unchanged.
+        """
+        df = _clean_frame(df, self.intraday)
+        with self._lock:
+            self._fetched_at[symbol] = datetime.now()
+            existing = self._frames.get(symbol)
+            if existing is not None and existing.equals(df):
+                return False
+            self._frames[symbol] = df
+            self._data_versions[symbol] = frame_version(df)
+            self._version += 1
+            for entry in [*self._aggregates.get(symbol, {}).values(), *self._indicators.get(symbol, {}).values()]:
+                if not entry["dirty"]:
+                    entry["changed_from"] = changed_from
+                elif entry["changed_from"] is not None and changed_from is not None:
+                    entry["changed_from"] = min(entry["changed_from"], changed_from)
+                else:
+                    entry["changed_from"] = None
+                entry["dirty"] = True
+            return True
+
+    def data_version(self, symbol: str) -> str:
+        """Version of a symbol's bars; changes whenever the stored data changes"""
+        self.load([symbol])
+        return self._data_versions[symbol]
+
+    def _merge(self, symbol: str, update: pd.DataFrame) -> tuple:
+        existing = self._frames.get(symbol)
+        changed_from = None
+        if existing is not None and not existing.empty and not update.empty:
+            changed_from = update.index.min()
+            update = pd.concat([existing, update])
+        elif existing is not None and not existing.empty:
+            update = existing
+        return self.put(symbol, update, changed_from), changed_from
+
+    def _cache_path(self, symbol: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / self.interval / f"{symbol}.pkl"
+
+    def _disk_mtime(self, symbol: str) -> Optional[datetime]:
+        path = self._cache_path(symbol)
+        if path is None or not path.exists():
+            return None
+        return datetime.fromtimestamp(path.stat().st_mtime)
+
+    def _load_from_disk(self, symbol: str) -> bool:
+        """Load bars written by another process (worker or warm-up CLI); False if none"""
+        mtime = self._disk_mtime(symbol)
+        if mtime is None:
+            return False
+        try:
+            df = pd.read_pickle(self._cache_path(symbol))
+        except Exception as e:
+            logger.warning(f"Unreadable cache file for {symbol}: {e}")
+            return False
+        self.put(symbol, df)
+        self._fetched_at[symbol] = mtime
+        return True
+
+    def _save(self, symbol: str):
+        path = self._cache_path(symbol)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        self._frames[symbol].to_pickle(tmp)
+        os.replace(tmp, path)  # atomic for concurrent readers
+        # Our own write is not "newer data from another process"
+        self._fetched_at[symbol] = datetime.fromtimestamp(path.stat().st_mtime)
+
+    def fetch(self, symbols: List[str], start: str, skip_blocked: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Download bars from `start` for many symbols in one provider call.
+        Symbols in the negative cache / with an open breaker are skipped unless
+        skip_blocked is False; every outcome is recorded in `health`.
+        """
+        if skip_blocked:
+            symbols = self.health.allowed(symbols)
+        if not symbols:
+            return {}
+        try:
+            if self.provider is not None:
+                frames = self.provider.download(symbols, start, interval=self.interval)
+            else:
+                frames = download_history(symbols, start, interval=self.interval)
+        except Exception as e:
+            UPSTREAM_ERRORS.labels(self.provider_name, type(e).__name__).inc()
+            for symbol in symbols:
+                self.health.record_failure(symbol, f"{type(e).__name__}: {e}")
+            raise
+        for symbol in symbols:
+            if symbol in frames and not frames[symbol].empty:
+                self.health.record_success(symbol)
+            else:
+                UPSTREAM_ERRORS.labels(self.provider_name, "empty").inc()
+                self.health.record_failure(symbol, "no data")
+        return frames
+
+    def ingest(self, symbols: Iterable[str], frames: Dict[str, pd.DataFrame], incremental: bool):
+        """
+        Store downloaded bars (full history or incremental top-up) and persist them.
+        Symbols absent from `frames` are stored empty on a full load, so dead
+        tickers are not refetched until the TTL expires.
+        """
+        symbols = list(symbols)
+        updates = {}
+        for symbol in symbols:
+            if incremental:
+                changed, changed_from = self._merge(symbol, frames.get(symbol, pd.DataFrame()))
+            else:
+                changed, changed_from = self.put(symbol, frames.get(symbol)), None
+            self._save(symbol)
+            if changed:
+                updates[symbol] = (self._frames[symbol], changed_from)
+        self._write_shared(updates, symbols)
+
+    def _write_shared(self, updates: dict, fetched: List[str]):
+        if self.shared is None or not self.shared.ready:
+            return
+        try:
+            self.shared.write(updates, fetched)
+        except Exception as e:
+            # A Mongo outage only costs sharing, never the request
+            logger.warning(f"Shared bar write failed ({self.interval}): {e}")
+
+    def _load_shared(self, symbols: List[str]):
+        """Adopt shared copies fetched more recently than ours (cold or stale symbols)"""
+        if not symbols or self.shared is None or not self.shared.ready:
+            return
+        try:
+            shared_at = self.shared.fetched_at(symbols)
+            newer = [s for s, at in shared_at.items() if s not in self._frames or at > self._fetched_at[s]]
+            frames = self.shared.read(newer, self.coverage_start) if newer else {}
+        except Exception as e:
+            logger.warning(f"Shared bar read failed ({self.interval}): {e}")
+            return
+        for symbol in newer:
+            self.put(symbol, frames.get(symbol))
+            self._save(symbol)
+            self._fetched_at[symbol] = shared_at[symbol]
+
+    def top_up_start(self, symbols: Iterable[str]) -> str:
+        """Start date for an incremental download covering all given symbols"""
+        # Re-fetch the last few days so a revised last bar replaces the cached one
+        last_dates = [self._frames[s].index.max() for s in symbols
+                      if s in self._frames and not self._frames[s].empty]
+        start = (min(last_dates) if last_dates else pd.Timestamp(self.coverage_start)) - pd.Timedelta(days=7)
+        if start.tzinfo is not None:
+            start = start.tz_localize(None)
+        return max(start, pd.Timestamp(self.coverage_start)).strftime('%Y-%m-%d')
+
+    def partition(self, symbols: Iterable[str]) -> tuple:
+        """
+        Split symbols into (missing, stale) after picking up any newer on-disk copies.
+        Fresh symbols are in neither list.
+        """
+        now = datetime.now()
+        missing, stale = [], []
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                mtime = self._disk_mtime(symbol)
+                if mtime is not None and (symbol not in self._frames or mtime > self._fetched_at[symbol]):
+                    self._load_from_disk(symbol)
+            self._load_shared([s for s in dict.fromkeys(symbols)
+                               if s not in self._frames or not self._is_fresh(s, now)])
+            for symbol in dict.fromkeys(symbols):
+                if symbol not in self._frames:
+                    missing.append(symbol)
+                elif not self._is_fresh(symbol, now):
+                    stale.append(symbol)
+        return missing, stale
+
+    def load(self, symbols: Iterable[str]):
+        """Fetch missing symbols in full and top up stale ones, one batched download each"""
+        symbols = list(symbols)
+        missing, stale = self.partition(symbols)
+        cache = f"price_store_{self.interval}"
+        CACHE_REQUESTS.labels(cache, "hit").inc(len(set(symbols)) - len(missing) - len(stale))
+        CACHE_REQUESTS.labels(cache, "miss").inc(len(missing))
+        CACHE_REQUESTS.labels(cache, "stale").inc(len(stale))
+        if missing:
+            frames = self.fetch(missing, self.coverage_start)
+            self.ingest(missing, frames, incremental=False)
+        if stale:
+            frames = self.fetch(stale, self.top_up_start(stale))
+            self.ingest(stale, frames, incremental=True)
+
+    def is_cached(self, symbol: str) -> bool:
+        """Fresh bars for the symbol are already in this process"""
+        return symbol in self._frames and self._is_fresh(symbol, datetime.now())
+
+    def get(self, symbol: str) -> pd.DataFrame:
+        """Full cached history for a symbol (loaded on demand)"""
+        self.load([symbol])
+        return self._frames[symbol]
+
+    def frame(self, symbol: str, start: Optional[pd.Timestamp] = None,
+              end: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        """Bars in [start, end) on the store's DatetimeIndex"""
+        df = self.get(symbol)
+        if self.intraday:
+            start = _as_local(start)
+            end = _as_local(end)
+        if start is not None:
+            df = df.loc[df.index >= start]
+        if end is not None:
+            df = df.loc[df.index < end]
+        return df
+
+    def resampled(self, symbol: str, interval: str) -> pd.DataFrame:
+        """
+        Bars aggregated to `interval` (e.g. 4h from hourly, 1wk/1mo from daily).
+        Aggregates are cached and only their trailing buckets are recomputed
+        when new bars arrive.
+        """
+        source = self.get(symbol)
+        with self._lock:
+            entries = self._aggregates.setdefault(symbol, {})
+            entry = entries.get(interval)
+            if entry is None:
+                entry = entries[interval] = {"series": ResampledSeries(interval), "dirty": True, "changed_from": None}
+            if entry["dirty"]:
+                entry["series"].update(source, entry["changed_from"])
+                entry["dirty"] = False
+                entry["changed_from"] = None
+            return entry["series"].frame
+
+    def bars(self, symbol: str, interval: str) -> pd.DataFrame:
+        """Full history at `interval`: the stored bars or their cached aggregate"""
+        return self.get(symbol) if interval == self.interval else self.resampled(symbol, interval)
+
+    def indicators(self, symbol: str, interval: str, specs: List[IndicatorSpec]) -> Dict[IndicatorSpec, dict]:
+        """
+        Indicator lines aligned with bars(symbol, interval). Each indicator is
+        kept per symbol/interval and only recomputed from the first changed bar
+        when new bars arrive.
+        """
+        self.load([symbol])
+        with self._lock:
+            # Read under the lock so a concurrent put() cannot slip between frame and dirty flag
+            frame = self.bars(symbol, interval)
+            entries = self._indicators.setdefault(symbol, {})
+            values = {}
+            for spec in specs:
+                entry = entries.get((interval, spec))
+                if entry is None:
+                    entry = entries[(interval, spec)] = {
+                        "series": IndicatorSeries(spec), "dirty": True, "changed_from": None,
+                    }
+                if entry["dirty"]:
+                    entry["series"].update(frame, entry["changed_from"])
+                    entry["dirty"] = False
+                    entry["changed_from"] = None
+                values[spec] = entry["series"].values
+            return values
+
+    def history(self, symbol: str, start_date: str, end_date: str) -> Optional[pd.DataFrame]:
+        """
+        Bars in [start_date, end_date) in the get_stock_data format, or None if
+        the range starts before the store's coverage.
+        """
+        if start_date < self.coverage_start:
+            return None
+        df = self.frame(symbol, pd.Timestamp(start_date), pd.Timestamp(end_date))
+        if df.empty:
+            return pd.DataFrame()
+        df = df.reset_index()
+        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+        return df
+
+    def series(self, symbol: str, start_date: str, end_date: str) -> Optional[PriceSeries]:
+        """
+        Daily closes in [start_date, end_date) as a PriceSeries (scan input;
+        no frame copy or date strings), or None like history().
+        """
+        if start_date < self.coverage_start:
+            return None
+        df = self.get(symbol)
+        if df.empty:
+            return PriceSeries.empty(symbol)
+        days = epoch_days(df.index)
+        lo, hi = np.searchsorted(days, epoch_days([start_date, end_date]))
+        return PriceSeries(symbol, days[lo:hi], df["Close"].to_numpy()[lo:hi])
+
+    def range_stats(self, symbol: str) -> RangeStats:
+        """
+        Prefix sums and min/max tables over the symbol's stored closes (daily
+        stores), built on first use and rebuilt when its bars change
+        """
+        version = self.data_version(symbol)
+        with self._lock:
+            entry = self._range_stats.get(symbol)
+            if entry is not None and entry[0] == version:
+                self._range_stats.move_to_end(symbol)
+                return entry[1]
+            df = self._frames[symbol]
+            stats = RangeStats(df["Close"].to_numpy(), epoch_days(df.index))
+            self._range_stats[symbol] = (version, stats)
+            self._range_stats.move_to_end(symbol)
+            while len(self._range_stats) > RANGE_STATS_SYMBOLS:
+                self._range_stats.popitem(last=False)
+            return stats
+
+    def panel(self, field: str) -> pd.DataFrame:
+        """Aligned (date x symbol) frame for one OHLCV field (built on first use per data version)"""
+        with self._lock:
+            if self._panel_version != self._version:
+                self._panel = {}
+                self._panel_version = self._version
+            if field not in self._panel:
+                frames = {s: df for s, df in self._frames.items() if not df.empty}
+                self._panel[field] = pd.DataFrame({s: df[field] for s, df in frames.items()}).sort_index()
+            return self._panel[field]
+
+    def quotes(self, symbols: List[str]) -> dict:
+        """
+        Last price, previous close, daily change and volume for many symbols in
+        one vectorized pass over the Close/Volume panel. Columnar payload.
+        """
+        self.load(symbols)
+        close_panel = self.panel("Close")
+        available = [s for s in symbols if s in close_panel.columns]
+        missing = [s for s in symbols if s not in close_panel.columns]
+        return quote_columns(available, close_panel[available].to_numpy(),
+                             self.panel("Volume")[available].to_numpy(), close_panel.index, missing)
@@ -0,0 +1,245 @@
+"""
+On-demand profiling of single requests (admin only).
+
+A request carrying `?profile=cpu` (or the `X-Profile: cpu` header) runs
+under cProfile; `memory` additionally traces allocations with tracemalloc.
+The caller must pass `authorize` (server.py checks the bearer token with
+require_admin); anyone else gets 403. The response is returned unchanged
+with an `X-Profile-Id` header, and the report is stored in PROFILE_DIR:
+
+    <id>.json       request, status, wall time, phases, top functions/allocations
+    <id>.txt        pstats listing (cumulative time)
+    <id>.prof       raw pstats dump (snakeviz, gprof2dot)
+    <id>.callgrind  callgrind format (kcachegrind / qcachegrind)
+
+cProfile follows the event loop thread, so while the profiled request
+awaits, other requests' coroutines are attributed to it as well. Work in
+to_thread() threads (and sync `def` endpoints) or in scan pool processes
+is not seen; their phase totals are (see metrics.py). Only one request
+per process is profiled at a time; a second profiled request gets 409.
+"""
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.responses import JSONResponse
+
+from metrics import current_phases
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", Path(__file__).parent / ".profiles"))
+PROFILE_FORMATS = {
+    "json": "application/json",
+    "txt": "text/plain; charset=utf-8",
+    "prof": "application/octet-stream",
+    "callgrind": "text/plain; charset=utf-8",
+}
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+
+def profile_mode(scope) -> Optional[str]:
+    """'cpu' / 'memory' when the request asks to be profiled, else None"""
+    value = None
+    for name, header in scope.get("headers", ()):
+        if name == b"x-profile":
+            value = header.decode("latin-1")
+    if value is None and b"profile=" in scope.get("query_string", b""):
+        value = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [None])[-1]
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ("", "0", "false", "off"):
+        return None
+    return "memory" if value in ("memory", "mem") else "cpu"
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtins
+        return name
+    return f"{filename}:{line}({name})"
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[dict]:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {"function": _label(func), "calls": nc, "self_s": round(tt, 6), "cumulative_s": round(ct, 6)}
+        for func, (cc, nc, tt, ct, callers) in rows
+    ]
+
+
+def to_callgrind(stats: pstats.Stats) -> str:
+    """pstats -> callgrind text (costs in microseconds)"""
+    callees = defaultdict(list)
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            # edge = (cc, nc, tt, ct) of `func` when called from `caller`
+            callees[caller].append((func, edge))
+
+    out = ["# callgrind format", "version: 1", "creator: bist profiling", "events: Microseconds", ""]
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        filename, line, name = func
+        out.append(f"fl={filename}")
+        out.append(f"fn={name}:{line}")
+        out.append(f"{line} {int(tt * 1e6)}")
+        for callee, edge in callees.get(func, ()):
+            out.append(f"cfl={callee[0]}")
+            out.append(f"cfn={callee[2]}:{callee[1]}")
+            out.append(f"calls={edge[1]} {callee[1]}")
+            out.append(f"{line} {int(edge[3] * 1e6)}")
+        out.append("")
+    return "\n".join(out)
+
+
+class ProfileStore:
+    """Reports on disk, newest `keep` kept"""
+
+    def __init__(self, directory: Path = DEFAULT_PROFILE_DIR, keep: int = 50):
+        self.directory = Path(directory)
+        self.keep = keep
+
+    def save(self, report: dict, stats: pstats.Stats):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        base = self.directory / report["id"]
+        listing = io.StringIO()
+        stats.stream = listing
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS * 2)
+        base.with_suffix(".txt").write_text(listing.getvalue())
+        stats.dump_stats(str(base.with_suffix(".prof")))
+        base.with_suffix(".callgrind").write_text(to_callgrind(stats))
+        # .json last: list() only shows complete reports
+        base.with_suffix(".json").write_text(json.dumps(report, indent=2))
+        self.prune()
+
+    def prune(self):
+        reports = sorted(self.directory.glob("*.json"))
+        for old in reports[: max(0, len(reports) - self.keep)]:
+            for fmt in PROFILE_FORMATS:
+                old.with_suffix(f".{fmt}").unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        """Newest first, without the function/allocation tables"""
+        if not self.directory.exists():
+            return []
+        reports = []
+        for path in sorted(self.directory.glob("*.json"), reverse=True):
+            try:
+                report = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            reports.append({k: v for k, v in report.items() if k not in ("functions", "allocations")})
+        return reports
+
+    def path(self, report_id: str, fmt: str = "json") -> Optional[Path]:
+        if fmt not in PROFILE_FORMATS or not report_id.replace("-", "").isalnum():
+            return None
+        path = self.directory / f"{report_id}.{fmt}"
+        return path if path.exists() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that ask for it (see module docstring)"""
+
+    def __init__(self, app, authorize: Callable[[Optional[str]], Awaitable[Optional[str]]],
+                 store: Optional[ProfileStore] = None):
+        self.app = app
+        # Authorization header -> admin email, or None to refuse
+        self.authorize = authorize
+        self.store = store or ProfileStore()
+        self._busy = False
+
+    async def __call__(self, scope, receive, send):
+        mode = profile_mode(scope) if scope["type"] == "http" else None
+        if mode is None:
+            await self.app(scope, receive, send)
+            return
+
+        authorization = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"authorization"), None)
+        admin = await self.authorize(authorization)
+        if admin is None:
+            await JSONResponse({"detail": "Admin access required"}, status_code=403)(scope, receive, send)
+            return
+        if self._busy:
+            await JSONResponse({"detail": "Another request is being profiled"}, status_code=409)(scope, receive, send)
+            return
+
+        report_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", report_id.encode())]
+            await send(message)
+
+        self._busy = True
+        trace_memory = mode == "memory" and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        elif mode == "memory":
+            tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot() if mode == "memory" else None
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.disable()
+                elapsed = time.perf_counter() - start
+                report = {
+                    "id": report_id,
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "mode": mode,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "query": scope.get("query_string", b"").decode("latin-1"),
+                    "user": admin,
+                    "status": status[0],
+                    "wall_s": round(elapsed, 6),
+                    "phases": {k: round(v, 6) for k, v in (current_phases() or {}).items()},
+                }
+                if before is not None:
+                    report.update(self._allocations(before))
+                if trace_memory:
+                    tracemalloc.stop()
+                stats = pstats.Stats(profiler)
+                report["functions"] = top_functions(stats)
+                try:
+                    await asyncio.to_thread(self.store.save, report, stats)
+                    logger.info(f"Profiled {scope['method']} {scope['path']} ({elapsed * 1000:.0f} ms): {report_id}")
+                except OSError as e:
+                    logger.warning(f"Could not store profile {report_id}: {e}")
+        finally:
+            self._busy = False
+
+    @staticmethod
+    def _allocations(before) -> dict:
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        diff = after.compare_to(before, "lineno")
+        return {
+            "memory": {"traced_current_bytes": current, "traced_peak_bytes": peak},
+            "allocations": [
+                {"location": str(stat.traceback), "size_diff_bytes": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in diff[:TOP_ALLOCATIONS]
+            ],
+        }
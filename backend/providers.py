@@ -0,0 +1,318 @@
+"""
+Market data providers.
+
+All price and metadata access (price stores, warm-up, candle fallbacks, the
+symbol registry) goes through a MarketDataProvider chosen by the
+MARKET_DATA_PROVIDER environment variable:
+
+    yfinance     yf.download / yf.Ticker (default)
+    yahoo_chart  async pooled chart client (yahoo_chart.py)
+    local        bars persisted in the price cache (PRICE_CACHE_DIR), no network
+    replay       recorded fixtures in MARKET_DATA_DIR (CSV or chart JSON), no network
+    synthetic    deterministic random-walk universe (SYNTHETIC_SYMBOLS, SYNTHETIC_SEED)
+
+The offline providers make scans and benchmarks reproducible without Yahoo.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import DEFAULT_CACHE_DIR, _clean_frame, download_history
+from resample import BIST_TZ
+from symbol_registry import BIST_100_SYMBOLS, dedupe_symbols, fetch_symbol_metadata
+
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_NAMES = ("yfinance", "yahoo_chart", "local", "replay", "synthetic")
+
+
+class MarketDataProvider:
+    """
+    Base interface. Subclasses implement download(); history() and metadata()
+    are derived from it unless the source has something better.
+    Frames are cleaned OHLCV bars (see price_store._clean_frame).
+    """
+    name = "base"
+
+    def universe(self) -> Optional[List[str]]:
+        """Symbols this provider defines (None = use the BIST symbol list)"""
+        return None
+
+    def download(self, symbols: List[str], start: str, end: Optional[str] = None,
+                 interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """Bars in [start, end) for many symbols; symbols without data are left out"""
+        raise NotImplementedError
+
+    def history(self, symbol: str, start: str, end: Optional[str] = None, interval: str = "1d") -> pd.DataFrame:
+        frames = self.download([symbol], start, end, interval)
+        return frames.get(symbol, _clean_frame(None, intraday=interval != "1d"))
+
+    def metadata(self, symbol: str) -> dict:
+        """Registry metadata (name, sector, market cap, status, first/last bar) from the bars alone"""
+        df = self.history(symbol, "1970-01-01")
+        return {
+            "symbol": symbol,
+            "name": symbol,
+            "sector": "N/A",
+            "market_cap": None,
+            "status": "active" if not df.empty else "inactive",
+            "first_bar_date": df.index[0].strftime('%Y-%m-%d') if not df.empty else None,
+            "last_bar_date": df.index[-1].strftime('%Y-%m-%d') if not df.empty else None,
+        }
+
+
+class YFinanceProvider(MarketDataProvider):
+    name = "yfinance"
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        return download_history(symbols, start, end, interval)
+
+    def metadata(self, symbol):
+        return fetch_symbol_metadata(symbol)
+
+
+class YahooChartProvider(MarketDataProvider):
+    """
+    Chart-endpoint client behind the blocking provider interface. Requests run
+    on a private event loop thread so one pooled session serves every caller,
+    including sync code running inside the server's own loop.
+    """
+    name = "yahoo_chart"
+
+    def __init__(self, **client_options):
+        from yahoo_chart import YahooChartClient
+
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name="yahoo-chart", daemon=True).start()
+        # The client's semaphores must be created on the loop that uses them
+        self.client = asyncio.run_coroutine_threadsafe(
+            self._create(YahooChartClient, client_options), self._loop
+        ).result()
+
+    @staticmethod
+    async def _create(client_cls, options):
+        return client_cls(**options)
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        if not symbols:
+            return {}
+        return self._run(self.client.history_many(symbols, start, end, interval))
+
+    def close(self):
+        self._run(self.client.aclose())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def _slice(df: pd.DataFrame, start, end, intraday: bool) -> pd.DataFrame:
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+    if intraday:
+        start = start.tz_localize(BIST_TZ) if start is not None else None
+        end = end.tz_localize(BIST_TZ) if end is not None else None
+    if start is not None:
+        df = df.loc[df.index >= start]
+    if end is not None:
+        df = df.loc[df.index < end]
+    return df
+
+
+class LocalStoreProvider(MarketDataProvider):
+    """Serves the bars persisted by PriceStore / warmup.py ({cache_dir}/{interval}/{symbol}.pkl)"""
+    name = "local"
+
+    def __init__(self, cache_dir: Path = DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+
+    def universe(self):
+        symbols = sorted(p.stem for p in (self.cache_dir / "1d").glob("*.pkl"))
+        return symbols or None
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        intraday = interval != "1d"
+        frames = {}
+        for symbol in symbols:
+            path = self.cache_dir / interval / f"{symbol}.pkl"
+            if not path.exists():
+                continue
+            df = _slice(_clean_frame(pd.read_pickle(path), intraday), start, end, intraday)
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded fixtures from a directory, per interval:
+    {root}/{interval}/{symbol}.csv (written by record_fixtures) or a raw chart
+    response {root}/yahoo_chart_{symbol}.IS.json (daily bars).
+    """
+    name = "replay"
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._cache: Dict[tuple, pd.DataFrame] = {}
+
+    def universe(self):
+        symbols = {p.stem for p in (self.root / "1d").glob("*.csv")}
+        symbols |= {p.name[len("yahoo_chart_"):-len(".IS.json")] for p in self.root.glob("yahoo_chart_*.IS.json")}
+        return sorted(symbols) or None
+
+    def _load(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        key = (symbol, interval)
+        if key not in self._cache:
+            intraday = interval != "1d"
+            csv_path = self.root / interval / f"{symbol}.csv"
+            chart_path = self.root / f"yahoo_chart_{symbol}.IS.json"
+            if csv_path.exists():
+                df = pd.read_csv(csv_path, index_col=0, parse_dates=True)
+            elif chart_path.exists() and not intraday:
+                from yahoo_chart import parse_chart
+                df = parse_chart(json.loads(chart_path.read_text()))
+            else:
+                df = None
+            self._cache[key] = _clean_frame(df, intraday) if df is not None else None
+        return self._cache[key]
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        frames = {}
+        for symbol in symbols:
+            df = self._load(symbol, interval)
+            if df is None:
+                continue
+            df = _slice(df, start, end, interval != "1d")
+            if not df.empty:
+                frames[symbol] = df
+        return frames
+
+
+def record_fixtures(provider: MarketDataProvider, symbols: Iterable[str], start: str,
+                    root: Path, end: Optional[str] = None, interval: str = "1d") -> List[str]:
+    """Save a provider's bars as ReplayProvider fixtures; returns the recorded symbols"""
+    target = Path(root) / interval
+    target.mkdir(parents=True, exist_ok=True)
+    frames = provider.download(dedupe_symbols(symbols), start, end, interval)
+    for symbol, df in frames.items():
+        df.to_csv(target / f"{symbol}.csv")
+    return sorted(frames)
+
+
+SYNTHETIC_SECTORS = ["Banka", "Sanayi", "Enerji", "Perakende", "Teknoloji", "Ulaştırma", "Gayrimenkul", "Holding"]
+
+
+class SyntheticProvider(MarketDataProvider):
+    """
+    Deterministic random-walk universe. Every symbol (listed or not) gets a
+    geometric random walk seeded by (seed, symbol) and generated from a fixed
+    origin, so a given bar is identical whatever range or universe size is asked.
+    The universe is the first n_symbols BIST symbols, padded with SYN0001...
+    """
+    name = "synthetic"
+
+    def __init__(self, n_symbols: int = 100, seed: int = 42, origin: str = "2015-01-01"):
+        listed = dedupe_symbols(BIST_100_SYMBOLS)[:n_symbols]
+        self._symbols = listed + [f"SYN{i:04d}" for i in range(1, n_symbols - len(listed) + 1)]
+        self.seed = seed
+        self.origin = pd.Timestamp(origin)
+        self._frames: Dict[tuple, pd.DataFrame] = {}
+        self._lock = threading.Lock()
+
+    def universe(self):
+        return list(self._symbols)
+
+    def _rng(self, symbol: str, stream: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode()), stream])
+
+    def _bars(self, symbol: str, intraday: bool, end: pd.Timestamp) -> pd.DataFrame:
+        days = pd.bdate_range(self.origin, end)
+        if intraday:
+            index = (days.repeat(9) + pd.to_timedelta(np.tile(np.arange(10, 19), len(days)), unit="h"))
+            index = index.tz_localize(BIST_TZ)
+            periods_per_day = 9
+        else:
+            index = days
+            periods_per_day = 1
+        n = len(index)
+
+        params = self._rng(symbol, 0)
+        vol = params.uniform(0.012, 0.035) / np.sqrt(periods_per_day)
+        drift = params.uniform(-0.0002, 0.0006) / periods_per_day
+        start_price = params.uniform(5, 400)
+        # Slowly varying trend regimes give the pivot detectors real swings to find
+        regime = np.repeat(params.normal(0, vol / 2, n // (20 * periods_per_day) + 1), 20 * periods_per_day)[:n]
+
+        rng = self._rng(symbol, 1 if intraday else 2)
+        returns = drift + regime + vol * rng.standard_normal(n)
+        close = start_price * np.exp(np.cumsum(returns))
+        open_ = np.r_[start_price, close[:-1]] * np.exp(vol * 0.3 * rng.standard_normal(n))
+        spread = np.abs(vol * rng.standard_normal((2, n)))
+        high = np.maximum(open_, close) * (1 + spread[0])
+        low = np.minimum(open_, close) * (1 - spread[1])
+        volume = np.round(rng.lognormal(13, 0.6, n) / periods_per_day)
+        return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume},
+                            index=index.rename("Datetime" if intraday else "Date"))
+
+    def _frame(self, symbol: str, interval: str) -> pd.DataFrame:
+        today = pd.Timestamp(datetime.now().date())
+        with self._lock:
+            generated = self._frames.get((symbol, interval))
+            if generated is None or generated[0] != today:
+                generated = self._frames[(symbol, interval)] = (today, self._bars(symbol, interval != "1d", today))
+            return generated[1]
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        frames = {s: _slice(self._frame(s, interval), start, end, interval != "1d") for s in symbols}
+        return {s: df for s, df in frames.items() if not df.empty}
+
+    def metadata(self, symbol):
+        meta = super().metadata(symbol)
+        params = self._rng(symbol, 3)
+        shares = params.integers(50_000_000, 5_000_000_000)
+        close = self._frame(symbol, "1d")["Close"].iloc[-1]
+        meta.update({
+            "name": f"{symbol} (synthetic)",
+            "sector": SYNTHETIC_SECTORS[params.integers(len(SYNTHETIC_SECTORS))],
+            "market_cap": int(close * shares),
+        })
+        return meta
+
+
+def create_provider(name: str, **options) -> MarketDataProvider:
+    if name == "yfinance":
+        return YFinanceProvider()
+    if name == "yahoo_chart":
+        return YahooChartProvider(**options)
+    if name == "local":
+        return LocalStoreProvider(options.get("root", DEFAULT_CACHE_DIR))
+    if name == "replay":
+        return ReplayProvider(options["root"])
+    if name == "synthetic":
+        return SyntheticProvider(options.get("n_symbols", 100), options.get("seed", 42))
+    raise ValueError(f"Unknown market data provider: {name} (expected one of {', '.join(PROVIDER_NAMES)})")
+
+
+def provider_from_env() -> MarketDataProvider:
+    name = os.environ.get("MARKET_DATA_PROVIDER", "yfinance")
+    options = {}
+    if name in ("local", "replay") and os.environ.get("MARKET_DATA_DIR"):
+        options["root"] = Path(os.environ["MARKET_DATA_DIR"])
+    elif name == "replay":
+        raise ValueError("MARKET_DATA_PROVIDER=replay needs MARKET_DATA_DIR")
+    if name == "synthetic":
+        options["n_symbols"] = int(os.environ.get("SYNTHETIC_SYMBOLS", "100"))
+        options["seed"] = int(os.environ.get("SYNTHETIC_SEED", "42"))
+    provider = create_provider(name, **options)
+    logger.info(f"Market data provider: {provider.name}")
+    return provider
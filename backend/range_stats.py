@@ -0,0 +1,116 @@
+"""
+Constant-time range statistics over one symbol's daily closes.
+
+RangeStats keeps, next to the stored history (see PriceStore.range_stats):
+
+    sums / squares   prefix sums of (close - shift) and (close - shift)**2
+    mins / maxs      sparse tables: level k holds the min/max of every run
+                     of 2**k closes
+
+so the count, mean, std, min and max of any bar range [lo, hi) cost a few
+array reads instead of a pass over the range. Min and max are exact. Mean
+and std come from differences of prefix sums; they agree with NumPy's
+pairwise reductions to ~1e-12 relative, well below the two decimals the API
+reports. The sums are taken around the first close (`shift`) so a sum of
+squares does not swallow the variance of prices far from zero.
+
+sliding_min_max gives the min/max of every fixed-width window at once from
+the same doubling construction (used by the window search in kernels.py).
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from series import epoch_days
+
+
+def _doubling(values: np.ndarray, levels: int, reduce) -> list:
+    """[values, runs of 2, runs of 4, ...]: level k has len(values) - 2**k + 1 entries"""
+    table = [values]
+    for k in range(1, levels):
+        half = 1 << (k - 1)
+        prev = table[-1]
+        table.append(reduce(prev[:-half], prev[half:]))
+    return table
+
+
+def sliding_min_max(values: np.ndarray, width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Min and max of values[i:i + width] for every start i (NaN propagates,
+    unlike np.nanmin). O(n log width) instead of O(n * width).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values) - width + 1
+    if width < 1 or count < 1:
+        return np.empty(0), np.empty(0)
+    k = width.bit_length() - 1
+    mins = _doubling(values, k + 1, np.minimum)[k]
+    maxs = _doubling(values, k + 1, np.maximum)[k]
+    tail = width - (1 << k)
+    return np.minimum(mins[:count], mins[tail:tail + count]), np.maximum(maxs[:count], maxs[tail:tail + count])
+
+
+class RangeStats:
+    """Prefix sums and min/max sparse tables of a finite float series"""
+
+    __slots__ = ("days", "shift", "sums", "squares", "mins", "maxs")
+
+    def __init__(self, values: np.ndarray, days: Optional[np.ndarray] = None):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        self.days = days
+        self.shift = float(values[0]) if n else 0.0
+        shifted = values - self.shift
+        self.sums = np.concatenate(([0.0], np.cumsum(shifted)))
+        self.squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+        levels = n.bit_length()
+        self.mins = _doubling(values, levels, np.minimum)
+        self.maxs = _doubling(values, levels, np.maximum)
+
+    def __len__(self) -> int:
+        return len(self.sums) - 1
+
+    def locate(self, start_date: str, end_date: str) -> Tuple[int, int]:
+        """Bar range [lo, hi) of the dates in [start_date, end_date) (needs days)"""
+        lo, hi = np.searchsorted(self.days, epoch_days([start_date, end_date]))
+        return int(lo), int(hi)
+
+    def _level(self, lo: int, hi: int) -> Tuple[int, int]:
+        if not 0 <= lo < hi <= len(self):
+            raise IndexError(f"empty or out of range: [{lo}, {hi})")
+        k = (hi - lo).bit_length() - 1
+        return k, hi - (1 << k)
+
+    def min(self, lo: int, hi: int) -> float:
+        k, tail = self._level(lo, hi)
+        return float(min(self.mins[k][lo], self.mins[k][tail]))
+
+    def max(self, lo: int, hi: int) -> float:
+        k, tail = self._level(lo, hi)
+        return float(max(self.maxs[k][lo], self.maxs[k][tail]))
+
+    def mean(self, lo: int, hi: int) -> float:
+        self._level(lo, hi)
+        return float(self.shift + (self.sums[hi] - self.sums[lo]) / (hi - lo))
+
+    def std(self, lo: int, hi: int) -> float:
+        """Population std (ddof=0, as ndarray.std)"""
+        self._level(lo, hi)
+        n = hi - lo
+        mean = (self.sums[hi] - self.sums[lo]) / n
+        variance = (self.squares[hi] - self.squares[lo]) / n - mean * mean
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def summary(self, lo: int, hi: int) -> dict:
+        """analyze_stock summary of bars [lo, hi)"""
+        mean = self.mean(lo, hi)
+        values = self.mins[0]
+        first, last = values[lo], values[hi - 1]
+        return {
+            "min_price": round(self.min(lo, hi), 2),
+            "max_price": round(self.max(lo, hi), 2),
+            "avg_price": round(mean, 2),
+            "volatility": round(self.std(lo, hi) / mean * 100, 2),
+            "total_return": round(float((last - first) / first * 100), 2),
+            "data_points": hi - lo,
+        }
@@ -0,0 +1,141 @@
+import re
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+BIST_TZ = "Europe/Istanbul"
+# Continuous trading session (local time); pre-open and closing-auction prints are
+# folded into the first/last bucket of the day so buckets never cross sessions.
+SESSION_OPEN_MINUTES = 10 * 60
+SESSION_CLOSE_MINUTES = 18 * 60
+
+_INTERVAL_RE = re.compile(r"^(\d+)(h|d|wk|mo)$")
+# Monday 1970-01-05 is epoch day 4
+_EPOCH_MONDAY = 4
+_NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+def parse_interval(interval: str) -> Tuple[str, int]:
+    """'4h' -> ('h', 4), '1wk' -> ('wk', 1), '1mo' -> ('mo', 1)"""
+    match = _INTERVAL_RE.match(interval)
+    if not match or int(match.group(1)) < 1:
+        raise ValueError(f"Unsupported interval: {interval}")
+    unit, n = match.group(2), int(match.group(1))
+    if unit == "h" and n * 60 > SESSION_CLOSE_MINUTES - SESSION_OPEN_MINUTES:
+        raise ValueError(f"Intraday interval longer than a session: {interval}")
+    return unit, n
+
+
+def _local_wall_time(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    if index.tz is not None:
+        return index.tz_convert(BIST_TZ).tz_localize(None)
+    return index
+
+
+def bucket_keys(index: pd.DatetimeIndex, interval: str) -> Tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Bucket key and bucket label (start time) for every bar.
+    Keys are non-decreasing for a sorted index, so buckets are contiguous runs.
+    """
+    unit, n = parse_interval(interval)
+    local = _local_wall_time(pd.DatetimeIndex(index))
+    ns = local.asi8
+    days = ns // _NS_PER_DAY
+
+    if unit == "h":
+        minutes = (ns - days * _NS_PER_DAY) // 60_000_000_000
+        max_slot = (SESSION_CLOSE_MINUTES - SESSION_OPEN_MINUTES - 1) // (60 * n)
+        slots = np.clip((minutes - SESSION_OPEN_MINUTES) // (60 * n), 0, max_slot)
+        keys = days * 100 + slots
+        label_ns = days * _NS_PER_DAY + (SESSION_OPEN_MINUTES + slots * 60 * n) * 60_000_000_000
+    elif unit == "d":
+        keys = days // n
+        label_ns = keys * n * _NS_PER_DAY
+    elif unit == "wk":
+        keys = (days - _EPOCH_MONDAY) // (7 * n)
+        label_ns = (keys * 7 * n + _EPOCH_MONDAY) * _NS_PER_DAY
+    else:
+        years = local.year.to_numpy().astype(np.int64)
+        months = local.month.to_numpy().astype(np.int64)
+        keys = (years * 12 + months - 1) // n
+        month_index = keys * n
+        label_ns = pd.to_datetime(pd.DataFrame({
+            "year": month_index // 12, "month": month_index % 12 + 1, "day": 1
+        })).to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    labels = pd.DatetimeIndex(np.asarray(label_ns, dtype="datetime64[ns]"))
+    if index.tz is not None:
+        labels = labels.tz_localize(BIST_TZ)
+    return np.asarray(keys), labels
+
+
+def bucket_span(interval: str) -> pd.Timedelta:
+    """Upper bound on the time covered by one bucket"""
+    unit, n = parse_interval(interval)
+    return {"h": pd.Timedelta(days=1), "d": pd.Timedelta(days=n),
+            "wk": pd.Timedelta(days=7 * n), "mo": pd.Timedelta(days=31 * n)}[unit]
+
+
+def _aggregate(df: pd.DataFrame, interval: str) -> Tuple[pd.DataFrame, Optional[pd.Timestamp]]:
+    """Vectorized OHLCV aggregation; also returns the first source bar of the last bucket"""
+    if df.empty:
+        return df.copy(), None
+    keys, labels = bucket_keys(df.index, interval)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(keys)] - 1
+
+    high = df["High"].to_numpy(dtype=np.float64)
+    low = df["Low"].to_numpy(dtype=np.float64)
+    volume = np.nan_to_num(df["Volume"].to_numpy(dtype=np.float64))
+    out = pd.DataFrame({
+        "Open": df["Open"].to_numpy(dtype=np.float64)[starts],
+        "High": np.fmax.reduceat(high, starts),
+        "Low": np.fmin.reduceat(low, starts),
+        "Close": df["Close"].to_numpy(dtype=np.float64)[ends],
+        "Volume": np.add.reduceat(volume, starts),
+    }, index=labels[starts].rename(df.index.name))
+    return out, df.index[starts[-1]]
+
+
+def resample_ohlcv(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """Aggregate OHLCV bars into `interval` buckets following BIST session boundaries"""
+    return _aggregate(df, interval)[0]
+
+
+class ResampledSeries:
+    """
+    Aggregated view of a source OHLCV frame that is updated incrementally.
+
+    Only the buckets touched by new or revised source bars are recomputed:
+    `update(source, changed_from)` re-aggregates source bars from the start of
+    the bucket containing min(changed_from, start of the current last bucket).
+    """
+
+    __slots__ = ("interval", "frame", "_tail_start")
+
+    def __init__(self, interval: str):
+        parse_interval(interval)
+        self.interval = interval
+        self.frame = pd.DataFrame()
+        self._tail_start: Optional[pd.Timestamp] = None
+
+    def update(self, source: pd.DataFrame, changed_from: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+        if self.frame.empty or changed_from is None or self._tail_start is None:
+            self.frame, self._tail_start = _aggregate(source, self.interval)
+            return self.frame
+
+        cut = min(self._tail_start, changed_from)
+        cut_key = bucket_keys(pd.DatetimeIndex([cut]), self.interval)[0][0]
+        window = source.loc[source.index >= cut - bucket_span(self.interval)]
+        window_keys = bucket_keys(window.index, self.interval)[0]
+        tail = window.loc[window_keys >= cut_key]
+        kept_keys = bucket_keys(self.frame.index, self.interval)[0]
+        kept = self.frame.loc[kept_keys < cut_key]
+
+        tail_frame, tail_start = _aggregate(tail, self.interval)
+        self.frame = pd.concat([kept, tail_frame]) if not kept.empty else tail_frame
+        if tail_start is not None:
+            self._tail_start = tail_start
+        return self.frame
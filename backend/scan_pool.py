@@ -0,0 +1,148 @@
+"""
+Process pool for CPU-bound universe scans (find-similar, advanced-pattern,
+search-by-pattern).
+
+The symbol list is cut into contiguous chunks, each chunk runs in a worker
+process, and the parent merges the per-chunk top-k lists. Nothing but symbol
+names, scan parameters and small result dicts is pickled: every worker
+attaches to the memory-mapped shared panel (shared_panel.py) once and slices
+closes straight out of the page cache, so all workers of all uvicorn
+processes read one copy of the data.
+
+Workers are started with "spawn": the API process runs an event loop and
+several threads, which fork would copy in an undefined state.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import kernels
+from analysis import SCAN_KERNELS, rank_results
+from metrics import SCANNED_SYMBOLS, add_phases, phase, recording
+from shared_panel import DEFAULT_PANEL_DIR, SharedPanel
+
+
+logger = logging.getLogger(__name__)
+
+# Chunks per worker; more than one evens out symbols with longer histories
+CHUNKS_PER_WORKER = 4
+
+# Worker-process state, set by _init_worker
+_panel: Optional[SharedPanel] = None
+
+
+def _init_worker(panel_dir: str):
+    global _panel
+    _panel = SharedPanel(Path(panel_dir))
+    # Compile / load the numba kernels before the first chunk arrives
+    kernels.backend()
+
+
+def _ping() -> bool:
+    return True
+
+
+def scan_chunk(kind: str, params: dict, symbols: List[str], start_date: str, end_date: str,
+               limit: int, panel: Optional[SharedPanel] = None) -> dict:
+    """
+    Run one scan kernel over panel symbols. Returns the chunk's top `limit`
+    results, its phase timings and per-outcome symbol counts. Raises if no
+    panel is attached, so the caller can rescan elsewhere.
+    """
+    snapshot = (panel or _panel).current()
+    if snapshot is None:
+        raise RuntimeError("shared panel is not published")
+    kernel = SCAN_KERNELS[kind]
+    results = []
+    outcomes = dict.fromkeys(("scanned", "no_data", "error"), 0)
+    with recording() as phases:
+        for symbol in symbols:
+            if symbol not in snapshot:
+                outcomes["no_data"] += 1
+                continue
+            try:
+                with phase("fetch"):
+                    series = snapshot.close_series(symbol, start_date, end_date)
+                if series.is_empty:
+                    outcomes["no_data"] += 1
+                    continue
+                result = kernel(symbol, series.close, series.dates, **params)
+            except Exception as e:
+                logger.warning(f"Error processing {symbol}: {e}")
+                outcomes["error"] += 1
+                continue
+            outcomes["scanned"] += 1
+            if result is not None:
+                results.append(result)
+    outcomes["matched"] = len(results)
+    return {"results": rank_results(results, kind, limit), "phases": phases, "outcomes": outcomes}
+
+
+class ScanPool:
+    """Worker processes attached to the shared panel at `panel_dir`"""
+
+    def __init__(self, workers: int, panel_dir: Path = DEFAULT_PANEL_DIR):
+        self.workers = workers
+        self.panel_dir = Path(panel_dir)
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(str(self.panel_dir),),
+        )
+
+    def warm(self):
+        """Start all workers now instead of on the first scan (spawn + imports take a while)"""
+        for _ in range(self.workers):
+            self._executor.submit(_ping)
+
+    def chunks(self, symbols: List[str]) -> List[List[str]]:
+        if not symbols:
+            return []
+        size = -(-len(symbols) // min(len(symbols), self.workers * CHUNKS_PER_WORKER))
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    async def scan(self, kind: str, params: dict, symbols: List[str], start_date: str, end_date: str,
+                   limit: int) -> Tuple[List[dict], List[str]]:
+        """
+        Scan panel symbols across the pool. Returns the per-chunk top-k results
+        (unmerged) and the symbols of chunks that failed, for the caller to scan
+        in-process. Worker phase timings and symbol counts go to the metrics.
+        """
+        loop = asyncio.get_running_loop()
+
+        async def run(chunk: List[str]) -> dict:
+            # submit() itself raises once the pool is broken; gather collects that too
+            return await loop.run_in_executor(
+                self._executor, scan_chunk, kind, params, chunk, start_date, end_date, limit
+            )
+
+        chunks = self.chunks(symbols)
+        parts = await asyncio.gather(*(run(chunk) for chunk in chunks), return_exceptions=True)
+        results, unscanned = [], []
+        broken = False
+        for chunk, part in zip(chunks, parts):
+            if isinstance(part, BaseException):
+                logger.warning(f"Scan chunk of {len(chunk)} symbols failed: {part!r}")
+                broken = broken or isinstance(part, BrokenProcessPool)
+                unscanned.extend(chunk)
+            else:
+                results.extend(part["results"])
+                add_phases(part["phases"])
+                for outcome, count in part["outcomes"].items():
+                    SCANNED_SYMBOLS.labels(kind, outcome).inc(count)
+        if broken:
+            # A worker died (e.g. OOM-killed); the executor refuses all further work
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+        return results, unscanned
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
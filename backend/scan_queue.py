@@ -0,0 +1,303 @@
+"""
+Distributed scan fan-out over MongoDB.
+
+A large scan (e.g. a scan kernel over the full universe) is submitted as a
+job in `scan_jobs` and split into symbol-range tasks in `scan_tasks`. Every
+API worker on every node runs `run_worker`: it claims the oldest available
+task with one find_one_and_update (status pending, or a leased task whose
+lease has expired) and runs it through the local scan path. While the task
+runs, the worker extends its lease; if the lease is lost the local run is
+cancelled. It then writes the task's top-k results back. The write is fenced
+on the lease owner, so a worker that lost its lease cannot overwrite the
+results of the worker that reclaimed it.
+
+`run_coordinator` (also on every worker; every step is idempotent) fails
+tasks that expired `max_attempts` times, e.g. symbols that keep crashing
+workers. It also merges finished jobs: per-task top-k lists are ranked
+together, with universe order as the tie-break. Finished jobs and their
+tasks are deleted `retention` after they finish.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+import numpy as np
+from pymongo import ReturnDocument
+
+from analysis import SCAN_KERNELS, rank_results
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def split_tasks(symbols: List[str], size: int) -> List[List[str]]:
+    """Contiguous symbol ranges of at most `size` symbols"""
+    return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+
+def kernel_params(kind: str) -> List[str]:
+    """Parameter names a scan kernel takes after (symbol, prices, dates)"""
+    return list(inspect.signature(SCAN_KERNELS[kind]).parameters)[3:]
+
+
+def _plain(value):
+    """Kernel results -> BSON-encodable values (NumPy scalars -> Python)"""
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def merge_results(job: dict, tasks: List[dict]) -> List[dict]:
+    """One job's top `limit` over the partial top-k lists of its tasks"""
+    order = {s: i for i, s in enumerate(job["symbols"])}
+    results = [r for task in tasks for r in task.get("results") or []]
+    return rank_results(results, job["kind"], job["limit"], order)
+
+
+class ScanQueue:
+    """scan_jobs / scan_tasks collections on the server's Motor `db`"""
+
+    def __init__(self, db, task_size: int = 25, lease: timedelta = timedelta(minutes=2), max_attempts: int = 3,
+                 retention: timedelta = timedelta(days=1)):
+        self._jobs = db.scan_jobs
+        self._tasks = db.scan_tasks
+        self.task_size = task_size
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.retention = retention
+
+    async def init(self):
+        await self._jobs.create_index("id", unique=True)
+        await self._jobs.create_index([("status", 1), ("finished_at", 1)])
+        await self._tasks.create_index("id", unique=True)
+        await self._tasks.create_index([("status", 1), ("created_at", 1), ("index", 1)])
+        await self._tasks.create_index([("job_id", 1), ("index", 1)])
+
+    async def submit(self, kind: str, params: dict, symbols: List[str], start_date: str, end_date: str,
+                     limit: int, owner: Optional[str] = None) -> dict:
+        """Create a job and its tasks; returns the job document"""
+        now = datetime.now(timezone.utc)
+        ranges = split_tasks(symbols, self.task_size)
+        job = {
+            "id": str(uuid.uuid4()),
+            "kind": kind,
+            "params": params,
+            "symbols": symbols,
+            "start_date": start_date,
+            "end_date": end_date,
+            "limit": limit,
+            "owner": owner,
+            "status": "running",
+            "task_count": len(ranges),
+            "created_at": now,
+            "finished_at": None,
+            "results": None,
+        }
+        await self._jobs.insert_one(dict(job))
+        if ranges:
+            await self._tasks.insert_many([
+                {
+                    "id": str(uuid.uuid4()),
+                    "job_id": job["id"],
+                    "index": i,
+                    "symbols": chunk,
+                    "status": "pending",
+                    "attempts": 0,
+                    "lease_owner": None,
+                    "lease_expires": None,
+                    "created_at": now,
+                    "results": None,
+                    "error": None,
+                }
+                for i, chunk in enumerate(ranges)
+            ])
+        logger.info(f"Scan job {job['id']} ({kind}): {len(symbols)} symbols in {len(ranges)} tasks")
+        return job
+
+    async def claim(self, worker_id: str = WORKER_ID) -> Optional[dict]:
+        """Atomically lease the oldest pending (or lease-expired) task"""
+        now = datetime.now(timezone.utc)
+        return await self._tasks.find_one_and_update(
+            {
+                "$or": [
+                    {"status": "pending"},
+                    {"status": "leased", "lease_expires": {"$lt": now}},
+                ],
+                "attempts": {"$lt": self.max_attempts},
+            },
+            {
+                "$set": {"status": "leased", "lease_owner": worker_id, "lease_expires": now + self.lease},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1), ("index", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def extend(self, task: dict, worker_id: str = WORKER_ID) -> bool:
+        """Renew the lease; False if another worker has taken the task over"""
+        result = await self._tasks.update_one(
+            {"id": task["id"], "status": "leased", "lease_owner": worker_id},
+            {"$set": {"lease_expires": datetime.now(timezone.utc) + self.lease}},
+        )
+        return result.modified_count == 1
+
+    async def complete(self, task: dict, results: List[dict], worker_id: str = WORKER_ID) -> bool:
+        """Store a task's partial top-k; ignored if the lease was lost"""
+        result = await self._tasks.update_one(
+            {"id": task["id"], "status": "leased", "lease_owner": worker_id},
+            {"$set": {"status": "done", "results": _plain(results), "finished_at": datetime.now(timezone.utc)}},
+        )
+        return result.modified_count == 1
+
+    async def fail(self, task: dict, error: str, worker_id: str = WORKER_ID):
+        """Release a task after an error: retried until max_attempts, then failed"""
+        status = "failed" if task["attempts"] >= self.max_attempts else "pending"
+        await self._tasks.update_one(
+            {"id": task["id"], "status": "leased", "lease_owner": worker_id},
+            {"$set": {"status": status, "lease_owner": None, "lease_expires": None, "error": error}},
+        )
+
+    async def reap(self) -> int:
+        """Fail tasks whose last allowed lease expired (their worker crashed every time)"""
+        result = await self._tasks.update_many(
+            {"status": "leased", "lease_expires": {"$lt": datetime.now(timezone.utc)},
+             "attempts": {"$gte": self.max_attempts}},
+            {"$set": {"status": "failed", "lease_owner": None, "error": "lease expired"}},
+        )
+        if result.modified_count:
+            logger.warning(f"{result.modified_count} scan tasks failed after {self.max_attempts} expired leases")
+        return result.modified_count
+
+    async def merge(self, job: dict) -> bool:
+        """Merge a job whose tasks are all finished; False while tasks are outstanding"""
+        open_tasks = await self._tasks.count_documents(
+            {"job_id": job["id"], "status": {"$in": ["pending", "leased"]}}
+        )
+        if open_tasks:
+            return False
+        tasks = await self._tasks.find({"job_id": job["id"]}, {"_id": 0}).to_list(None)
+        failed = [t["index"] for t in tasks if t["status"] == "failed"]
+        await self._jobs.update_one(
+            {"id": job["id"], "status": "running"},
+            {"$set": {
+                "status": "partial" if failed else "done",
+                "failed_tasks": failed,
+                "results": merge_results(job, tasks),
+                "finished_at": datetime.now(timezone.utc),
+            }},
+        )
+        logger.info(f"Scan job {job['id']} merged ({len(tasks)} tasks, {len(failed)} failed)")
+        return True
+
+    async def purge(self) -> int:
+        """Delete jobs (and their tasks) that finished more than `retention` ago"""
+        cutoff = datetime.now(timezone.utc) - self.retention
+        jobs = await self._jobs.find(
+            {"status": {"$in": ["done", "partial"]}, "finished_at": {"$lt": cutoff}}, {"_id": 0, "id": 1}
+        ).to_list(None)
+        if not jobs:
+            return 0
+        ids = [job["id"] for job in jobs]
+        await self._tasks.delete_many({"job_id": {"$in": ids}})
+        result = await self._jobs.delete_many({"id": {"$in": ids}})
+        logger.info(f"Purged {result.deleted_count} finished scan jobs")
+        return result.deleted_count
+
+    async def coordinate(self) -> int:
+        """One coordinator pass: reap expired leases, merge finished jobs, purge old ones"""
+        await self.reap()
+        merged = 0
+        async for job in self._jobs.find({"status": "running"}, {"_id": 0}):
+            merged += await self.merge(job)
+        await self.purge()
+        return merged
+
+    async def status(self, job_id: str) -> Optional[dict]:
+        """Job document with per-status task counts"""
+        job = await self._jobs.find_one({"id": job_id}, {"_id": 0, "symbols": 0})
+        if job is None:
+            return None
+        counts = await self._tasks.aggregate([
+            {"$match": {"job_id": job_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]).to_list(None)
+        job["tasks"] = {c["_id"]: c["count"] for c in counts}
+        return job
+
+    async def _execute_leased(self, execute: Callable[[dict, dict], Awaitable[List[dict]]], job: dict,
+                              task: dict, worker_id: str) -> Optional[List[dict]]:
+        """
+        Run execute(job, task), renewing the lease every third of its length.
+        Returns None (after cancelling the run) once the lease is lost. `execute`
+        must keep blocking work off the event loop (threads or the process pool),
+        or renewals are delayed.
+        """
+        run = asyncio.ensure_future(execute(job, task))
+        try:
+            while True:
+                done, _ = await asyncio.wait({run}, timeout=self.lease.total_seconds() / 3)
+                if done:
+                    return run.result()
+                if not await self.extend(task, worker_id):
+                    logger.warning(f"Lease on scan task {task['id']} lost; cancelling it")
+                    return None
+        finally:
+            if not run.done():
+                run.cancel()
+                await asyncio.gather(run, return_exceptions=True)
+
+    async def run_worker(self, execute: Callable[[dict, dict], Awaitable[List[dict]]],
+                         worker_id: str = WORKER_ID, idle: float = 2.0):
+        """
+        Claim-execute-complete loop. `execute(job, task)` returns the task's
+        top-k results; the lease is renewed while it runs and the run is
+        cancelled if another worker takes the task over.
+        """
+        jobs = {}
+        while True:
+            try:
+                task = await self.claim(worker_id)
+                if task is None:
+                    await asyncio.sleep(idle)
+                    continue
+                job = jobs.get(task["job_id"]) or await self._jobs.find_one({"id": task["job_id"]}, {"_id": 0})
+                if job is None:
+                    await self.fail(task, "job not found", worker_id)
+                    continue
+                jobs = {job["id"]: job}
+                try:
+                    results = await self._execute_leased(execute, job, task, worker_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Scan task {task['id']} failed: {e}")
+                    await self.fail(task, str(e), worker_id)
+                    continue
+                if results is not None:
+                    await self.complete(task, results, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scan queue worker error: {e}")
+                await asyncio.sleep(idle)
+
+    async def run_coordinator(self, every: float = 5.0):
+        """Background loop running coordinate() every `every` seconds"""
+        while True:
+            try:
+                await self.coordinate()
+            except Exception as e:
+                logger.error(f"Scan queue coordinator error: {e}")
+            await asyncio.sleep(every)
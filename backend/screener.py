@@ -0,0 +1,295 @@
+"""
+Universe-wide technical screener over the aligned daily price panel.
+
+A screen is a condition tree evaluated for every symbol at once on the
+(dates x symbols) OHLCV matrices of the shared panel (or the store's own
+panel), instead of fetching and scanning symbol by symbol:
+
+    {"all": [
+        {"left": "rsi:14", "op": "<", "right": 30},
+        {"any": [
+            {"left": "close", "op": "crosses_above", "right": "sma:50"},
+            {"left": "volume", "op": ">", "right": "vma:20", "factor": 2}
+        ]},
+        {"left": "close", "op": ">=", "right": "max:252", "factor": 0.95}
+    ]}
+
+Operands:
+    close, open, high, low, volume    the bar's field
+    sma:N, ema:N, rsi:N, atr:N, vma:N  indicators.py indicators (same grammar)
+    bb:N:K.upper|middle|lower         a Bollinger line (middle if omitted)
+    max:N, min:N                      highest / lowest close of the last N bars (N=252, ~52 weeks)
+    change:N                          % change of the close over N bars (N=1)
+    a number                          (right side only)
+
+`factor` multiplies the right side. crosses_above/crosses_below compare the
+last two bars. A condition on a value that is not available (warm-up, no
+bar) is false.
+
+Each symbol's column is first compacted to its own bar sequence (missing
+sessions dropped, right-aligned), so the last row is every symbol's latest
+bar and indicators come out exactly as indicators.py computes them over the
+symbol's stored history (the candle endpoint's values). Rolling operands
+only look at the last two windows; smoothed ones (EMA, RSI, ATR) run one
+pandas ewm over the whole matrix. Symbols whose latest bar is more than
+STALE_SESSIONS panel sessions old are left out.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from indicators import (
+    BAND_OUTPUTS, IndicatorSpec, parse_indicators, relative_strength, smoothed_columns, true_range,
+)
+from metrics import timed_phase
+from series import day_string, epoch_days
+
+OPERATORS = ("<", "<=", ">", ">=", "crosses_above", "crosses_below")
+FIELDS = {"close": "Close", "open": "Open", "high": "High", "low": "Low", "volume": "Volume"}
+STALE_SESSIONS = 5
+MAX_CONDITIONS = 16
+MAX_DEPTH = 4
+
+
+class Operand(NamedTuple):
+    text: str
+    kind: str  # "field", "indicator", "max", "min" or "change"
+    field: str = "Close"
+    spec: Optional[IndicatorSpec] = None
+    line: str = ""
+    period: int = 0
+
+
+class Comparison(NamedTuple):
+    left: Operand
+    op: str
+    right: Union[Operand, float]
+    factor: float = 1.0
+
+
+class Group(NamedTuple):
+    mode: str  # "all" or "any"
+    items: tuple
+
+
+def parse_operand(text: str) -> Operand:
+    """'rsi:14', 'bb:20:2.upper', 'max:252', 'volume', ... -> Operand; ValueError if invalid"""
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError(f"Invalid operand: {text!r}")
+    text = text.strip().lower()
+    if text in FIELDS:
+        return Operand(text, "field", FIELDS[text])
+    name, _, param = text.partition(":")
+    if name in ("max", "min", "change"):
+        try:
+            period = int(param) if param else (1 if name == "change" else 252)
+        except ValueError:
+            raise ValueError(f"Invalid operand: {text!r}")
+        if not 1 <= period <= 2000:
+            raise ValueError(f"Operand period out of range: {text!r}")
+        return Operand(text, name, period=period)
+    token, _, line = text.partition(".")
+    specs = parse_indicators(token)
+    if len(specs) != 1:
+        raise ValueError(f"Invalid operand: {text!r}")
+    spec = specs[0]
+    if spec.name == "bb":
+        line = line or "middle"
+        if line not in BAND_OUTPUTS:
+            raise ValueError(f"Bollinger line must be one of {', '.join(BAND_OUTPUTS)}: {text!r}")
+    elif line:
+        raise ValueError(f"Invalid operand: {text!r}")
+    return Operand(text, "indicator", spec=spec, line=line or spec.key)
+
+
+def parse_condition(node, depth: int = 0) -> Union[Comparison, Group]:
+    """Condition tree from its JSON form (see module docstring); ValueError if invalid"""
+    if not isinstance(node, dict):
+        raise ValueError("A condition must be an object")
+    if depth >= MAX_DEPTH:
+        raise ValueError(f"Conditions nest at most {MAX_DEPTH} levels deep")
+    groups = [mode for mode in ("all", "any") if mode in node]
+    if groups:
+        items = node[groups[0]]
+        if len(groups) > 1 or len(node) > 1 or not isinstance(items, list) or not items:
+            raise ValueError("A group is {\"all\": [...]} or {\"any\": [...]} with at least one condition")
+        group = Group(groups[0], tuple(parse_condition(item, depth + 1) for item in items))
+        if depth == 0 and len(leaves(group)) > MAX_CONDITIONS:
+            raise ValueError(f"At most {MAX_CONDITIONS} conditions per screen")
+        return group
+    unknown = set(node) - {"left", "op", "right", "factor"}
+    if unknown or "left" not in node or "right" not in node:
+        raise ValueError("A condition is {\"left\", \"op\", \"right\"[, \"factor\"]}")
+    op = node.get("op")
+    if op not in OPERATORS:
+        raise ValueError(f"op must be one of {', '.join(OPERATORS)}")
+    right = node["right"]
+    if isinstance(right, bool):
+        raise ValueError(f"Invalid operand: {right!r}")
+    right = float(right) if isinstance(right, (int, float)) else parse_operand(right)
+    try:
+        factor = float(node.get("factor", 1.0))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid factor: {node.get('factor')!r}")
+    return Comparison(parse_operand(node["left"]), op, right, factor)
+
+
+def leaves(condition: Union[Comparison, Group]) -> List[Comparison]:
+    if isinstance(condition, Comparison):
+        return [condition]
+    return [leaf for item in condition.items for leaf in leaves(item)]
+
+
+def _tail_windows(values: np.ndarray, n: int) -> np.ndarray:
+    """(symbols, 2, n) windows ending at the previous and the last bar; NaN-padded for short panels"""
+    missing = n + 1 - len(values)
+    if missing > 0:
+        values = np.concatenate([np.full((missing, values.shape[1]), np.nan), values])
+    # Contiguous rows: each window reduces in the same order as indicators.py does
+    return sliding_window_view(np.ascontiguousarray(values[-n - 1:].T), n, axis=1)
+
+
+def _last_two(values: np.ndarray) -> np.ndarray:
+    if len(values) >= 2:
+        return values[-2:]
+    return np.concatenate([np.full((2 - len(values), values.shape[1]), np.nan), values])
+
+
+class Screener:
+    """
+    Screens over one panel: `field(name)` returns the (dates x symbols) matrix
+    of an OHLCV field, NaN where a symbol has no bar; `days` are the panel's
+    epoch days.
+    """
+
+    def __init__(self, symbols: List[str], days: np.ndarray, field: Callable[[str], np.ndarray]):
+        self.symbols = list(symbols)
+        self._field = field
+        self._fields: Dict[str, np.ndarray] = {}
+        close = np.asarray(field("Close"), dtype=np.float64)
+        valid = ~np.isnan(close)
+        rows = len(close)
+        # Stable sort moves every column's missing sessions to the top, keeping bar order
+        self._order = np.argsort(valid, axis=0, kind="stable")
+        self._first = rows - valid.sum(axis=0)
+        last_row = rows - 1 - np.argmax(valid[::-1], axis=0) if rows else np.zeros(len(self.symbols), dtype=int)
+        self.fresh = valid.any(axis=0) & (last_row >= rows - STALE_SESSIONS)
+        self.last_days = days[last_row] if rows else np.zeros(len(self.symbols), dtype=np.int32)
+        self._fields["Close"] = np.take_along_axis(close, self._order, axis=0)
+        self._values: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, symbols: List[str]) -> "Screener":
+        """Over the shared panel's columns of `symbols` (those it has)"""
+        index = {s: j for j, s in enumerate(snapshot.symbols)}
+        symbols = [s for s in dict.fromkeys(symbols) if s in index]
+        columns = [index[s] for s in symbols]
+        return cls(symbols, snapshot.days, lambda name: snapshot.field(name)[:, columns])
+
+    @classmethod
+    def from_store(cls, store, symbols: List[str]) -> "Screener":
+        """Over a daily PriceStore's own panel (symbols it has loaded)"""
+        close = store.panel("Close")
+        symbols = [s for s in dict.fromkeys(symbols) if s in close.columns]
+        return cls(symbols, epoch_days(close.index), lambda name: (
+            store.panel(name).reindex(index=close.index, columns=symbols).to_numpy(dtype=np.float64)
+        ))
+
+    def _compact(self, name: str) -> np.ndarray:
+        if name not in self._fields:
+            values = np.take_along_axis(np.asarray(self._field(name), dtype=np.float64), self._order, axis=0)
+            if name == "Volume":
+                # Missing volume of an existing bar counts as 0 (as in indicators.py), not as no bar
+                listed = np.arange(len(values))[:, None] >= self._first
+                values[listed & np.isnan(values)] = 0.0
+            self._fields[name] = values
+        return self._fields[name]
+
+    def _indicator(self, spec: IndicatorSpec, line: str) -> np.ndarray:
+        n = spec.period
+        close = self._fields["Close"]
+        if spec.name in ("sma", "vma", "bb"):
+            windows = _tail_windows(close if spec.name != "vma" else self._compact("Volume"), n)
+            middle = windows.mean(axis=-1).T
+            if spec.name != "bb" or line == "middle":
+                return middle
+            spread = spec.width * windows.std(axis=-1).T
+            return middle + spread if line == "upper" else middle - spread
+        if spec.name == "ema":
+            return _last_two(smoothed_columns(close, self._first, n, 2.0 / (n + 1)))
+        if spec.name == "rsi":
+            change = np.diff(close, axis=0, prepend=np.nan)
+            gain = smoothed_columns(np.fmax(change, 0.0), self._first, n, 1.0 / n, offset=1)
+            loss = smoothed_columns(np.fmax(-change, 0.0), self._first, n, 1.0 / n, offset=1)
+            return relative_strength(_last_two(gain), _last_two(loss))
+        ranges = true_range(self._compact("High"), self._compact("Low"), close)
+        return _last_two(smoothed_columns(ranges, self._first, n, 1.0 / n))
+
+    def value(self, operand: Operand) -> np.ndarray:
+        """(2, symbols): the operand at each symbol's previous and last bar"""
+        if operand.text not in self._values:
+            close = self._fields["Close"]
+            if operand.kind == "field":
+                values = _last_two(self._compact(operand.field))
+            elif operand.kind in ("max", "min"):
+                windows = _tail_windows(close, operand.period)
+                values = (windows.max(axis=-1) if operand.kind == "max" else windows.min(axis=-1)).T
+            elif operand.kind == "change":
+                base = _tail_windows(close, operand.period + 1)[:, :, 0].T
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    values = (_last_two(close) / base - 1.0) * 100
+            else:
+                values = self._indicator(operand.spec, operand.line)
+            self._values[operand.text] = values
+        return self._values[operand.text]
+
+    def evaluate(self, condition: Union[Comparison, Group]) -> np.ndarray:
+        """Boolean mask over symbols"""
+        if isinstance(condition, Group):
+            masks = [self.evaluate(item) for item in condition.items]
+            return np.logical_and.reduce(masks) if condition.mode == "all" else np.logical_or.reduce(masks)
+        left = self.value(condition.left)
+        right = condition.right
+        right = (self.value(right) if isinstance(right, Operand) else np.full_like(left, right)) * condition.factor
+        with np.errstate(invalid="ignore"):
+            if condition.op == "crosses_above":
+                return (left[0] <= right[0]) & (left[1] > right[1])
+            if condition.op == "crosses_below":
+                return (left[0] >= right[0]) & (left[1] < right[1])
+            compare = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}[condition.op]
+            return compare(left[1], right[1])
+
+    @timed_phase("score")
+    def run(self, condition: Union[Comparison, Group], sort: Optional[Operand] = None,
+            descending: bool = True, limit: int = 50) -> Tuple[List[dict], int]:
+        """
+        Matching symbols ranked by `sort` (default: number of conditions met,
+        then symbol), and the total number of matches
+        """
+        conditions = leaves(condition)
+        matched = self.evaluate(condition) & self.fresh
+        met = np.sum([self.evaluate(leaf) for leaf in conditions], axis=0)
+        hits = np.flatnonzero(matched)
+        if sort is not None:
+            key = self.value(sort)[1][hits]
+            # NaN sorts last either way
+            key = np.where(np.isnan(key), -np.inf if descending else np.inf, key)
+            hits = hits[np.argsort(-key if descending else key, kind="stable")]
+        else:
+            hits = np.array(sorted(hits, key=lambda j: (-met[j], self.symbols[j])), dtype=np.int64)
+
+        operands = {c.left.text: c.left for c in conditions}
+        operands.update({c.right.text: c.right for c in conditions if isinstance(c.right, Operand)})
+        if sort is not None:
+            operands[sort.text] = sort
+        values = {text: self.value(operand)[1] for text, operand in operands.items()}
+        close = self._fields["Close"][-1]
+        results = [{
+            "symbol": self.symbols[j],
+            "date": day_string(self.last_days[j]),
+            "close": round(float(close[j]), 2),
+            "conditions_met": int(met[j]),
+            "values": {text: None if np.isnan(v[j]) else round(float(v[j]), 4) for text, v in values.items()},
+        } for j in hits[:limit]]
+        return results, len(hits)
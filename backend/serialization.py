@@ -0,0 +1,183 @@
+import gzip
+import hashlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from metrics import phase, timed_phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+
+CANDLE_FORMATS = ("json", "columnar", "binary")
+
+# Binary candle layout: consecutive little-endian arrays of `count` items each
+BINARY_CANDLE_LAYOUT = (
+    ("time", "<i8"),
+    ("open", "<f4"),
+    ("high", "<f4"),
+    ("low", "<f4"),
+    ("close", "<f4"),
+    ("volume", "<i8"),
+)
+
+MIN_COMPRESS_SIZE = 1024
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (NumPy arrays/scalars serialized natively)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with phase("serialize"):
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _time_column(df: pd.DataFrame) -> pd.Series:
+    for name in ("Datetime", "Date"):
+        if name in df.columns:
+            return df[name]
+    return df.index.to_series()
+
+
+def ohlcv_columns(df: pd.DataFrame, decimals: int = 2, time_key: str = "time",
+                  date_format: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Convert OHLCV columns to NumPy arrays in one shot.
+    time_key holds epoch seconds, or date strings when date_format is given
+    (string dates in a 'Date' column are passed through as-is).
+    """
+    times = _time_column(df)
+    if times.dtype == object:
+        time_values = times.to_numpy()
+    elif date_format is not None:
+        time_values = pd.DatetimeIndex(times).strftime(date_format).to_numpy()
+    else:
+        time_values = pd.DatetimeIndex(times).asi8 // 1_000_000_000
+
+    columns = {time_key: time_values}
+    for name in ("Open", "High", "Low", "Close"):
+        columns[name.lower()] = np.round(df[name].to_numpy(dtype=np.float64), decimals)
+    columns["volume"] = np.nan_to_num(df["Volume"].to_numpy(dtype=np.float64)).astype(np.int64)
+    return columns
+
+
+def columns_to_records(columns: Dict[str, np.ndarray]) -> List[dict]:
+    """Turn parallel arrays into a list of row dicts (tolist() avoids per-cell NumPy scalars)"""
+    keys = list(columns)
+    values = [np.asarray(v).tolist() for v in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def frame_to_candles(df: pd.DataFrame, decimals: int = 2) -> List[dict]:
+    """Chart candles: {time (epoch seconds), open, high, low, close, volume}"""
+    return columns_to_records(ohlcv_columns(df, decimals))
+
+
+def frame_to_price_history(df: pd.DataFrame, decimals: int = 2) -> List[dict]:
+    """Analysis price history: {date (YYYY-MM-DD), open, high, low, close, volume}"""
+    return columns_to_records(ohlcv_columns(df, decimals, time_key="date", date_format='%Y-%m-%d'))
+
+
+def pack_candles(columns: Dict[str, np.ndarray]) -> bytes:
+    """Pack candle columns into the BINARY_CANDLE_LAYOUT buffer"""
+    return b"".join(
+        np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+        for name, dtype in BINARY_CANDLE_LAYOUT
+    )
+
+
+def unpack_candles(buffer: bytes) -> Dict[str, np.ndarray]:
+    """Inverse of pack_candles (used by clients and tests)"""
+    row_size = sum(np.dtype(dtype).itemsize for _, dtype in BINARY_CANDLE_LAYOUT)
+    count = len(buffer) // row_size
+    columns, offset = {}, 0
+    for name, dtype in BINARY_CANDLE_LAYOUT:
+        columns[name] = np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+        offset += count * np.dtype(dtype).itemsize
+    return columns
+
+
+def compressed_response(request: Request, body: bytes, media_type: str,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    """Brotli (if installed) or gzip encode the body according to Accept-Encoding"""
+    headers = dict(headers or {})
+    headers["Vary"] = "Accept-Encoding"
+    if len(body) >= MIN_COMPRESS_SIZE:
+        accepted = {
+            part.split(";")[0].strip().lower()
+            for part in request.headers.get("accept-encoding", "").split(",")
+        }
+        if brotli is not None and "br" in accepted:
+            body = brotli.compress(body, quality=4)
+            headers["Content-Encoding"] = "br"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over the parts that determine a representation"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    # No Last-Modified: workers load the same bars at different times, so only a
+    # content-derived ETag validates consistently behind a load balancer
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match (weak comparison)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified_response(headers: Dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
+
+
+def candle_header(key: str) -> str:
+    """Meta key -> binary response header, e.g. max_points -> X-Candle-Max-Points"""
+    return "X-Candle-" + "-".join(part.capitalize() for part in key.split("_"))
+
+
+@timed_phase("serialize")
+def candle_response(request: Request, df: pd.DataFrame, fmt: str, meta: Dict[str, Any],
+                    headers: Optional[Dict[str, str]] = None,
+                    indicators: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Encode candles in the requested wire format:
+    json     - {..., "candles": [{time, open, high, low, close, volume}, ...]}
+    columnar - {..., "columns": {"time": [...], "open": [...], ...}}
+    binary   - BINARY_CANDLE_LAYOUT buffer; metadata in X-Candle-* headers
+    indicators (json/columnar) are added as {..., "indicators": {key: [...]}}, parallel to the candles
+    """
+    columns = ohlcv_columns(df)
+    headers = dict(headers or {})
+    if fmt == "binary":
+        headers.update({
+            "X-Candle-Count": str(len(df)),
+            "X-Candle-Layout": ",".join(f"{name}:{dtype}" for name, dtype in BINARY_CANDLE_LAYOUT),
+        })
+        headers.update({candle_header(k): str(v) for k, v in meta.items()})
+        return compressed_response(request, pack_candles(columns), "application/octet-stream", headers)
+    if fmt == "columnar":
+        payload = {**meta, "format": "columnar", "columns": columns}
+    else:
+        payload = {**meta, "candles": columns_to_records(columns)}
+    if indicators is not None:
+        payload["indicators"] = indicators
+    return compressed_response(request, ORJSONResponse(payload).body, "application/json", headers)
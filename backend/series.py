@@ -0,0 +1,135 @@
+"""
+Lightweight daily price series for the scan hot loop.
+
+A scan needs one symbol's closes and, for the handful of dip/tepe points
+and windows it reports, their dates. PriceSeries keeps the dates as int32
+days since 1970-01-01 and the prices as float64 arrays (slices of the
+shared panel or the store's frame, no per-row objects). DayDates is a
+read-only sequence view over those days that formats a date string only
+when an item is read, so the kernels in analysis.py keep their
+`dates[i]` / `dates[a:b]` / `dates.index(d)` code unchanged while a scan
+no longer builds a DataFrame, a string column and a list per symbol.
+"""
+from typing import Iterator, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def epoch_days(dates) -> np.ndarray:
+    """DatetimeIndex / datetime64 / 'YYYY-MM-DD' strings -> int32 days since 1970-01-01"""
+    if isinstance(dates, pd.DatetimeIndex):
+        if dates.tz is not None:
+            dates = dates.tz_localize(None)
+        values = dates.values
+    else:
+        values = np.asarray(dates)
+    return values.astype("datetime64[D]").astype(np.int32)
+
+
+def day_string(day: int) -> str:
+    """'YYYY-MM-DD' of one epoch day"""
+    return str(EPOCH + int(day))
+
+
+class DayDates:
+    """Sequence of 'YYYY-MM-DD' strings backed by sorted epoch days"""
+
+    __slots__ = ("days",)
+
+    def __init__(self, days: np.ndarray):
+        self.days = days
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __getitem__(self, item: Union[int, slice]):
+        if isinstance(item, slice):
+            return DayDates(self.days[item])
+        return day_string(self.days[item])
+
+    def __iter__(self) -> Iterator[str]:
+        return (day_string(d) for d in self.days)
+
+    def _position(self, date: str) -> Optional[int]:
+        try:
+            day = int(np.datetime64(date, "D").astype(np.int32))
+        except (TypeError, ValueError):
+            return None
+        i = int(np.searchsorted(self.days, day))
+        return i if i < len(self.days) and self.days[i] == day else None
+
+    def __contains__(self, date) -> bool:
+        return isinstance(date, str) and self._position(date) is not None
+
+    def index(self, date: str) -> int:
+        i = self._position(date) if isinstance(date, str) else None
+        if i is None:
+            raise ValueError(f"{date!r} is not in dates")
+        return i
+
+    def tolist(self) -> list:
+        return self.days.astype("datetime64[D]").astype(str).tolist()
+
+
+class PriceSeries:
+    """One symbol's daily bars as NumPy arrays; OHLV are None unless loaded"""
+
+    __slots__ = ("symbol", "days", "close", "open", "high", "low", "volume")
+
+    def __init__(self, symbol: str, days: np.ndarray, close: np.ndarray, open: Optional[np.ndarray] = None,
+                 high: Optional[np.ndarray] = None, low: Optional[np.ndarray] = None,
+                 volume: Optional[np.ndarray] = None):
+        self.symbol = symbol
+        self.days = days
+        self.close = close
+        self.open = open
+        self.high = high
+        self.low = low
+        self.volume = volume
+
+    @classmethod
+    def empty(cls, symbol: str) -> "PriceSeries":
+        return cls(symbol, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64))
+
+    @classmethod
+    def from_frame(cls, symbol: str, df: pd.DataFrame) -> "PriceSeries":
+        """From a bar frame: DatetimeIndex, or the 'Date' string column of get_stock_data"""
+        if df is None or df.empty:
+            return cls.empty(symbol)
+        dates = df["Date"] if "Date" in df.columns else df.index
+        columns = {
+            name.lower(): df[name].to_numpy(dtype=np.float64)
+            for name in ("Close", "Open", "High", "Low", "Volume") if name in df.columns
+        }
+        return cls(symbol, epoch_days(dates), **columns)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def is_empty(self) -> bool:
+        return len(self.days) == 0
+
+    @property
+    def dates(self) -> DayDates:
+        return DayDates(self.days)
+
+    def window(self, start_date: str, end_date: str) -> "PriceSeries":
+        """Bars in [start_date, end_date)"""
+        lo, hi = np.searchsorted(self.days, epoch_days([start_date, end_date]))
+        return PriceSeries(self.symbol, self.days[lo:hi], *(
+            None if values is None else values[lo:hi]
+            for values in (self.close, self.open, self.high, self.low, self.volume)
+        ))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Date string column plus the loaded price columns (the get_stock_data format)"""
+        frame = {"Date": self.dates.tolist()}
+        for name in ("open", "high", "low", "close", "volume"):
+            values = getattr(self, name)
+            if values is not None:
+                frame[name.capitalize()] = values
+        return pd.DataFrame(frame)
@@ -1,23 +1,51 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status
+from fastapi.responses import FileResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Sequence
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 from passlib.context import CryptContext
-import yfinance as yf
 import pandas as pd
 import numpy as np
-from scipy.spatial.distance import euclidean
-from scipy.stats import pearsonr
-from sklearn.preprocessing import MinMaxScaler
+from analysis import (
+    PatternCriteria, PeakTroughPoint, SCAN_KERNELS, calculate_partial_similarity, drawn_ratios,
+    find_peaks_troughs, rank_results,
+)
+from symbol_registry import BIST_100_SYMBOLS, SymbolRegistry
+from price_store import frame_version, merge_quotes
+from providers import provider_from_env
+from symbol_health import SymbolHealth
+from bar_store import MongoBarStore
+from shared_panel import DEFAULT_PANEL_DIR, SharedPanel
+from series import PriceSeries
+from range_stats import RangeStats
+from screener import Screener, parse_condition, parse_operand
+from scan_pool import ScanPool
+from scan_queue import ScanQueue, kernel_params
+from metrics import (
+    CACHE_REQUESTS, SCANNED_SYMBOLS, UPSTREAM_ERRORS, MetricsMiddleware, phase, render as render_metrics, timed_phase,
+)
+from profiling import PROFILE_FORMATS, ProfileStore, ProfilingMiddleware
+from warmup import DEFAULT_CACHE_DIR, build_store, run_after_close, run_panel_publisher
+from resample import BIST_TZ, parse_interval, resample_ohlcv
+from downsample import DOWNSAMPLE_MODES, MIN_POINTS, downsample_frame
+from indicators import (
+    IndicatorSpec, attach as attach_indicators, compute as compute_indicators, detach as detach_indicators,
+    parse_indicators,
+)
+from serialization import (
+    ORJSONResponse, CANDLE_FORMATS, cache_headers, candle_response, frame_to_price_history,
+    is_not_modified, make_etag, not_modified_response,
+)
 
 
 ROOT_DIR = Path(__file__).parent
@@ -29,7 +57,7 @@ client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create router with /api prefix
 api_router = APIRouter(prefix="/api")
@@ -53,56 +81,65 @@ ADMIN_EMAILS = {
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# BIST 100+ Symbols - Kapsamlı liste (BIST 100, BIST 50 ve popüler hisseler)
-BIST_100_SYMBOLS = [
-    # Ana BIST 100 Hisseleri
-    "AEFES", "AFYON", "AGESA", "AGHOL", "AKBNK", "AKCNS", "AKFGY", "AKFYE", "AKSA", "AKSEN",
-    "ALARK", "ALBRK", "ALFAS", "ALGYO", "ALKIM", "ANSGR", "ARCLK", "ARDYZ", "ASELS", "ASUZU",
-    "AYDEM", "AYGAZ", "BERA", "BIENY", "BIMAS", "BRSAN", "BRYAT", "BTCIM", "BUCIM", "CANTE",
-    "CCOLA", "CEMTS", "CIMSA", "CLEBI", "CONSE", "DEVA", "DOAS", "DOHOL", "ECILC", "EGEEN",
-    "EKGYO", "ENJSA", "ENKAI", "ERBOS", "EREGL", "EUPWR", "EUREN", "FROTO", "GARAN", "GENIL",
-    "GESAN", "GLYHO", "GOZDE", "GUBRF", "GWIND", "HALKB", "HEKTS", "IPEKE", "ISCTR", "ISGYO",
-    "ISMEN", "KARSN", "KCAER", "KCHOL", "KLSER", "KONTR", "KONYA", "KOZAA", "KOZAL", "KRDMD",
-    "KRVGD", "KTLEV", "LMKDC", "LOGO", "MAVI", "MERCN", "MGROS", "MIATK", "MKGYO", "ODAS",
-    "OTKAR", "OYAKC", "PAPIL", "PETKM", "PGSUS", "QUAGR", "SAHOL", "SASA", "SELEC", "SISE",
-    "SKBNK", "SMRTG", "SOKM", "TAVHL", "TCELL", "THYAO", "TKFEN", "TKNSA", "TOASO", "TRGYO",
-    "TSKB", "TTKOM", "TTRAK", "TUPRS", "TURSG", "ULKER", "VAKBN", "VERUS", "VESTL", "YKBNK",
-    # Ek BIST Hisseleri
-    "TGSAS", "DESPC", "KLRHO", "GSRAY", "FENER", "BJKAS", "TSPOR", "NETAS", "INDES", "ARENA",
-    "ADESE", "ADEL", "AKENR", "ALCAR", "ALMAD", "ANELE", "ANHYT", "ANSEN", "ARASE", "ARMDA",
-    "ASTOR", "ATAGY", "ATLAS", "AVHOL", "AVOD", "AVTUR", "AYCES", "BAGFS", "BAKAB", "BANVT",
-    "BARMA", "BASGZ", "BAYRK", "BEYAZ", "BFREN", "BIGCH", "BIZIM", "BLCYT", "BMSCH", "BMSTL",
-    "BNTAS", "BOBET", "BOSSA", "BRISA", "BRKSN", "BRLSM", "BRMEN", "BURCE", "BURVA", "CASA",
-    "CEMAS", "CMENT", "CUSAN", "CVKMD", "DAGHL", "DAGI", "DAPGM", "DARDL", "DENGE", "DERHL",
-    "DERIM", "DESA", "DGATE", "DGGYO", "DGNMO", "DIRIT", "DITAS", "DJIST", "DMRGD", "DNISI",
-    "DOBUR", "DOCO", "DOGUB", "DOKTA", "DURDO", "DYOBY", "DZGYO", "EBEBK", "EDIP", "EGEPO",
-    "EGGUB", "EGPRO", "EGSER", "EKIZ", "EKSUN", "ELITE", "EMKEL", "EMNIS", "ENSRI", "EPLAS",
-    "ERSU", "ESCAR", "ESCOM", "ESEN", "ETILR", "ETYAT", "EUHOL", "EUYO", "EYGYO", "FADE",
-    "FMIZP", "FONET", "FORMT", "FORTE", "FRIGO", "GEDIK", "GEDZA", "GENTS", "GLBMD", "GLCVY",
-    "GLRYH", "GMTAS", "GOKNR", "GOLTS", "GOODY", "GRNYO", "GRSEL", "GRTRK", "GSDDE", "GSDHO",
-    "GSRAY", "GZNMI", "HATEK", "HATSN", "HDFGS", "HEDEF", "HKTM", "HLGYO", "HTTBT", "HUBVC",
-    "HUNER", "HURGZ", "ICBCT", "ICUGS", "IDEAS", "IDGYO", "IEYHO", "IHEVA", "IHGZT", "IHLAS",
-    "IHLGM", "IHYAY", "IMASM", "INGRM", "INTEM", "INVEO", "INVES", "ISATR", "ISBIR", "ISBTR",
-    "ISFIN", "ISGSY", "ISKPL", "ISKUR", "ISSEN", "IZFAS", "IZINV", "IZMDC", "JANTS", "KAPLM",
-    "KAREL", "KARTN", "KARYE", "KATMR", "KAYSE", "KBORU", "KERVN", "KFEIN", "KGYO", "KIMMR",
-    "KLGYO", "KLKIM", "KLMSN", "KLNMA", "KMPUR", "KNFRT", "KONKA", "KOPOL", "KORDS", "KRPLS",
-    "KRSTL", "KRTEK", "KRVTN", "KUTPO", "KUYAS", "KZBGY", "KZGYO", "LIDER", "LIDFA", "LILAK",
-    "LINK", "LKMNH", "LUKSK", "MAALT", "MACKO", "MAGEN", "MAKIM", "MAKTK", "MANAS", "MARBL",
-    "MARKA", "MARTI", "MAVI", "MEDTR", "MEGAP", "MEKAG", "MEPET", "MERIT", "MERKO", "METRO",
-    "METUR", "MHRGY", "MIPAZ", "MMCAS", "MNDRS", "MNDTR", "MOBTL", "MOGAN", "MPARK", "MRGYO",
-    "MRSHL", "MSGYO", "MTRKS", "MTRYO", "MZHLD", "NATEN", "NIBAS", "NTGAZ", "NUGYO", "NUHCM",
-    "OBAMS", "OBASE", "ONCSM", "ORCAY", "ORGE", "ORMA", "OSMEN", "OSTIM", "OYLUM", "OZGYO",
-    "OZKGY", "OZRDN", "OZSUB", "PAGYO", "PAMEL", "PNLSN", "PNSUT", "POLHO", "POLTK", "PRDGS",
-    "PRKAB", "PRKME", "PRZMA", "PSDTC", "QNBFB", "QNBFL", "RALYH", "RAYSG", "REEDR", "RGYAS",
-    "RODRG", "ROYAL", "RTALB", "RUBNS", "RYSAS", "SAFKR", "SAMAT", "SANEL", "SANFM", "SANKO",
-    "SARKY", "SAYAS", "SDTTR", "SEGYO", "SEKFK", "SEKUR", "SELGD", "SELVA", "SEYKM", "SILVR",
-    "SNGYO", "SNICA", "SNKRN", "SNPAM", "SODSN", "SONME", "SURGY", "SUWEN", "TARKM", "TATGD",
-    "TBORG", "TDGYO", "TEKTU", "TERA", "TETMT", "TEZOL", "TKNSA", "TLMAN", "TMPOL", "TMSN",
-    "TNZTP", "TOASO", "TRCAS", "TRILC", "TSGYO", "TSPOR", "TUCLK", "TUKAS", "TUREX", "ULUUN",
-    "UMPAS", "UNLU", "USDTR", "USAS", "UZERB", "VAKFN", "VAKKO", "VANGD", "VBTYZ", "VERTU",
-    "VKFYO", "VKGYO", "VKING", "YAPRK", "YATAS", "YAYLA", "YGGYO", "YGYO", "YKSLN", "YUNSA",
-    "YYAPI", "ZEDUR", "ZOREN", "ZRGYO"
-]
+# All bars and metadata come from MARKET_DATA_PROVIDER (yfinance by default; the
+# local/replay/synthetic providers run without network, see providers.py)
+data_provider = provider_from_env()
+# Synthetic/replay/local providers define their own universe
+SCAN_SYMBOLS = data_provider.universe() or BIST_100_SYMBOLS
+
+# Symbol metadata (name, sector, market cap, listing status, first/last bar) cached in MongoDB
+symbol_registry = SymbolRegistry(
+    db,
+    SCAN_SYMBOLS,
+    refresh_interval=timedelta(hours=float(os.environ.get("SYMBOL_REFRESH_HOURS", "24"))),
+    provider=data_provider,
+)
+
+# Local daily OHLCV store (last 7 years per symbol) shared by scans, quotes and analysis,
+# plus hourly bars that multi-hour candles are aggregated from. Both persist to PRICE_CACHE_DIR,
+# which `python warmup.py` fills in bulk and the after-close job tops up.
+PRICE_STORE_TTL = timedelta(minutes=float(os.environ.get("PRICE_STORE_TTL_MINUTES", "15")))
+# Empty/failed downloads are not retried for SYMBOL_NEGATIVE_TTL_MINUTES; after repeated
+# failures the symbol is parked for SYMBOL_BREAKER_COOLDOWN_HOURS (doubling, max 7 days)
+SYMBOL_NEGATIVE_TTL = timedelta(minutes=float(os.environ.get("SYMBOL_NEGATIVE_TTL_MINUTES", "30")))
+SYMBOL_BREAKER_COOLDOWN = timedelta(hours=float(os.environ.get("SYMBOL_BREAKER_COOLDOWN_HOURS", "6")))
+# Bars are written through to MongoDB (bars_1d/bars_1h) so cold workers on any host start warm
+shared_bars = {}
+if os.environ.get("SHARED_BARS", "1") == "1":
+    shared_bars = {interval: MongoBarStore(db, interval) for interval in ("1d", "1h")}
+price_store = build_store("1d", DEFAULT_CACHE_DIR, PRICE_STORE_TTL, data_provider,
+                          SymbolHealth(SYMBOL_NEGATIVE_TTL, cooldown=SYMBOL_BREAKER_COOLDOWN),
+                          shared_bars.get("1d"))
+hourly_store = build_store("1h", DEFAULT_CACHE_DIR, PRICE_STORE_TTL, data_provider,
+                           SymbolHealth(SYMBOL_NEGATIVE_TTL, cooldown=SYMBOL_BREAKER_COOLDOWN),
+                           shared_bars.get("1h"))
+MAX_QUOTE_SYMBOLS = 500
+
+# Aligned daily OHLCV matrix published by one worker and memory-mapped read-only by all
+# (see shared_panel.py); scans read closes from it instead of per-worker frames
+SHARED_PANEL_REFRESH = timedelta(minutes=float(os.environ.get("SHARED_PANEL_REFRESH_MINUTES", "15")))
+shared_panel = SharedPanel(DEFAULT_PANEL_DIR)
+
+# Universe scans run in SCAN_WORKERS processes reading that panel (0 = in-process).
+# Default: the cores split across uvicorn workers (WEB_CONCURRENCY)
+SCAN_WORKERS = int(os.environ.get(
+    "SCAN_WORKERS", max(1, (os.cpu_count() or 1) // int(os.environ.get("WEB_CONCURRENCY", "1")))
+))
+scan_pool: Optional[ScanPool] = None
+
+# Large scans submitted as jobs are split into symbol-range tasks in MongoDB
+# (scan_jobs/scan_tasks) and claimed by idle workers on every node (see scan_queue.py)
+SCAN_QUEUE = os.environ.get("SCAN_QUEUE", "1") == "1"
+scan_queue = ScanQueue(
+    db,
+    task_size=int(os.environ.get("SCAN_TASK_SIZE", "25")),
+    lease=timedelta(seconds=float(os.environ.get("SCAN_TASK_LEASE_SECONDS", "120"))),
+    retention=timedelta(hours=float(os.environ.get("SCAN_JOB_RETENTION_HOURS", "24"))),
+)
+
+# Admins can profile any request with ?profile=cpu|memory (or an X-Profile header);
+# the newest PROFILE_KEEP reports are kept in PROFILE_DIR (see profiling.py)
+profile_store = ProfileStore(keep=int(os.environ.get("PROFILE_KEEP", "50")))
 
 # Models
 class UserCreate(BaseModel):
@@ -138,6 +175,8 @@ class StockAnalysisRequest(BaseModel):
     symbol: str
     start_date: str
     end_date: str
+    max_points: Optional[int] = Field(None, ge=MIN_POINTS)  # Grafik için seriyi en fazla bu kadar noktaya indir
+    downsample: str = "ohlc"  # "ohlc" (bucket aggregation) or "lttb" (line series)
 
 class SimilaritySearchRequest(BaseModel):
     symbol: str
@@ -146,39 +185,6 @@ class SimilaritySearchRequest(BaseModel):
     min_similarity: float = 0.7
     limit: int = 10
 
-class PatternCriteria(BaseModel):
-    """Her dip/tepe noktası için özelleştirilebilir kriterler"""
-    # 1. Dip -> 1. Tepe yükseliş
-    rise_1_min: float = 100
-    rise_1_max: float = 160
-    # 1. Tepe -> 2. Dip düşüş
-    drop_1_min: float = 40
-    drop_1_max: float = 60
-    # 2. Dip -> 2. Tepe yükseliş (1. tepeyi geçmeli)
-    rise_2_min: float = 20
-    rise_2_max: float = 50
-    # 2. Tepe -> 3. Dip düşüş
-    drop_2_min: float = 20
-    drop_2_max: float = 30
-    # 3. Dip -> 3. Tepe yükseliş (2. tepeyi geçmeli)
-    rise_3_min: float = 15
-    rise_3_max: float = 40
-    # 3. Tepe -> 4. Dip düşüş
-    drop_3_min: float = 15
-    drop_3_max: float = 30
-    # 4. Dip -> 4. Tepe yükseliş
-    rise_4_min: float = 10
-    rise_4_max: float = 30
-    # 4. Tepe -> 5. Dip düşüş
-    drop_4_min: float = 10
-    drop_4_max: float = 25
-    # 5. Dip -> 5. Tepe yükseliş
-    rise_5_min: float = 5
-    rise_5_max: float = 20
-    # 5. Tepe -> 6. Dip düşüş
-    drop_5_min: float = 10
-    drop_5_max: float = 40
-
 class AdvancedPatternRequest(BaseModel):
     """Gelişmiş kalıp arama - kullanıcı tanımlı kriterler"""
     criteria: PatternCriteria
@@ -193,12 +199,6 @@ class CustomPatternRequest(BaseModel):
     end_date: str
     limit: int = 10
 
-class PeakTroughPoint(BaseModel):
-    point_type: str  # "dip" or "tepe"
-    point_number: int
-    date: str
-    price: float
-    percentage_change: Optional[float] = None
 
 class StockAnalysisResponse(BaseModel):
     symbol: str
@@ -237,6 +237,21 @@ class PatternPoint(BaseModel):
     price: float
     type: str  # 'dip' or 'tepe'
 
+class ScanJobRequest(BaseModel):
+    kind: str  # "similar", "advanced" or "drawn" (analysis.SCAN_KERNELS)
+    params: Dict[str, Any]  # kernel parameters, e.g. {"ref_prices": [...], "min_similarity": 0.7}
+    start_date: str
+    end_date: str
+    symbols: Optional[List[str]] = None  # Varsayılan: tüm tarama evreni
+    limit: int = 20
+
+class ScreenerRequest(BaseModel):
+    where: Dict[str, Any]  # Koşul ağacı: {"all"/"any": [...]} veya {"left", "op", "right"[, "factor"]} (screener.py)
+    sort: Optional[str] = None  # Sıralama operandı, ör. "rsi:14"; varsayılan: sağlanan koşul sayısı
+    descending: bool = True
+    symbols: Optional[List[str]] = None  # Varsayılan: tüm tarama evreni
+    limit: int = 50
+
 class SearchByPatternRequest(BaseModel):
     symbol: str
     points: List[PatternPoint]
@@ -300,425 +315,176 @@ def require_admin(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
 
+async def profiling_admin(authorization: Optional[str]) -> Optional[str]:
+    """require_admin for ProfilingMiddleware: admin email for a valid admin bearer token, else None"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        user = require_admin(await get_current_user(HTTPAuthorizationCredentials(scheme=scheme, credentials=token)))
+    except HTTPException:
+        return None
+    return user.get("email")
+
+def provider_history(symbol: str, start: str, end: Optional[str] = None, interval: str = "1d") -> pd.DataFrame:
+    """Direct provider read for ranges outside the stores, counted in the upstream error metrics"""
+    try:
+        df = data_provider.history(symbol, start, end, interval=interval)
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(data_provider.name, type(e).__name__).inc()
+        raise
+    if df.empty:
+        UPSTREAM_ERRORS.labels(data_provider.name, "empty").inc()
+    return df
+
+def require_known_symbol(symbol: str):
+    """404 for symbols outside the registry, before they cost a provider download and cached empty bars"""
+    if symbol not in symbol_registry:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol: {symbol}")
+
+@timed_phase("fetch")
 def get_stock_data(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
-    """Fetch stock data from Yahoo Finance"""
+    """Fetch stock data from the local price store, falling back to the market data provider"""
     ticker = f"{symbol}.IS"  # BIST stocks use .IS suffix
     try:
-        stock = yf.Ticker(ticker)
-        df = stock.history(start=start_date, end=end_date)
+        df = price_store.history(symbol, start_date, end_date)
+        if df is not None:
+            if df.empty:
+                logger.warning(f"No data for {ticker}")
+            return df
+        # Range starts before the store's coverage
+        if not price_store.health.allow(symbol):
+            return pd.DataFrame()
+        df = provider_history(symbol, start_date, end_date)
         if df.empty:
             logger.warning(f"No data for {ticker}")
             return pd.DataFrame()
         df = df.reset_index()
-        df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
+        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
         return df
     except Exception as e:
         logger.error(f"Error fetching {ticker}: {e}")
         return pd.DataFrame()
 
-def normalize_prices(prices: np.ndarray) -> np.ndarray:
-    """Normalize prices to 0-1 range"""
-    if len(prices) == 0:
-        return prices
-    scaler = MinMaxScaler()
-    return scaler.fit_transform(prices.reshape(-1, 1)).flatten()
-
-def calculate_similarity(prices1: np.ndarray, prices2: np.ndarray) -> tuple:
-    """Calculate similarity between two price series"""
-    if len(prices1) == 0 or len(prices2) == 0:
-        return 0.0, 0.0
-    
-    # Normalize both series
-    norm1 = normalize_prices(prices1)
-    norm2 = normalize_prices(prices2)
-    
-    # Resample to same length if needed
-    if len(norm1) != len(norm2):
-        min_len = min(len(norm1), len(norm2))
-        indices1 = np.linspace(0, len(norm1)-1, min_len).astype(int)
-        indices2 = np.linspace(0, len(norm2)-1, min_len).astype(int)
-        norm1 = norm1[indices1]
-        norm2 = norm2[indices2]
-    
-    # Calculate Euclidean distance (lower is more similar)
-    distance = euclidean(norm1, norm2)
-    # Convert to similarity (0-1 scale)
-    max_distance = np.sqrt(len(norm1))  # Max possible distance for normalized data
-    similarity = max(0, 1 - (distance / max_distance))
-    
-    # Calculate correlation
-    try:
-        correlation, _ = pearsonr(norm1, norm2)
-        if np.isnan(correlation):
-            correlation = 0.0
-    except:
-        correlation = 0.0
-    
-    return similarity, correlation
+def fresh_panel():
+    """The attached shared panel if it was published recently, else None"""
+    snapshot = shared_panel.current()
+    if snapshot is not None and datetime.now(timezone.utc) - snapshot.published_at <= 2 * SHARED_PANEL_REFRESH:
+        return snapshot
+    return None
 
-
-def find_best_matching_window(ref_prices: np.ndarray, target_prices: np.ndarray, target_dates: list) -> dict:
+@timed_phase("fetch")
+def get_price_series(symbol: str, start_date: str, end_date: str) -> PriceSeries:
+    """get_stock_data for scans: closes straight from the price store, without a frame or date strings"""
+    try:
+        series = price_store.series(symbol, start_date, end_date)
+    except Exception as e:
+        logger.error(f"Error fetching {symbol}.IS: {e}")
+        return PriceSeries.empty(symbol)
+    if series is None:
+        # Range starts before the store's coverage
+        return PriceSeries.from_frame(symbol, get_stock_data(symbol, start_date, end_date))
+    return series
+
+def range_summary(symbol: str, start_date: str, end_date: str, prices: np.ndarray) -> dict:
     """
-    Sliding window ile hedef hissenin tüm geçmişinde referans kalıba en benzer dönemi bul.
-    
-    ref_prices: Referans kalıbın fiyatları
-    target_prices: Hedef hissenin TÜM geçmiş fiyatları
-    target_dates: Hedef hissenin tarihleri
-    
-    Returns: {
-        'similarity': float,
-        'correlation': float,
-        'start_idx': int,
-        'end_idx': int,
-        'start_date': str,
-        'end_date': str,
-        'prices': np.ndarray,
-        'after_1m_change': float or None,
-        'after_3m_change': float or None
-    }
+    analyze_stock summary from the store's precomputed range statistics when
+    the range lies in its coverage, else from the fetched prices
     """
-    if len(ref_prices) < 10 or len(target_prices) < len(ref_prices):
-        return None
-    
-    window_size = len(ref_prices)
-    best_match = {
-        'similarity': 0,
-        'correlation': 0,
-        'start_idx': 0,
-        'end_idx': window_size,
-        'start_date': '',
-        'end_date': '',
-        'prices': None,
-        'after_1m_change': None,
-        'after_3m_change': None,
-        'pattern_end_price': None
-    }
-    
-    # Normalize reference pattern once
-    ref_norm = normalize_prices(ref_prices)
-    
-    # Slide window across target history
-    # Step size: her 5 günde bir kontrol et (performans için)
-    step_size = max(1, window_size // 10)
-    
-    for start_idx in range(0, len(target_prices) - window_size + 1, step_size):
-        end_idx = start_idx + window_size
-        window_prices = target_prices[start_idx:end_idx]
-        
-        # Normalize window
-        window_norm = normalize_prices(window_prices)
-        
-        # Calculate similarity
-        distance = euclidean(ref_norm, window_norm)
-        max_distance = np.sqrt(len(ref_norm))
-        similarity = max(0, 1 - (distance / max_distance))
-        
-        if similarity > best_match['similarity']:
-            # Calculate correlation
-            try:
-                correlation, _ = pearsonr(ref_norm, window_norm)
-                if np.isnan(correlation):
-                    correlation = 0.0
-            except:
-                correlation = 0.0
-            
-            # Kalıptan sonraki performansı hesapla
-            after_1m_change = None
-            after_3m_change = None
-            pattern_end_price = window_prices[-1]
-            
-            # 1 ay sonra (~22 işlem günü)
-            after_1m_idx = end_idx + 22
-            if after_1m_idx < len(target_prices):
-                after_1m_price = target_prices[after_1m_idx]
-                after_1m_change = round((after_1m_price - pattern_end_price) / pattern_end_price * 100, 2)
-            
-            # 3 ay sonra (~66 işlem günü)
-            after_3m_idx = end_idx + 66
-            if after_3m_idx < len(target_prices):
-                after_3m_price = target_prices[after_3m_idx]
-                after_3m_change = round((after_3m_price - pattern_end_price) / pattern_end_price * 100, 2)
-            
-            best_match = {
-                'similarity': similarity,
-                'correlation': correlation,
-                'start_idx': start_idx,
-                'end_idx': end_idx,
-                'start_date': target_dates[start_idx] if start_idx < len(target_dates) else '',
-                'end_date': target_dates[end_idx - 1] if end_idx - 1 < len(target_dates) else '',
-                'prices': window_prices,
-                'after_1m_change': after_1m_change,
-                'after_3m_change': after_3m_change,
-                'pattern_end_price': round(pattern_end_price, 2)
-            }
-    
-    return best_match if best_match['similarity'] > 0 else None
-
+    if start_date >= price_store.coverage_start:
+        try:
+            stats = price_store.range_stats(symbol)
+            lo, hi = stats.locate(start_date, end_date)
+            if hi - lo == len(prices):
+                return stats.summary(lo, hi)
+        except Exception as e:
+            logger.warning(f"Range stats unavailable for {symbol}: {e}")
+    return RangeStats(prices).summary(0, len(prices))
 
-def calculate_partial_similarity(ref_prices: np.ndarray, target_prices: np.ndarray, start_percent: float = 30) -> tuple:
+async def load_scan_closes(symbols: List[str], start_date: str, end_date: str) -> Dict[str, PriceSeries]:
     """
-    Kalıbın başlangıç kısmını karşılaştır - devam eden kalıpları bulmak için.
-    ref_prices: Referans hissenin tam kalıbı
-    target_prices: Karşılaştırılacak hissenin mevcut fiyatları
-    start_percent: Referans kalıbın ilk yüzde kaçı karşılaştırılacak
+    Close series for scan symbols, taken from the memory-mapped shared panel
+    when it is recent, otherwise (for symbols this worker has not loaded yet) from
+    one projected query on the shared bar collection (copies fetched within the
+    store TTL only). Symbols not returned here go through get_price_series.
     """
-    if len(ref_prices) < 10 or len(target_prices) < 10:
-        return 0.0, 0.0, 0.0
-    
-    # Referans kalıbın başlangıç kısmını al
-    ref_start_len = max(10, int(len(ref_prices) * start_percent / 100))
-    ref_start = ref_prices[:ref_start_len]
-    
-    # Target'ın son kısmını al (mevcut durumu)
-    target_recent = target_prices[-ref_start_len:] if len(target_prices) >= ref_start_len else target_prices
-    
-    # Normalize
-    ref_norm = normalize_prices(ref_start)
-    target_norm = normalize_prices(target_recent)
-    
-    # Aynı uzunluğa getir
-    min_len = min(len(ref_norm), len(target_norm))
-    if min_len < 5:
-        return 0.0, 0.0, 0.0
-    
-    indices1 = np.linspace(0, len(ref_norm)-1, min_len).astype(int)
-    indices2 = np.linspace(0, len(target_norm)-1, min_len).astype(int)
-    ref_norm = ref_norm[indices1]
-    target_norm = target_norm[indices2]
-    
-    # Benzerlik hesapla
-    distance = euclidean(ref_norm, target_norm)
-    max_distance = np.sqrt(len(ref_norm))
-    similarity = max(0, 1 - (distance / max_distance))
-    
-    # Korelasyon
-    try:
-        correlation, _ = pearsonr(ref_norm, target_norm)
-        if np.isnan(correlation):
-            correlation = 0.0
-    except:
-        correlation = 0.0
-    
-    # Kalıp ilerleme yüzdesi (target ne kadarını tamamlamış)
-    pattern_progress = (len(target_recent) / len(ref_prices)) * 100
-    
-    return similarity, correlation, pattern_progress
+    if start_date < price_store.coverage_start or not symbols:
+        return {}
+    with phase("fetch"):
+        series = {}
+        snapshot = fresh_panel()
+        if snapshot is not None:
+            series = {s: snapshot.close_series(s, start_date, end_date) for s in symbols if s in snapshot}
+        CACHE_REQUESTS.labels("shared_panel", "hit").inc(len(series))
+        CACHE_REQUESTS.labels("shared_panel", "miss").inc(len(symbols) - len(series))
+
+        shared = shared_bars.get("1d")
+        cold = [s for s in symbols if s not in series and not price_store.is_cached(s)]
+        if shared is None or not shared.ready or not cold:
+            return series
+        try:
+            series.update(await shared.closes(cold, start_date, end_date,
+                                              fetched_after=datetime.now() - PRICE_STORE_TTL))
+        except Exception as e:
+            logger.warning(f"Shared close read failed: {e}")
+        return series
 
-def find_peaks_troughs(prices: np.ndarray, dates: List[str]) -> List[PeakTroughPoint]:
+def scan_in_process(kind: str, params: dict, symbols: List[str], scan_closes: Dict[str, PriceSeries],
+                    start_date: str, end_date: str) -> List[dict]:
     """
-    Find peaks and troughs based on the specified criteria:
-    - 1st dip: Starting point before 100% rise
-    - 1st peak: 100-160% rise from 1st dip, followed by 40-60% drop
-    - 2nd dip: After 40-60% drop from 1st peak
-    - 2nd peak: Exceeds 1st peak, then drops 20-30%
-    - And so on...
+    Scan kernel over symbols in this process (blocking; run in a thread).
+    Series missing from scan_closes are loaded through get_price_series.
     """
-    if len(prices) < 10:
-        return []
-    
-    points = []
-    window = 5
-    
-    # Find local minima and maxima
-    local_mins = []
-    local_maxs = []
-    
-    for i in range(window, len(prices) - window):
-        is_min = all(prices[i] <= prices[i-j] for j in range(1, window+1)) and \
-                 all(prices[i] <= prices[i+j] for j in range(1, window+1))
-        is_max = all(prices[i] >= prices[i-j] for j in range(1, window+1)) and \
-                 all(prices[i] >= prices[i+j] for j in range(1, window+1))
-        
-        if is_min:
-            local_mins.append((i, prices[i], dates[i]))
-        if is_max:
-            local_maxs.append((i, prices[i], dates[i]))
-    
-    # Identify significant peaks and troughs
-    dip_count = 0
-    peak_count = 0
-    last_dip = None
-    last_peak = None
-    
-    all_points = sorted(local_mins + local_maxs, key=lambda x: x[0])
-    
-    for idx, price, date in all_points:
-        is_dip = (idx, price, date) in local_mins
-        
-        if is_dip:
-            if last_peak is not None:
-                drop_pct = ((last_peak[1] - price) / last_peak[1]) * 100
-                
-                # Check criteria for each dip
-                if dip_count == 0 and drop_pct >= 40:
-                    dip_count += 1
-                    points.append(PeakTroughPoint(
-                        point_type="dip",
-                        point_number=dip_count,
-                        date=date,
-                        price=round(price, 2),
-                        percentage_change=round(-drop_pct, 2)
-                    ))
-                    last_dip = (idx, price, date)
-                elif dip_count >= 1 and last_peak is not None:
-                    if (dip_count == 1 and 40 <= drop_pct <= 60) or \
-                       (dip_count == 2 and 20 <= drop_pct <= 30) or \
-                       (dip_count >= 3 and 15 <= drop_pct <= 40):
-                        dip_count += 1
-                        points.append(PeakTroughPoint(
-                            point_type="dip",
-                            point_number=dip_count,
-                            date=date,
-                            price=round(price, 2),
-                            percentage_change=round(-drop_pct, 2)
-                        ))
-                        last_dip = (idx, price, date)
-            elif last_dip is None:
-                # First point - potential starting dip
-                dip_count += 1
-                points.append(PeakTroughPoint(
-                    point_type="dip",
-                    point_number=dip_count,
-                    date=date,
-                    price=round(price, 2),
-                    percentage_change=None
-                ))
-                last_dip = (idx, price, date)
-        else:
-            # It's a peak
-            if last_dip is not None:
-                rise_pct = ((price - last_dip[1]) / last_dip[1]) * 100
-                
-                # Check criteria for each peak
-                if peak_count == 0 and 100 <= rise_pct <= 160:
-                    peak_count += 1
-                    points.append(PeakTroughPoint(
-                        point_type="tepe",
-                        point_number=peak_count,
-                        date=date,
-                        price=round(price, 2),
-                        percentage_change=round(rise_pct, 2)
-                    ))
-                    last_peak = (idx, price, date)
-                elif peak_count >= 1:
-                    if last_peak is not None and price > last_peak[1]:
-                        peak_count += 1
-                        points.append(PeakTroughPoint(
-                            point_type="tepe",
-                            point_number=peak_count,
-                            date=date,
-                            price=round(price, 2),
-                            percentage_change=round(rise_pct, 2)
-                        ))
-                        last_peak = (idx, price, date)
-    
-    return points[:12]  # Limit to 12 points max
-
-
-def find_peaks_troughs_with_criteria(prices: np.ndarray, dates: List[str], criteria: PatternCriteria) -> List[PeakTroughPoint]:
+    kernel = SCAN_KERNELS[kind]
+    results = []
+    outcomes = dict.fromkeys(("scanned", "matched", "no_data", "error"), 0)
+    for symbol in symbols:
+        try:
+            series = scan_closes.get(symbol)
+            if series is None:
+                series = get_price_series(symbol, start_date, end_date)
+            if series.is_empty:
+                outcomes["no_data"] += 1
+                continue
+            result = kernel(symbol, series.close, series.dates, **params)
+        except Exception as e:
+            logger.warning(f"Error processing {symbol}: {e}")
+            outcomes["error"] += 1
+            continue
+        outcomes["scanned"] += 1
+        if result is not None:
+            outcomes["matched"] += 1
+            results.append(result)
+    for outcome, count in outcomes.items():
+        SCANNED_SYMBOLS.labels(kind, outcome).inc(count)
+    return results
+
+async def scan_universe(kind: str, params: dict, symbols: List[str], start_date: str, end_date: str,
+                        limit: int) -> List[dict]:
     """
-    Kullanıcının belirlediği kriterlere göre dip ve tepe noktalarını bul.
+    Run a scan kernel (analysis.SCAN_KERNELS) over symbols and return the top
+    `limit` results. Symbols parked by the circuit breaker are skipped
+    (counted as "blocked"). Symbols in a fresh shared panel are scanned in chunks by the
+    process pool; the rest (and chunks whose worker failed) run here on
+    load_scan_closes / get_price_series data.
     """
-    if len(prices) < 10:
-        return []
-    
-    points = []
-    window = 5
-    
-    # Find local minima and maxima
-    local_mins = []
-    local_maxs = []
-    
-    for i in range(window, len(prices) - window):
-        is_min = all(prices[i] <= prices[i-j] for j in range(1, window+1)) and \
-                 all(prices[i] <= prices[i+j] for j in range(1, window+1))
-        is_max = all(prices[i] >= prices[i-j] for j in range(1, window+1)) and \
-                 all(prices[i] >= prices[i+j] for j in range(1, window+1))
-        
-        if is_min:
-            local_mins.append((i, prices[i], dates[i]))
-        if is_max:
-            local_maxs.append((i, prices[i], dates[i]))
-    
-    # Kriterler listesi
-    rise_criteria = [
-        (criteria.rise_1_min, criteria.rise_1_max),
-        (criteria.rise_2_min, criteria.rise_2_max),
-        (criteria.rise_3_min, criteria.rise_3_max),
-        (criteria.rise_4_min, criteria.rise_4_max),
-        (criteria.rise_5_min, criteria.rise_5_max),
-    ]
-    
-    drop_criteria = [
-        (criteria.drop_1_min, criteria.drop_1_max),
-        (criteria.drop_2_min, criteria.drop_2_max),
-        (criteria.drop_3_min, criteria.drop_3_max),
-        (criteria.drop_4_min, criteria.drop_4_max),
-        (criteria.drop_5_min, criteria.drop_5_max),
-    ]
-    
-    dip_count = 0
-    peak_count = 0
-    last_dip = None
-    last_peak = None
-    
-    all_points = sorted(local_mins + local_maxs, key=lambda x: x[0])
-    
-    for idx, price, date in all_points:
-        is_dip = (idx, price, date) in local_mins
-        
-        if is_dip:
-            if last_peak is not None and dip_count < 6:
-                drop_pct = ((last_peak[1] - price) / last_peak[1]) * 100
-                
-                # Hangi düşüş kriterini kontrol edeceğiz
-                criterion_idx = min(dip_count, len(drop_criteria) - 1)
-                min_drop, max_drop = drop_criteria[criterion_idx]
-                
-                if min_drop <= drop_pct <= max_drop:
-                    dip_count += 1
-                    points.append(PeakTroughPoint(
-                        point_type="dip",
-                        point_number=dip_count,
-                        date=date,
-                        price=round(price, 2),
-                        percentage_change=round(-drop_pct, 2)
-                    ))
-                    last_dip = (idx, price, date)
-            elif last_dip is None and dip_count == 0:
-                # İlk dip noktası
-                dip_count += 1
-                points.append(PeakTroughPoint(
-                    point_type="dip",
-                    point_number=dip_count,
-                    date=date,
-                    price=round(price, 2),
-                    percentage_change=None
-                ))
-                last_dip = (idx, price, date)
-        else:
-            # Tepe noktası
-            if last_dip is not None and peak_count < 5:
-                rise_pct = ((price - last_dip[1]) / last_dip[1]) * 100
-                
-                # Hangi yükseliş kriterini kontrol edeceğiz
-                criterion_idx = min(peak_count, len(rise_criteria) - 1)
-                min_rise, max_rise = rise_criteria[criterion_idx]
-                
-                if min_rise <= rise_pct <= max_rise:
-                    # 2. tepe ve sonrası için önceki tepeyi geçmeli
-                    if peak_count == 0 or (last_peak is not None and price > last_peak[1]):
-                        peak_count += 1
-                        points.append(PeakTroughPoint(
-                            point_type="tepe",
-                            point_number=peak_count,
-                            date=date,
-                            price=round(price, 2),
-                            percentage_change=round(rise_pct, 2)
-                        ))
-                        last_peak = (idx, price, date)
-    
-    return points
+    allowed = price_store.health.allowed(symbols)
+    SCANNED_SYMBOLS.labels(kind, "blocked").inc(len(symbols) - len(allowed))
+    symbols = allowed
+    order = {s: i for i, s in enumerate(symbols)}
+    results, rest = [], symbols
+    snapshot = fresh_panel()
+    if scan_pool is not None and snapshot is not None and start_date >= price_store.coverage_start:
+        pooled = [s for s in symbols if s in snapshot]
+        results, unscanned = await scan_pool.scan(kind, params, pooled, start_date, end_date, limit)
+        skipped = set(pooled) - set(unscanned)
+        rest = [s for s in symbols if s not in skipped]
+
+    scan_closes = await load_scan_closes(rest, start_date, end_date)
+    # Kernels and cache-miss fetches are CPU/IO bound: keep them off the event loop
+    results += await asyncio.to_thread(scan_in_process, kind, params, rest, scan_closes, start_date, end_date)
+    return rank_results(results, kind, limit, order)
+
 
 # Auth Routes
 @api_router.post("/auth/register", response_model=RegisterResponse)
@@ -836,74 +602,218 @@ async def approve_user(user_id: str, current_user: dict = Depends(require_admin)
         raise HTTPException(status_code=404, detail="User not found")
     return {"status": "approved", "user_id": user_id, "approved_at": now}
 
+@api_router.get("/admin/symbol-health")
+async def get_symbol_health(current_user: dict = Depends(require_admin)):
+    """Symbols in the negative cache or with an open circuit breaker (this worker's view)"""
+    report = {}
+    for store in (price_store, hourly_store):
+        rows = store.health.snapshot()
+        report[store.interval] = {
+            "blocked": sum(1 for r in rows if r["blocked_until"] is not None),
+            "symbols": rows,
+        }
+    return report
+
+@api_router.post("/admin/symbol-health/reset")
+async def reset_symbol_health(symbol: Optional[str] = None, current_user: dict = Depends(require_admin)):
+    """Clear breaker state for one symbol (or all) so it is fetched again on next use"""
+    cleared = sum(store.health.reset(symbol) for store in (price_store, hourly_store))
+    return {"cleared": cleared, "symbol": symbol}
+
+@api_router.get("/admin/profiles")
+async def list_profiles(current_user: dict = Depends(require_admin)):
+    """Stored request profiles (profile any request with ?profile=cpu|memory or X-Profile)"""
+    return {"profiles": await asyncio.to_thread(profile_store.list)}
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json", current_user: dict = Depends(require_admin)):
+    """One report: json (summary), txt (pstats), prof (pstats dump) or callgrind"""
+    path = profile_store.path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type=PROFILE_FORMATS[format], filename=path.name)
+
 # Stock Routes
 @api_router.get("/stocks/symbols")
-async def get_symbols():
+async def get_symbols(include_metadata: bool = False):
     """Get list of BIST symbols - alfabetik sıralı (public)"""
-    sorted_symbols = sorted(BIST_100_SYMBOLS)
+    sorted_symbols = symbol_registry.symbols()
+    if include_metadata:
+        return {
+            "symbols": sorted_symbols,
+            "metadata": [symbol_registry.get(s) for s in sorted_symbols]
+        }
     return {"symbols": sorted_symbols}
 
+@api_router.get("/stocks/quotes")
+async def get_quotes(symbols: Optional[str] = None, current_user: dict = Depends(get_current_user)):
+    """
+    Batch quotes for watchlists/dashboards, answered from the shared panel when it is
+    fresh, else from the local price store.
+    symbols: comma-separated list of registry symbols (all if omitted; unknown symbols are a 400)
+    Returns a columnar payload: parallel arrays indexed like `symbols`.
+    """
+    if symbols:
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    else:
+        requested = symbol_registry.symbols()
+    if len(requested) > MAX_QUOTE_SYMBOLS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_QUOTE_SYMBOLS} symbols per request")
+    # Only registry symbols are fetched; anything else would trigger a provider download
+    unknown = [s for s in requested if s not in symbol_registry]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown symbols: {', '.join(unknown)}")
+    try:
+        # Symbols in a fresh shared panel are read from it; only the rest load full frames into this worker
+        snapshot = fresh_panel()
+        pooled = [s for s in requested if s in snapshot] if snapshot is not None else []
+        rest = [s for s in requested if snapshot is None or s not in snapshot]
+        parts = [snapshot.quotes(pooled)] if pooled else []
+        if rest or not parts:
+            parts.append(await asyncio.to_thread(price_store.quotes, rest))
+        return merge_quotes(requested, parts)
+    except Exception as e:
+        logger.error(f"Error getting quotes: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Lookback for period-based candle requests
+CANDLE_PERIODS = {
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "60d": pd.DateOffset(days=60),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+}
+
+@timed_phase("fetch")
+def load_candle_frame(symbol: str, interval: str, period: str,
+                      start_date: Optional[str], end_date: Optional[str],
+                      indicators: Sequence[IndicatorSpec] = ()) -> tuple:
+    """
+    Load OHLCV bars for a candle request.
+    Hourly/multi-hour bars come from the hourly store and daily/weekly/monthly bars
+    from the daily store; coarser intervals are aggregated locally (BIST sessions).
+    Ranges outside the stores' coverage are fetched from the provider and aggregated the same way.
+    Requested indicators are attached as extra columns, computed over the full
+    history (so they are warmed up at the first returned bar).
+    """
+    unit, _ = parse_interval(interval)
+    store = hourly_store if unit == "h" else price_store
+
+    if start_date and end_date:
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+    elif period in CANDLE_PERIODS:
+        start, end = pd.Timestamp.now().normalize() - CANDLE_PERIODS[period], None
+    else:
+        start = end = None
+
+    if start is not None and start >= pd.Timestamp(store.coverage_start):
+        df = store.bars(symbol, interval)
+        if indicators:
+            df = attach_indicators(df, store.indicators(symbol, interval, indicators))
+        if store.intraday:
+            start, end = start.tz_localize(BIST_TZ), end.tz_localize(BIST_TZ) if end is not None else None
+        df = df.loc[df.index >= start]
+        if end is not None:
+            df = df.loc[df.index < end]
+        return df
+
+    # Unknown periods (e.g. "max") load the full history
+    start = start if start is not None else pd.Timestamp("1970-01-01")
+    df = provider_history(symbol, start.strftime('%Y-%m-%d'),
+                          end.strftime('%Y-%m-%d') if end is not None else None, interval=store.interval)
+    if interval != store.interval and not df.empty:
+        df = resample_ohlcv(df[["Open", "High", "Low", "Close", "Volume"]], interval)
+    if indicators and not df.empty:
+        df = attach_indicators(df, compute_indicators(df, indicators))
+    return df
+
 @api_router.get("/stocks/{symbol}/candlestick")
 async def get_candlestick_data(
+    request: Request,
     symbol: str, 
     interval: str = "1d",
     period: str = "2y",
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    format: str = "json",
+    since: Optional[int] = None,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS),
+    downsample: str = "ohlc",
+    indicators: Optional[str] = None,
     current_user: dict = Depends(get_current_user)
 ):
     """
     Get candlestick (OHLC) data for charting.
-    interval: 1h, 4h, 1d, 1wk, 1mo
+    interval: 1h, 2h-8h (e.g. 4h), 1d, 1wk, 1mo (multi-week/month such as 2wk, 3mo also work)
     period: 1mo, 3mo, 6mo, 1y, 2y, 5y (used if start_date/end_date not provided)
     start_date, end_date: Optional date range (format: YYYY-MM-DD)
+    format: json (array of candles), columnar (parallel arrays) or binary (packed little-endian buffers)
+    since: Optional epoch seconds; only bars with time >= since are returned, so passing the
+           last bar's time returns the revised last bar plus any newer bars
+    max_points: Optional cap (>= 3) on returned bars for long ranges; downsample=ohlc aggregates
+                buckets keeping wicks (high/low extremes), downsample=lttb keeps LTTB-selected bars.
+                Request a narrower start_date/end_date slice for more detail when zooming.
+    indicators: Optional comma-separated list, e.g. sma:50,ema:20,rsi:14,bb:20:2,atr:14,vma:20
+                (json/columnar only); returned under "indicators", one value per candle
+                (null during warm-up), Bollinger bands as {upper, middle, lower}
+    Responses carry an ETag computed from the returned bars themselves, so every worker
+    validates the same URL alike (304 when unchanged), and are brotli/gzip compressed
+    according to Accept-Encoding. Daily candle times are the UTC midnight of the session date.
     """
-    ticker = f"{symbol}.IS"
+    require_known_symbol(symbol)
+    if format not in CANDLE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(CANDLE_FORMATS)}")
+    if downsample not in DOWNSAMPLE_MODES:
+        raise HTTPException(status_code=400, detail=f"downsample must be one of {', '.join(DOWNSAMPLE_MODES)}")
     try:
-        stock = yf.Ticker(ticker)
+        specs = parse_indicators(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if specs and format == "binary":
+        raise HTTPException(status_code=400, detail="indicators require format json or columnar")
+    try:
+        # Unknown/unsupported intervals fall back to daily bars
+        try:
+            unit, _ = parse_interval(interval)
+        except ValueError:
+            interval, unit = "1d", "d"
         
-        # Yahoo Finance interval mapping
-        valid_intervals = ["1h", "4h", "1d", "1wk", "1mo"]
-        if interval not in valid_intervals:
-            interval = "1d"
+        # For intraday data, period must be limited
+        if unit == "h" and not (start_date and end_date):
+            period = "60d"  # Default window for hourly data
         
-        # Use date range if provided, otherwise use period
-        if start_date and end_date:
-            df = stock.history(start=start_date, end=end_date, interval=interval)
-        else:
-            # For intraday data, period must be limited
-            if interval in ["1h", "4h"]:
-                period = "60d"  # Max 60 days for hourly data
-            df = stock.history(period=period, interval=interval)
+        # Store, shared-bar and provider reads block: keep them off the event loop
+        df = await asyncio.to_thread(load_candle_frame, symbol, interval, period, start_date, end_date, specs)
         
         if df.empty:
             raise HTTPException(status_code=404, detail=f"No data for {symbol}")
         
-        df = df.reset_index()
+        # Content version of the bars served (length, first/last bar, last row, close sum),
+        # not of the process that loaded them
+        etag = make_etag(symbol, interval, period, start_date, end_date, format, since,
+                         max_points, downsample, [s.key for s in specs], frame_version(df))
+        headers = cache_headers(etag)
+        if is_not_modified(request, etag):
+            return not_modified_response(headers)
         
-        candles = []
-        for _, row in df.iterrows():
-            # Handle datetime for different intervals
-            if 'Datetime' in df.columns:
-                timestamp = int(row['Datetime'].timestamp())
-            else:
-                timestamp = int(row['Date'].timestamp())
-            
-            candles.append({
-                "time": timestamp,
-                "open": round(float(row['Open']), 2),
-                "high": round(float(row['High']), 2),
-                "low": round(float(row['Low']), 2),
-                "close": round(float(row['Close']), 2),
-                "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0
-            })
+        meta = {"symbol": symbol, "interval": interval, "period": period}
+        if since is not None:
+            df = df.loc[pd.DatetimeIndex(df.index).asi8 // 1_000_000_000 >= since]
+            meta["since"] = since
+        if max_points and len(df) > max_points:
+            df = downsample_frame(df, max_points, downsample)
+            meta["max_points"] = max_points
         
-        return {
-            "symbol": symbol,
-            "interval": interval,
-            "period": period,
-            "candles": candles
-        }
+        df = df.reset_index()
+        
+        return candle_response(request, df, format, meta, headers,
+                               indicators=detach_indicators(df, specs) if specs else None)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting candlestick data for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -911,6 +821,9 @@ async def get_candlestick_data(
 @api_router.post("/stocks/analyze", response_model=StockAnalysisResponse)
 async def analyze_stock(request: StockAnalysisRequest, current_user: dict = Depends(get_current_user)):
     """Analyze a single stock"""
+    if request.downsample not in DOWNSAMPLE_MODES:
+        raise HTTPException(status_code=400, detail=f"downsample must be one of {', '.join(DOWNSAMPLE_MODES)}")
+    require_known_symbol(request.symbol)
     df = get_stock_data(request.symbol, request.start_date, request.end_date)
     
     if df.empty:
@@ -921,36 +834,27 @@ async def analyze_stock(request: StockAnalysisRequest, current_user: dict = Depe
     
     peaks_troughs = find_peaks_troughs(prices, dates)
     
-    # Create price history
-    price_history = []
-    for i, row in df.iterrows():
-        price_history.append({
-            "date": row['Date'],
-            "open": round(row['Open'], 2),
-            "high": round(row['High'], 2),
-            "low": round(row['Low'], 2),
-            "close": round(row['Close'], 2),
-            "volume": int(row['Volume']) if pd.notna(row['Volume']) else 0
-        })
+    # Create price history (optionally downsampled; dip/tepe bars are always kept)
+    if request.max_points and len(df) > request.max_points:
+        pinned_dates = {p.date for p in peaks_troughs}
+        pinned = [i for i, d in enumerate(dates) if d in pinned_dates]
+        price_history = frame_to_price_history(
+            downsample_frame(df, request.max_points, request.downsample, pinned)
+        )
+    else:
+        price_history = frame_to_price_history(df)
     
-    # Calculate summary
-    summary = {
-        "min_price": round(prices.min(), 2),
-        "max_price": round(prices.max(), 2),
-        "avg_price": round(prices.mean(), 2),
-        "volatility": round(prices.std() / prices.mean() * 100, 2),
-        "total_return": round((prices[-1] - prices[0]) / prices[0] * 100, 2),
-        "data_points": len(prices)
-    }
+    summary = range_summary(request.symbol, request.start_date, request.end_date, prices)
     
-    return StockAnalysisResponse(
-        symbol=request.symbol,
-        start_date=request.start_date,
-        end_date=request.end_date,
-        prices=price_history,
-        peaks_troughs=peaks_troughs,
-        summary=summary
-    )
+    # Bypass per-item response_model re-validation; the schema still documents the payload
+    return ORJSONResponse({
+        "symbol": request.symbol,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "prices": price_history,
+        "peaks_troughs": [p.model_dump() for p in peaks_troughs],
+        "summary": summary
+    })
 
 @api_router.post("/stocks/find-similar", response_model=List[SimilarStockResult])
 async def find_similar_stocks(request: SimilaritySearchRequest, current_user: dict = Depends(get_current_user)):
@@ -960,6 +864,7 @@ async def find_similar_stocks(request: SimilaritySearchRequest, current_user: di
     Also calculates what happened AFTER the pattern completed.
     """
     # Get reference stock data
+    require_known_symbol(request.symbol)
     ref_df = get_stock_data(request.symbol, request.start_date, request.end_date)
     
     if ref_df.empty:
@@ -967,7 +872,6 @@ async def find_similar_stocks(request: SimilaritySearchRequest, current_user: di
     
     ref_prices = ref_df['Close'].values
     ref_pattern_length = len(ref_prices)
-    results = []
     
     # Her hisse için son 7 yıllık veriyi tara
     from datetime import datetime, timedelta
@@ -977,59 +881,15 @@ async def find_similar_stocks(request: SimilaritySearchRequest, current_user: di
     logger.info(f"Searching for patterns similar to {request.symbol} ({ref_pattern_length} days) in history from {history_start} to {history_end}")
     
     # Performans için hisse sayısını sınırla
-    stocks_to_check = BIST_100_SYMBOLS[:200]  # İlk 200 hisse
-    
-    for symbol in stocks_to_check:
-        if symbol == request.symbol:
-            continue
-        
-        try:
-            # Hissenin TÜM geçmiş verisini al
-            df = get_stock_data(symbol, history_start, history_end)
-            if df.empty or len(df) < ref_pattern_length + 66:  # En az kalıp + 3 ay sonrası kadar veri olmalı
-                continue
-            
-            all_prices = df['Close'].values
-            all_dates = df['Date'].tolist()
-            
-            # Sliding window ile en benzer dönemi bul
-            best_match = find_best_matching_window(ref_prices, all_prices, all_dates)
-            
-            if best_match and best_match['similarity'] >= request.min_similarity:
-                # O dönemdeki dip/tepe noktalarını bul
-                window_prices = best_match['prices']
-                window_start_idx = best_match['start_idx']
-                window_end_idx = best_match['end_idx']
-                window_dates = all_dates[window_start_idx:window_end_idx]
-                
-                peaks_troughs = find_peaks_troughs(window_prices, window_dates)
-                
-                # Güncel fiyat
-                current_price = all_prices[-1]
-                
-                results.append(SimilarStockResult(
-                    symbol=symbol,
-                    similarity_score=round(best_match['similarity'] * 100, 2),
-                    correlation=round(best_match['correlation'] * 100, 2),
-                    start_date=best_match['start_date'],
-                    end_date=best_match['end_date'],
-                    peaks_troughs=peaks_troughs,
-                    current_price=round(current_price, 2),
-                    price_change_percent=round((window_prices[-1] - window_prices[0]) / window_prices[0] * 100, 2),
-                    after_pattern_1m=best_match['after_1m_change'],
-                    after_pattern_3m=best_match['after_3m_change'],
-                    pattern_end_price=best_match['pattern_end_price']
-                ))
-        except Exception as e:
-            logger.warning(f"Error processing {symbol}: {e}")
-            continue
-    
-    # Sort by similarity score
-    results.sort(key=lambda x: x.similarity_score, reverse=True)
+    stocks_to_check = [s for s in SCAN_SYMBOLS[:200] if s != request.symbol]  # İlk 200 hisse
+    results = await scan_universe(
+        "similar", {"ref_prices": ref_prices.tolist(), "min_similarity": request.min_similarity},
+        stocks_to_check, history_start, history_end, request.limit,
+    )
     
     logger.info(f"Found {len(results)} similar patterns")
     
-    return results[:request.limit]
+    return [SimilarStockResult(**r) for r in results]
 
 
 @api_router.post("/stocks/find-partial-match", response_model=List[SimilarStockResult])
@@ -1039,6 +899,7 @@ async def find_partial_match_stocks(request: PartialMatchRequest, current_user:
     Bu, referans hissenin kalıbının ilk kısmına benzeyen hisseleri bulur.
     """
     # Get reference stock data
+    require_known_symbol(request.symbol)
     ref_df = get_stock_data(request.symbol, request.start_date, request.end_date)
     
     if ref_df.empty:
@@ -1053,7 +914,8 @@ async def find_partial_match_stocks(request: PartialMatchRequest, current_user:
     recent_start = (end_date_obj - timedelta(days=180)).strftime('%Y-%m-%d')
     
     # Performans için sadece ana BIST 100 hisselerini kontrol et
-    main_stocks = BIST_100_SYMBOLS[:150]  # İlk 150 hisse (en likid olanlar)
+    main_stocks = price_store.health.allowed(SCAN_SYMBOLS[:150])  # İlk 150 hisse (en likid olanlar)
+    scan_closes = await load_scan_closes(main_stocks, recent_start, request.end_date)
     
     # Compare with main BIST stocks for performance
     for symbol in main_stocks:
@@ -1062,12 +924,14 @@ async def find_partial_match_stocks(request: PartialMatchRequest, current_user:
         
         try:
             # Son 6 aylık veriyi al (devam eden kalıp için)
-            df = get_stock_data(symbol, recent_start, request.end_date)
-            if df.empty or len(df) < 20:
+            series = scan_closes.get(symbol)
+            if series is None:
+                series = get_price_series(symbol, recent_start, request.end_date)
+            if len(series) < 20:
                 continue
             
-            prices = df['Close'].values
-            dates = df['Date'].tolist()
+            prices = series.close
+            dates = series.dates
             
             # Kısmi benzerlik hesapla
             similarity, correlation, pattern_progress = calculate_partial_similarity(
@@ -1111,14 +975,19 @@ async def find_custom_pattern(request: CustomPatternRequest, current_user: dict
     max_drop_1 = criteria.get("max_drop_1", 60)
     min_rise_2 = criteria.get("min_rise_2", 20)   # Second rise %
     
-    for symbol in BIST_100_SYMBOLS:
+    stocks_to_check = price_store.health.allowed(SCAN_SYMBOLS)
+    scan_closes = await load_scan_closes(stocks_to_check, request.start_date, request.end_date)
+    
+    for symbol in stocks_to_check:
         try:
-            df = get_stock_data(symbol, request.start_date, request.end_date)
-            if df.empty or len(df) < 20:
+            series = scan_closes.get(symbol)
+            if series is None:
+                series = get_price_series(symbol, request.start_date, request.end_date)
+            if len(series) < 20:
                 continue
             
-            prices = df['Close'].values
-            dates = df['Date'].tolist()
+            prices = series.close
+            dates = series.dates
             
             # Find patterns matching criteria
             peaks_troughs = find_peaks_troughs(prices, dates)
@@ -1152,53 +1021,49 @@ async def find_custom_pattern(request: CustomPatternRequest, current_user: dict
     
     return results[:request.limit]
 
+@api_router.post("/stocks/screener")
+async def run_screener(request: ScreenerRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Teknik tarayıcı: koşulları (RSI < 30, kapanış SMA50'yi yukarı kesti, hacim > 2x VMA20,
+    52 haftalık zirveye %5 yakın, ...) AND/OR ile birleştirip tüm evrende tek seferde,
+    hizalı fiyat paneli üzerinde değerlendirir. Operand ve koşul söz dizimi: screener.py.
+    Sonuçlar `sort` operandına (varsayılan: sağlanan koşul sayısı) göre sıralıdır.
+    """
+    try:
+        condition = parse_condition(request.where)
+        sort = parse_operand(request.sort) if request.sort else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    requested = request.symbols or SCAN_SYMBOLS
+    symbols = price_store.health.allowed(requested)
+    SCANNED_SYMBOLS.labels("screener", "blocked").inc(len(requested) - len(symbols))
+    snapshot = fresh_panel()
+    with phase("fetch"):
+        if snapshot is not None:
+            screener = Screener.from_snapshot(snapshot, symbols)
+        else:
+            await asyncio.to_thread(price_store.load, symbols)
+            screener = await asyncio.to_thread(Screener.from_store, price_store, symbols)
+    results, matched = await asyncio.to_thread(screener.run, condition, sort, request.descending, request.limit)
+    SCANNED_SYMBOLS.labels("screener", "scanned").inc(len(screener.symbols))
+    SCANNED_SYMBOLS.labels("screener", "matched").inc(matched)
+    return {"screened": len(screener.symbols), "matched": matched, "results": results}
+
 @api_router.post("/stocks/advanced-pattern")
 async def find_advanced_pattern(request: AdvancedPatternRequest, current_user: dict = Depends(get_current_user)):
     """
     Gelişmiş kalıp arama - kullanıcının belirlediği 6 dip / 5 tepe kriterleriyle arama yapar.
     Her yükseliş ve düşüş için ayrı min/max değerleri kullanılır.
     """
-    results = []
-    criteria = request.criteria
-    
     # Performans için ilk 200 hisseyi kontrol et
-    stocks_to_check = sorted(BIST_100_SYMBOLS)[:200]
+    stocks_to_check = sorted(SCAN_SYMBOLS)[:200]
     
-    for symbol in stocks_to_check:
-        try:
-            df = get_stock_data(symbol, request.start_date, request.end_date)
-            if df.empty or len(df) < 30:
-                continue
-            
-            prices = df['Close'].values
-            dates = df['Date'].tolist()
-            
-            # Kullanıcı kriterlerine göre dip/tepe bul
-            peaks_troughs = find_peaks_troughs_with_criteria(prices, dates, criteria)
-            
-            # En az belirtilen sayıda nokta eşleşmeli
-            if len(peaks_troughs) >= request.min_points_match:
-                # Eşleşme skoru hesapla (bulunan nokta sayısı / maksimum nokta sayısı)
-                match_score = (len(peaks_troughs) / 11) * 100  # 6 dip + 5 tepe = 11
-                
-                results.append({
-                    "symbol": symbol,
-                    "peaks_troughs": [p.model_dump() for p in peaks_troughs],
-                    "current_price": round(prices[-1], 2),
-                    "price_change_percent": round((prices[-1] - prices[0]) / prices[0] * 100, 2),
-                    "matching_points_count": len(peaks_troughs),
-                    "match_score": round(match_score, 1),
-                    "dip_count": len([p for p in peaks_troughs if p.point_type == "dip"]),
-                    "peak_count": len([p for p in peaks_troughs if p.point_type == "tepe"])
-                })
-        except Exception as e:
-            logger.warning(f"Error processing {symbol}: {e}")
-            continue
-    
-    # Eşleşme skoruna göre sırala
-    results.sort(key=lambda x: x["match_score"], reverse=True)
-    
-    return results[:request.limit]
+    # Kullanıcı kriterlerine göre dip/tepe bul; eşleşme skoruna göre sıralı
+    return await scan_universe(
+        "advanced", {"criteria": request.criteria.model_dump(), "min_points_match": request.min_points_match},
+        stocks_to_check, request.start_date, request.end_date, request.limit,
+    )
 
 
 @api_router.post("/stocks/search-by-pattern", response_model=List[SimilarStockResult])
@@ -1213,156 +1078,64 @@ async def search_by_drawn_pattern(request: SearchByPatternRequest, current_user:
     # Extract price series from drawn points
     drawn_prices = np.array([p.price for p in request.points])
     
-    # Calculate ratios between consecutive points
-    drawn_ratios = []
-    for i in range(len(drawn_prices) - 1):
-        ratio = (drawn_prices[i + 1] - drawn_prices[i]) / drawn_prices[i] * 100
-        drawn_ratios.append(ratio)
-    
     logger.info(f"Searching patterns similar to drawn pattern with {len(request.points)} points")
-    logger.info(f"Drawn ratios: {drawn_ratios}")
-    
-    results = []
-    pattern_length = len(request.points)
+    logger.info(f"Drawn ratios: {drawn_ratios(drawn_prices)}")
     
     # Search history period
     from datetime import datetime, timedelta
     history_end = datetime.now().strftime('%Y-%m-%d')
     history_start = (datetime.now() - timedelta(days=7*365)).strftime('%Y-%m-%d')
     
-    stocks_to_check = sorted(BIST_100_SYMBOLS)[:200]
-    
-    for symbol in stocks_to_check:
-        if symbol == request.symbol:
-            continue
-        
-        try:
-            df = get_stock_data(symbol, history_start, history_end)
-            if df.empty or len(df) < pattern_length * 5:
-                continue
-            
-            all_prices = df['Close'].values
-            all_dates = df['Date'].tolist()
-            
-            # Find peaks and troughs in this stock's history
-            peaks_troughs = find_peaks_troughs(all_prices, all_dates)
-            
-            if len(peaks_troughs) < len(request.points):
-                continue
-            
-            # Sliding window through peaks/troughs
-            best_match = None
-            best_similarity = 0
-            
-            for start_idx in range(len(peaks_troughs) - pattern_length + 1):
-                window_pts = peaks_troughs[start_idx:start_idx + pattern_length]
-                window_prices = [pt.price for pt in window_pts]
-                
-                # Calculate ratios for this window
-                window_ratios = []
-                for i in range(len(window_prices) - 1):
-                    ratio = (window_prices[i + 1] - window_prices[i]) / window_prices[i] * 100
-                    window_ratios.append(ratio)
-                
-                # Compare ratios
-                if len(window_ratios) != len(drawn_ratios):
-                    continue
-                
-                # Calculate similarity based on ratio differences
-                total_diff = 0
-                for dr, wr in zip(drawn_ratios, window_ratios):
-                    # Both should have same direction (positive/negative)
-                    if (dr > 0) != (wr > 0):
-                        total_diff += 100  # Penalty for wrong direction
-                    else:
-                        total_diff += abs(dr - wr)
-                
-                avg_diff = total_diff / len(drawn_ratios)
-                similarity = max(0, 100 - avg_diff) / 100
-                
-                if similarity > best_similarity:
-                    best_similarity = similarity
-                    
-                    # Get date range and calculate after-pattern performance
-                    window_start_date = window_pts[0].date
-                    window_end_date = window_pts[-1].date
-                    
-                    # Find end index in all_dates
-                    end_idx = None
-                    for idx, d in enumerate(all_dates):
-                        if d == window_end_date:
-                            end_idx = idx
-                            break
-                    
-                    after_1m_change = None
-                    after_3m_change = None
-                    pattern_end_price = window_prices[-1]
-                    
-                    if end_idx is not None:
-                        # 1 month after (~22 trading days)
-                        after_1m_idx = end_idx + 22
-                        if after_1m_idx < len(all_prices):
-                            after_1m_price = all_prices[after_1m_idx]
-                            after_1m_change = round((after_1m_price - pattern_end_price) / pattern_end_price * 100, 2)
-                        
-                        # 3 months after (~66 trading days)
-                        after_3m_idx = end_idx + 66
-                        if after_3m_idx < len(all_prices):
-                            after_3m_price = all_prices[after_3m_idx]
-                            after_3m_change = round((after_3m_price - pattern_end_price) / pattern_end_price * 100, 2)
-                    
-                    best_match = {
-                        'start_date': window_start_date,
-                        'end_date': window_end_date,
-                        'peaks_troughs': window_pts,
-                        'after_1m_change': after_1m_change,
-                        'after_3m_change': after_3m_change,
-                        'pattern_end_price': round(pattern_end_price, 2)
-                    }
-            
-            if best_match and best_similarity >= request.min_similarity:
-                # Calculate correlation
-                try:
-                    drawn_norm = normalize_prices(drawn_prices)
-                    match_prices = np.array([pt.price for pt in best_match['peaks_troughs']])
-                    match_norm = normalize_prices(match_prices)
-                    correlation, _ = pearsonr(drawn_norm, match_norm)
-                    if np.isnan(correlation):
-                        correlation = 0.0
-                except:
-                    correlation = 0.0
-                
-                results.append(SimilarStockResult(
-                    symbol=symbol,
-                    similarity_score=round(best_similarity * 100, 2),
-                    correlation=round(correlation * 100, 2),
-                    start_date=best_match['start_date'],
-                    end_date=best_match['end_date'],
-                    peaks_troughs=best_match['peaks_troughs'],
-                    current_price=round(all_prices[-1], 2),
-                    price_change_percent=round((match_prices[-1] - match_prices[0]) / match_prices[0] * 100, 2),
-                    after_pattern_1m=best_match['after_1m_change'],
-                    after_pattern_3m=best_match['after_3m_change'],
-                    pattern_end_price=best_match['pattern_end_price']
-                ))
-        except Exception as e:
-            logger.warning(f"Error processing {symbol}: {e}")
-            continue
-    
-    results.sort(key=lambda x: x.similarity_score, reverse=True)
+    stocks_to_check = [s for s in sorted(SCAN_SYMBOLS)[:200] if s != request.symbol]
+    results = await scan_universe(
+        "drawn", {"drawn_prices": drawn_prices.tolist(), "min_similarity": request.min_similarity},
+        stocks_to_check, history_start, history_end, request.limit,
+    )
     logger.info(f"Found {len(results)} similar drawn patterns")
     
-    return results[:request.limit]
+    return [SimilarStockResult(**r) for r in results]
+
 
+# Distributed scan jobs
+@api_router.post("/scan-jobs")
+async def submit_scan_job(request: ScanJobRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Split a scan over the universe (or the given symbols) into tasks that idle
+    workers on any node pick up. Poll GET /scan-jobs/{job_id} for the results.
+    """
+    if not SCAN_QUEUE:
+        raise HTTPException(status_code=503, detail="Scan queue is disabled")
+    if request.kind not in SCAN_KERNELS:
+        raise HTTPException(status_code=400, detail=f"Unknown scan kind: {request.kind}")
+    expected = kernel_params(request.kind)
+    if sorted(request.params) != sorted(expected):
+        raise HTTPException(status_code=400, detail=f"{request.kind} scans take parameters: {', '.join(expected)}")
+    symbols = request.symbols or SCAN_SYMBOLS
+    job = await scan_queue.submit(request.kind, request.params, symbols, request.start_date, request.end_date,
+                                  request.limit, owner=current_user["id"])
+    return {"job_id": job["id"], "status": job["status"], "task_count": job["task_count"]}
+
+@api_router.get("/scan-jobs/{job_id}")
+async def get_scan_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Job progress (task counts by status); merged results once finished"""
+    job = await scan_queue.status(job_id)
+    if job is None or (job["owner"] != current_user["id"] and current_user.get("role") != "admin"):
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+async def execute_scan_task(job: dict, task: dict) -> List[dict]:
+    """Queue task -> this worker's scan path (process pool over the shared panel)"""
+    return await scan_universe(job["kind"], job["params"], task["symbols"], job["start_date"], job["end_date"],
+                               job["limit"])
 
 @api_router.get("/stocks/{symbol}/quick")
 async def get_stock_quick(symbol: str, current_user: dict = Depends(get_current_user)):
     """Get quick stock info"""
-    ticker = f"{symbol}.IS"
+    require_known_symbol(symbol)
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        hist = stock.history(period="5d")
+        # Name/sector/market cap come from the registry instead of a per-request stock.info call
+        meta = await symbol_registry.ensure(symbol)
+        hist = await asyncio.to_thread(price_store.get, symbol)
         
         if hist.empty:
             raise HTTPException(status_code=404, detail=f"No data for {symbol}")
@@ -1373,13 +1146,15 @@ async def get_stock_quick(symbol: str, current_user: dict = Depends(get_current_
         
         return {
             "symbol": symbol,
-            "name": info.get("shortName", symbol),
+            "name": meta["name"],
             "current_price": round(current_price, 2),
             "change_percent": round(change_pct, 2),
             "volume": int(hist['Volume'].iloc[-1]) if pd.notna(hist['Volume'].iloc[-1]) else 0,
-            "market_cap": info.get("marketCap"),
-            "sector": info.get("sector", "N/A")
+            "market_cap": meta["market_cap"],
+            "sector": meta["sector"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting quick data for {symbol}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1411,17 +1186,92 @@ async def get_saved_analyses(current_user: dict = Depends(get_current_user)):
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
+# Prometheus metrics (see metrics.py); scrape with `Authorization: Bearer $METRICS_TOKEN` when it is set
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+@api_router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    """Request/phase latency histograms, scan and cache counters, upstream errors"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Include router
 app.include_router(api_router)
 
+# Inside MetricsMiddleware so profile reports include the request's phase totals
+app.add_middleware(ProfilingMiddleware, authorize=profiling_admin, store=profile_store)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Candle-Count", "X-Candle-Layout", "X-Candle-Symbol", "X-Candle-Interval", "X-Candle-Period",
+        "X-Candle-Since", "X-Candle-Max-Points", "ETag", "X-Profile-Id",
+    ],
 )
 
+@app.on_event("startup")
+async def start_symbol_registry():
+    await symbol_registry.init()
+    app.state.symbol_registry_task = asyncio.create_task(symbol_registry.run_scheduler())
+
+@app.on_event("startup")
+async def init_shared_bars():
+    for shared in shared_bars.values():
+        try:
+            await asyncio.to_thread(shared.init)
+        except Exception as e:
+            logger.warning(f"Shared bars disabled for {shared.name}: {e}")
+
+@app.on_event("startup")
+async def start_warmup_schedule():
+    if os.environ.get("WARMUP_AFTER_CLOSE", "1") == "1":
+        app.state.warmup_task = asyncio.create_task(
+            run_after_close([price_store, hourly_store], symbol_registry.symbols(), DEFAULT_CACHE_DIR)
+        )
+
+@app.on_event("startup")
+async def start_panel_publisher():
+    if os.environ.get("SHARED_PANEL", "1") == "1":
+        app.state.panel_task = asyncio.create_task(
+            run_panel_publisher(price_store, SCAN_SYMBOLS, DEFAULT_PANEL_DIR, SHARED_PANEL_REFRESH)
+        )
+
+@app.on_event("startup")
+async def start_scan_queue():
+    if not SCAN_QUEUE:
+        return
+    try:
+        await scan_queue.init()
+    except Exception as e:
+        logger.warning(f"Scan queue unavailable: {e}")
+        return
+    app.state.scan_queue_task = asyncio.create_task(scan_queue.run_worker(execute_scan_task))
+    app.state.scan_coordinator_task = asyncio.create_task(scan_queue.run_coordinator())
+
+@app.on_event("startup")
+async def start_scan_pool():
+    global scan_pool
+    if SCAN_WORKERS > 0:
+        scan_pool = ScanPool(SCAN_WORKERS, DEFAULT_PANEL_DIR)
+        scan_pool.warm()
+        logger.info(f"Scan pool started with {SCAN_WORKERS} worker processes")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for name in ("symbol_registry_task", "warmup_task", "panel_task", "scan_queue_task", "scan_coordinator_task"):
+        task = getattr(app.state, name, None)
+        if task is not None:
+            task.cancel()
+    if scan_pool is not None:
+        scan_pool.shutdown()
+    close_provider = getattr(data_provider, "close", None)
+    if close_provider is not None:
+        close_provider()
     client.close()
@@ -0,0 +1,178 @@
+"""
+Aligned (field x date x symbol) daily price matrix shared by all worker processes.
+
+One process (the warm-up CLI, or whichever uvicorn worker holds the panel
+lock) builds the matrix from its PriceStore and writes it as a .npy file
+named after the data version, then atomically replaces panel.json to point
+at it. Every worker attaches with np.load(mmap_mode="r"): the arrays are
+read-only zero-copy views backed by the OS page cache, so N workers share
+one copy of the data instead of holding N. Readers notice a new manifest
+and swap to the new file; files of older versions are unlinked, which is
+safe because open mappings keep their pages alive.
+
+The default directory is on disk next to the price cache (page-cache backed);
+set SHARED_PANEL_DIR=/dev/shm/... to keep it in tmpfs instead.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from price_store import DEFAULT_CACHE_DIR, OHLCV_COLUMNS, PriceStore, quote_columns
+from series import PriceSeries, epoch_days
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PANEL_DIR = Path(os.environ.get("SHARED_PANEL_DIR", DEFAULT_CACHE_DIR / "panel"))
+MANIFEST = "panel.json"
+# Files of the current and previous version are kept on disk
+KEEP_VERSIONS = 2
+
+
+def panel_version(store: PriceStore, symbols: List[str]) -> str:
+    """Content version over the symbols' data versions (same on every process)"""
+    key = "|".join(f"{s}:{store.data_version(s)}" for s in symbols)
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def _write_json(path: Path, data: dict):
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def publish_panel(store: PriceStore, symbols: List[str], root: Path = DEFAULT_PANEL_DIR) -> Optional[dict]:
+    """
+    Build the (5, dates, symbols) OHLCV matrix from a daily store and publish it.
+    Returns the manifest, or None if there is no data. A no-op when the
+    published version is already current.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    store.load(symbols)
+    frames = {s: store.get(s) for s in dict.fromkeys(symbols)}
+    frames = {s: df for s, df in sorted(frames.items()) if not df.empty}
+    if not frames:
+        return None
+
+    version = panel_version(store, list(frames))
+    manifest_path = root / MANIFEST
+    if manifest_path.exists():
+        current = json.loads(manifest_path.read_text())
+        if current.get("version") == version and (root / current["file"]).exists():
+            return current
+
+    dates = pd.DatetimeIndex(sorted(set().union(*(df.index for df in frames.values()))))
+    file_name = f"panel-{version}.npy"
+    tmp = root / f"{file_name}.{os.getpid()}.tmp"
+    # Filled in place on disk: the publisher never holds a second in-memory copy
+    array = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64,
+                                      shape=(len(OHLCV_COLUMNS), len(dates), len(frames)))
+    array[:] = np.nan
+    for j, df in enumerate(frames.values()):
+        rows = dates.get_indexer(df.index)
+        array[:, rows, j] = df[OHLCV_COLUMNS].to_numpy(dtype=np.float64).T
+    array.flush()
+    del array
+    os.replace(tmp, root / file_name)
+
+    manifest = {
+        "version": version,
+        "file": file_name,
+        "fields": OHLCV_COLUMNS,
+        "symbols": list(frames),
+        "dates": dates.strftime('%Y-%m-%d').tolist(),
+        "published_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _write_json(manifest_path, manifest)
+
+    stale = sorted(root.glob("panel-*.npy"), key=lambda p: p.stat().st_mtime, reverse=True)[KEEP_VERSIONS:]
+    for path in stale:
+        path.unlink(missing_ok=True)
+    logger.info(f"Published price panel {version}: {len(dates)} dates x {len(frames)} symbols")
+    return manifest
+
+
+class PanelSnapshot:
+    """One published panel version, attached read-only"""
+
+    __slots__ = ("version", "published_at", "symbols", "dates", "days", "data", "_columns", "_fields")
+
+    def __init__(self, manifest: dict, data: np.ndarray):
+        self.version = manifest["version"]
+        self.published_at = datetime.fromisoformat(manifest["published_at"])
+        self.symbols: List[str] = manifest["symbols"]
+        self.dates = pd.DatetimeIndex(manifest["dates"])
+        self.days = epoch_days(self.dates)
+        self.data = data
+        self._columns: Dict[str, int] = {s: j for j, s in enumerate(self.symbols)}
+        self._fields: Dict[str, int] = {f: i for i, f in enumerate(manifest["fields"])}
+
+    def field(self, name: str) -> np.ndarray:
+        """(dates x symbols) view of one OHLCV field; NaN where a symbol has no bar"""
+        return self.data[self._fields[name]]
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._columns
+
+    def close_series(self, symbol: str, start_date: str, end_date: str) -> PriceSeries:
+        """Closes in [start_date, end_date), sessions without a bar dropped"""
+        column = self.field("Close")[:, self._columns[symbol]]
+        lo, hi = np.searchsorted(self.days, epoch_days([start_date, end_date]))
+        window = column[lo:hi]
+        valid = ~np.isnan(window)
+        return PriceSeries(symbol, self.days[lo:hi][valid], window[valid])
+
+    def quotes(self, symbols: List[str]) -> dict:
+        """PriceStore.quotes payload read from the panel (only the requested columns are copied)"""
+        available = [s for s in symbols if s in self._columns]
+        cols = [self._columns[s] for s in available]
+        return quote_columns(available, self.field("Close")[:, cols], self.field("Volume")[:, cols], self.dates,
+                             [s for s in symbols if s not in self._columns])
+
+    def closes(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Date/Close frame in [start_date, end_date) in the get_stock_data format"""
+        return self.close_series(symbol, start_date, end_date).to_frame()
+
+
+class SharedPanel:
+    """
+    Reader side: attaches to the published panel and follows new versions.
+    current() is cheap (one stat) when nothing changed.
+    """
+
+    def __init__(self, root: Path = DEFAULT_PANEL_DIR):
+        self.root = Path(root)
+        self._snapshot: Optional[PanelSnapshot] = None
+        self._manifest_mtime: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def current(self) -> Optional[PanelSnapshot]:
+        manifest_path = self.root / MANIFEST
+        try:
+            mtime = manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return self._snapshot
+        if mtime == self._manifest_mtime:
+            return self._snapshot
+        with self._lock:
+            if mtime != self._manifest_mtime:
+                try:
+                    manifest = json.loads(manifest_path.read_text())
+                    if self._snapshot is None or manifest["version"] != self._snapshot.version:
+                        data = np.load(self.root / manifest["file"], mmap_mode="r")
+                        self._snapshot = PanelSnapshot(manifest, data)
+                        logger.info(f"Attached price panel {manifest['version']}")
+                    self._manifest_mtime = mtime
+                except (OSError, ValueError, KeyError) as e:
+                    # Replaced between stat and open; the next call retries
+                    logger.warning(f"Could not attach price panel: {e}")
+        return self._snapshot
@@ -0,0 +1,87 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+class SymbolHealth:
+    """
+    Negative cache and per-symbol circuit breaker for price downloads.
+
+    A symbol whose download comes back empty or fails is not fetched again
+    for `negative_ttl`. After `threshold` consecutive failures the breaker
+    opens and the symbol is skipped for `cooldown`, doubling on every further
+    failure up to `max_cooldown` (renamed/delisted tickers end up parked for
+    days). Once the block expires one probe download is let through; a
+    success closes the breaker.
+    """
+
+    def __init__(self, negative_ttl: timedelta = timedelta(minutes=30), threshold: int = 3,
+                 cooldown: timedelta = timedelta(hours=6), max_cooldown: timedelta = timedelta(days=7)):
+        self.negative_ttl = negative_ttl
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def blocked_until(self, symbol: str, now: Optional[datetime] = None) -> Optional[datetime]:
+        entry = self._entries.get(symbol)
+        if entry is None or entry["blocked_until"] <= (now or datetime.now()):
+            return None
+        return entry["blocked_until"]
+
+    def allow(self, symbol: str, now: Optional[datetime] = None) -> bool:
+        return self.blocked_until(symbol, now) is None
+
+    def allowed(self, symbols: Iterable[str]) -> List[str]:
+        """Symbols worth fetching/scanning right now (order kept)"""
+        now = datetime.now()
+        return [s for s in symbols if self.allow(s, now)]
+
+    def record_success(self, symbol: str):
+        with self._lock:
+            self._entries.pop(symbol, None)
+
+    def record_failure(self, symbol: str, reason: str):
+        now = datetime.now()
+        with self._lock:
+            entry = self._entries.setdefault(symbol, {"failures": 0, "first_failure_at": now})
+            entry["failures"] += 1
+            entry["last_failure_at"] = now
+            entry["reason"] = reason
+            if entry["failures"] >= self.threshold:
+                block = min(self.cooldown * 2 ** (entry["failures"] - self.threshold), self.max_cooldown)
+            else:
+                block = self.negative_ttl
+            entry["blocked_until"] = now + block
+
+    def reset(self, symbol: Optional[str] = None) -> int:
+        """Forget one symbol (or all); returns the number of entries cleared"""
+        with self._lock:
+            if symbol is None:
+                count = len(self._entries)
+                self._entries.clear()
+                return count
+            return 1 if self._entries.pop(symbol, None) is not None else 0
+
+    def snapshot(self) -> List[dict]:
+        """Failing symbols, most failures first"""
+        now = datetime.now()
+        rows = []
+        for symbol, entry in list(self._entries.items()):
+            blocked = entry["blocked_until"] > now
+            if not blocked:
+                state = "half_open" if entry["failures"] >= self.threshold else "expired"
+            else:
+                state = "open" if entry["failures"] >= self.threshold else "negative"
+            rows.append({
+                "symbol": symbol,
+                "state": state,
+                "failures": entry["failures"],
+                "reason": entry["reason"],
+                "first_failure_at": entry["first_failure_at"].isoformat(),
+                "last_failure_at": entry["last_failure_at"].isoformat(),
+                "blocked_until": entry["blocked_until"].isoformat() if blocked else None,
+            })
+        rows.sort(key=lambda r: (-r["failures"], r["symbol"]))
+        return rows
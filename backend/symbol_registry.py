@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+REFRESH_LEASE = "symbol_refresh"
+
+# BIST 100+ Symbols - Kapsamlı liste (BIST 100, BIST 50 ve popüler hisseler)
+BIST_100_SYMBOLS = [
+    # Ana BIST 100 Hisseleri
+    "AEFES", "AFYON", "AGESA", "AGHOL", "AKBNK", "AKCNS", "AKFGY", "AKFYE", "AKSA", "AKSEN",
+    "ALARK", "ALBRK", "ALFAS", "ALGYO", "ALKIM", "ANSGR", "ARCLK", "ARDYZ", "ASELS", "ASUZU",
+    "AYDEM", "AYGAZ", "BERA", "BIENY", "BIMAS", "BRSAN", "BRYAT", "BTCIM", "BUCIM", "CANTE",
+    "CCOLA", "CEMTS", "CIMSA", "CLEBI", "CONSE", "DEVA", "DOAS", "DOHOL", "ECILC", "EGEEN",
+    "EKGYO", "ENJSA", "ENKAI", "ERBOS", "EREGL", "EUPWR", "EUREN", "FROTO", "GARAN", "GENIL",
+    "GESAN", "GLYHO", "GOZDE", "GUBRF", "GWIND", "HALKB", "HEKTS", "IPEKE", "ISCTR", "ISGYO",
+    "ISMEN", "KARSN", "KCAER", "KCHOL", "KLSER", "KONTR", "KONYA", "KOZAA", "KOZAL", "KRDMD",
+    "KRVGD", "KTLEV", "LMKDC", "LOGO", "MAVI", "MERCN", "MGROS", "MIATK", "MKGYO", "ODAS",
+    "OTKAR", "OYAKC", "PAPIL", "PETKM", "PGSUS", "QUAGR", "SAHOL", "SASA", "SELEC", "SISE",
+    "SKBNK", "SMRTG", "SOKM", "TAVHL", "TCELL", "THYAO", "TKFEN", "TKNSA", "TOASO", "TRGYO",
+    "TSKB", "TTKOM", "TTRAK", "TUPRS", "TURSG", "ULKER", "VAKBN", "VERUS", "VESTL", "YKBNK",
+    # Ek BIST Hisseleri
+    "TGSAS", "DESPC", "KLRHO", "GSRAY", "FENER", "BJKAS", "TSPOR", "NETAS", "INDES", "ARENA",
+    "ADESE", "ADEL", "AKENR", "ALCAR", "ALMAD", "ANELE", "ANHYT", "ANSEN", "ARASE", "ARMDA",
+    "ASTOR", "ATAGY", "ATLAS", "AVHOL", "AVOD", "AVTUR", "AYCES", "BAGFS", "BAKAB", "BANVT",
+    "BARMA", "BASGZ", "BAYRK", "BEYAZ", "BFREN", "BIGCH", "BIZIM", "BLCYT", "BMSCH", "BMSTL",
+    "BNTAS", "BOBET", "BOSSA", "BRISA", "BRKSN", "BRLSM", "BRMEN", "BURCE", "BURVA", "CASA",
+    "CEMAS", "CMENT", "CUSAN", "CVKMD", "DAGHL", "DAGI", "DAPGM", "DARDL", "DENGE", "DERHL",
+    "DERIM", "DESA", "DGATE", "DGGYO", "DGNMO", "DIRIT", "DITAS", "DJIST", "DMRGD", "DNISI",
+    "DOBUR", "DOCO", "DOGUB", "DOKTA", "DURDO", "DYOBY", "DZGYO", "EBEBK", "EDIP", "EGEPO",
+    "EGGUB", "EGPRO", "EGSER", "EKIZ", "EKSUN", "ELITE", "EMKEL", "EMNIS", "ENSRI", "EPLAS",
+    "ERSU", "ESCAR", "ESCOM", "ESEN", "ETILR", "ETYAT", "EUHOL", "EUYO", "EYGYO", "FADE",
+    "FMIZP", "FONET", "FORMT", "FORTE", "FRIGO", "GEDIK", "GEDZA", "GENTS", "GLBMD", "GLCVY",
+    "GLRYH", "GMTAS", "GOKNR", "GOLTS", "GOODY", "GRNYO", "GRSEL", "GRTRK", "GSDDE", "GSDHO",
+    "GZNMI", "HATEK", "HATSN", "HDFGS", "HEDEF", "HKTM", "HLGYO", "HTTBT", "HUBVC",
+    "HUNER", "HURGZ", "ICBCT", "ICUGS", "IDEAS", "IDGYO", "IEYHO", "IHEVA", "IHGZT", "IHLAS",
+    "IHLGM", "IHYAY", "IMASM", "INGRM", "INTEM", "INVEO", "INVES", "ISATR", "ISBIR", "ISBTR",
+    "ISFIN", "ISGSY", "ISKPL", "ISKUR", "ISSEN", "IZFAS", "IZINV", "IZMDC", "JANTS", "KAPLM",
+    "KAREL", "KARTN", "KARYE", "KATMR", "KAYSE", "KBORU", "KERVN", "KFEIN", "KGYO", "KIMMR",
+    "KLGYO", "KLKIM", "KLMSN", "KLNMA", "KMPUR", "KNFRT", "KONKA", "KOPOL", "KORDS", "KRPLS",
+    "KRSTL", "KRTEK", "KRVTN", "KUTPO", "KUYAS", "KZBGY", "KZGYO", "LIDER", "LIDFA", "LILAK",
+    "LINK", "LKMNH", "LUKSK", "MAALT", "MACKO", "MAGEN", "MAKIM", "MAKTK", "MANAS", "MARBL",
+    "MARKA", "MARTI", "MEDTR", "MEGAP", "MEKAG", "MEPET", "MERIT", "MERKO", "METRO",
+    "METUR", "MHRGY", "MIPAZ", "MMCAS", "MNDRS", "MNDTR", "MOBTL", "MOGAN", "MPARK", "MRGYO",
+    "MRSHL", "MSGYO", "MTRKS", "MTRYO", "MZHLD", "NATEN", "NIBAS", "NTGAZ", "NUGYO", "NUHCM",
+    "OBAMS", "OBASE", "ONCSM", "ORCAY", "ORGE", "ORMA", "OSMEN", "OSTIM", "OYLUM", "OZGYO",
+    "OZKGY", "OZRDN", "OZSUB", "PAGYO", "PAMEL", "PNLSN", "PNSUT", "POLHO", "POLTK", "PRDGS",
+    "PRKAB", "PRKME", "PRZMA", "PSDTC", "QNBFB", "QNBFL", "RALYH", "RAYSG", "REEDR", "RGYAS",
+    "RODRG", "ROYAL", "RTALB", "RUBNS", "RYSAS", "SAFKR", "SAMAT", "SANEL", "SANFM", "SANKO",
+    "SARKY", "SAYAS", "SDTTR", "SEGYO", "SEKFK", "SEKUR", "SELGD", "SELVA", "SEYKM", "SILVR",
+    "SNGYO", "SNICA", "SNKRN", "SNPAM", "SODSN", "SONME", "SURGY", "SUWEN", "TARKM", "TATGD",
+    "TBORG", "TDGYO", "TEKTU", "TERA", "TETMT", "TEZOL", "TLMAN", "TMPOL", "TMSN",
+    "TNZTP", "TRCAS", "TRILC", "TSGYO", "TUCLK", "TUKAS", "TUREX", "ULUUN",
+    "UMPAS", "UNLU", "USDTR", "USAS", "UZERB", "VAKFN", "VAKKO", "VANGD", "VBTYZ", "VERTU",
+    "VKFYO", "VKGYO", "VKING", "YAPRK", "YATAS", "YAYLA", "YGGYO", "YGYO", "YKSLN", "YUNSA",
+    "YYAPI", "ZEDUR", "ZOREN", "ZRGYO"
+]
+
+
+def dedupe_symbols(symbols: Iterable[str]) -> List[str]:
+    """Normalize and deduplicate symbols, keeping first-seen order"""
+    return list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+
+def fetch_symbol_metadata(symbol: str) -> dict:
+    """
+    Fetch metadata for a single symbol from Yahoo Finance (blocking).
+    Returns name, sector, market cap, listing status and first/last bar date.
+    """
+    import yfinance as yf  # deferred, see price_store.download_history
+
+    ticker = f"{symbol}.IS"
+    stock = yf.Ticker(ticker)
+    info = stock.info or {}
+    hist = stock.history(period="5d")
+
+    first_bar_date = None
+    try:
+        first_trade = stock.get_history_metadata().get("firstTradeDate")
+        if first_trade:
+            first_bar_date = datetime.fromtimestamp(int(first_trade), tz=timezone.utc).strftime('%Y-%m-%d')
+    except Exception:
+        first_bar_date = None
+
+    return {
+        "symbol": symbol,
+        "name": info.get("shortName") or info.get("longName") or symbol,
+        "sector": info.get("sector", "N/A"),
+        "market_cap": info.get("marketCap"),
+        "status": "active" if not hist.empty else "inactive",
+        "first_bar_date": first_bar_date,
+        "last_bar_date": hist.index[-1].strftime('%Y-%m-%d') if not hist.empty else None,
+    }
+
+
+class SymbolRegistry:
+    """
+    Deduplicated BIST symbol list with cached metadata.
+
+    Metadata is kept in memory and persisted to the `symbols` collection so that
+    all workers share one copy; entries older than `refresh_interval` are
+    refreshed from Yahoo (or the configured market data provider) by
+    `refresh()` / `run_scheduler()`. Only the worker holding the refresh lease
+    (a document in `locks`) fetches; the others pick its results up from the
+    collection. Failed fetches are not retried for `negative_ttl`.
+    """
+
+    def __init__(self, db, symbols: Iterable[str], refresh_interval: timedelta = timedelta(hours=24),
+                 check_interval: timedelta = timedelta(hours=1), concurrency: int = 4, provider=None,
+                 lease: timedelta = timedelta(minutes=30), negative_ttl: timedelta = timedelta(minutes=30)):
+        self._collection = db.symbols
+        self._locks = db.locks
+        self._fetch_metadata = provider.metadata if provider is not None else fetch_symbol_metadata
+        self._symbols = dedupe_symbols(symbols)
+        self._entries: Dict[str, dict] = {}
+        # symbol -> when its last metadata fetch failed
+        self._failed: Dict[str, datetime] = {}
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self.lease = lease
+        self.negative_ttl = negative_ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._refresh_lock = asyncio.Lock()
+
+    def symbols(self, status: Optional[str] = None) -> List[str]:
+        """Sorted symbol list, optionally filtered by listing status"""
+        if status is None:
+            return sorted(self._symbols)
+        return sorted(s for s in self._symbols if self.get(s)["status"] == status)
+
+    def get(self, symbol: str) -> dict:
+        """Cached metadata for a symbol (placeholder entry if never refreshed)"""
+        entry = self._entries.get(symbol)
+        if entry is None:
+            return {
+                "symbol": symbol,
+                "name": symbol,
+                "sector": "N/A",
+                "market_cap": None,
+                "status": "unknown",
+                "first_bar_date": None,
+                "last_bar_date": None,
+                "refreshed_at": None,
+            }
+        return entry
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._symbols
+
+    async def init(self):
+        await self._collection.create_index("symbol", unique=True)
+        await self.load()
+
+    async def load(self):
+        """Load persisted metadata written by any worker"""
+        docs = await self._collection.find(
+            {"symbol": {"$in": self._symbols}}, {"_id": 0}
+        ).to_list(len(self._symbols))
+        for doc in docs:
+            self._entries[doc["symbol"]] = doc
+
+    def _is_stale(self, symbol: str, now: datetime) -> bool:
+        refreshed_at = self._entries.get(symbol, {}).get("refreshed_at")
+        if not refreshed_at:
+            return True
+        return now - datetime.fromisoformat(refreshed_at) >= self.refresh_interval
+
+    async def ensure(self, symbol: str) -> dict:
+        """
+        Return metadata, fetching it once if the symbol has never been refreshed
+        (placeholder entry while a failed fetch is within negative_ttl)
+        """
+        if symbol not in self._entries:
+            failed_at = self._failed.get(symbol)
+            if failed_at is None or datetime.now(timezone.utc) - failed_at >= self.negative_ttl:
+                await self._refresh_symbol(symbol)
+        return self.get(symbol)
+
+    async def _refresh_symbol(self, symbol: str):
+        async with self._semaphore:
+            try:
+                meta = await asyncio.to_thread(self._fetch_metadata, symbol)
+            except Exception as e:
+                logger.warning(f"Metadata refresh failed for {symbol}: {e}")
+                self._failed[symbol] = datetime.now(timezone.utc)
+                return
+        self._failed.pop(symbol, None)
+        meta["refreshed_at"] = datetime.now(timezone.utc).isoformat()
+        previous = self._entries.get(symbol, {})
+        # Keep last known values when Yahoo omits them
+        for key in ("first_bar_date", "last_bar_date", "market_cap"):
+            if meta.get(key) is None and previous.get(key) is not None:
+                meta[key] = previous[key]
+        self._entries[symbol] = meta
+        await self._collection.update_one({"symbol": symbol}, {"$set": meta}, upsert=True)
+
+    async def _acquire_lease(self, now: datetime) -> bool:
+        """Take the cross-worker refresh lease; False while another worker holds it"""
+        await self._locks.update_one(
+            {"_id": REFRESH_LEASE}, {"$setOnInsert": {"owner": None, "expires": now}}, upsert=True
+        )
+        result = await self._locks.update_one(
+            {"_id": REFRESH_LEASE, "expires": {"$lte": now}},
+            {"$set": {"owner": WORKER_ID, "expires": now + self.lease}},
+        )
+        return result.modified_count == 1
+
+    async def _release_lease(self):
+        await self._locks.update_one(
+            {"_id": REFRESH_LEASE, "owner": WORKER_ID},
+            {"$set": {"owner": None, "expires": datetime.now(timezone.utc)}},
+        )
+
+    async def refresh(self, force: bool = False) -> int:
+        """Refresh stale entries; returns the number of symbols refreshed"""
+        async with self._refresh_lock:
+            # Another worker may have refreshed already
+            await self.load()
+            now = datetime.now(timezone.utc)
+            stale = [s for s in self._symbols if force or self._is_stale(s, now)]
+            if not stale:
+                return 0
+            if not await self._acquire_lease(now):
+                logger.info("Symbol metadata refresh is running on another worker")
+                return 0
+            try:
+                logger.info(f"Refreshing metadata for {len(stale)} symbols")
+                await asyncio.gather(*(self._refresh_symbol(s) for s in stale))
+            finally:
+                await self._release_lease()
+            return len(stale)
+
+    async def run_scheduler(self):
+        """Background loop refreshing stale entries every `check_interval`"""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Symbol registry refresh failed: {e}")
+            await asyncio.sleep(self.check_interval.total_seconds())
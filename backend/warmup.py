@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Bulk history warm-up / ingestion for the local price cache.
+
+Downloads many tickers per request, retries failed symbols with exponential
+backoff, reports progress and checkpoints completed symbols so an interrupted
+run resumes where it stopped. Runs as a CLI next to server.py and as a
+scheduled job inside the server after the BIST close. With MONGO_URL and
+DB_NAME set, bars are also bulk-upserted into the shared MongoDB collections.
+
+    python warmup.py                          # daily + hourly bars, all symbols
+    python warmup.py --interval 1d --batch-size 50
+    python warmup.py --symbols THYAO,GARAN --force
+"""
+import argparse
+import asyncio
+import fcntl
+import heapq
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from bar_store import MongoBarStore
+from price_store import DAILY_HISTORY, DEFAULT_CACHE_DIR, HOURLY_HISTORY, PriceStore
+from providers import MarketDataProvider, provider_from_env
+from resample import BIST_TZ
+from shared_panel import DEFAULT_PANEL_DIR, publish_panel
+from symbol_health import SymbolHealth
+from symbol_registry import BIST_100_SYMBOLS, dedupe_symbols
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 40
+DEFAULT_MAX_RETRIES = 4
+# After the 18:00 close and the 18:10 closing auction
+DEFAULT_RUN_AT = "18:30"
+
+
+def build_store(interval: str, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+                ttl: timedelta = timedelta(minutes=15),
+                provider: Optional[MarketDataProvider] = None,
+                health: Optional[SymbolHealth] = None,
+                shared: Optional[MongoBarStore] = None) -> PriceStore:
+    """Store configured like the server's daily (1d) or hourly (1h) store"""
+    history = HOURLY_HISTORY if interval == "1h" else DAILY_HISTORY
+    return PriceStore(history=history, ttl=ttl, interval=interval, cache_dir=cache_dir,
+                      provider=provider, health=health, shared=shared)
+
+
+class Checkpoint:
+    """Completed/failed symbols of a warm-up run, persisted after every batch"""
+
+    def __init__(self, path: Optional[Path], interval: str, resume: bool = True):
+        self.path = Path(path) if path is not None else None
+        self.data = {"interval": interval, "started_at": datetime.now().isoformat(),
+                     "completed_at": None, "done": [], "failed": {}}
+        if resume and self.path is not None and self.path.exists():
+            saved = json.loads(self.path.read_text())
+            if saved.get("interval") == interval and not saved.get("completed_at"):
+                self.data = saved
+                logger.info(f"Resuming warm-up from {self.path} ({len(saved['done'])} symbols done)")
+
+    @property
+    def done(self) -> set:
+        return set(self.data["done"])
+
+    def mark_done(self, symbols: Iterable[str]):
+        self.data["done"].extend(symbols)
+
+    def mark_failed(self, symbol: str, reason: str):
+        self.data["failed"][symbol] = reason
+
+    def save(self, completed: bool = False):
+        if completed:
+            self.data["completed_at"] = datetime.now().isoformat()
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.data, indent=2))
+        os.replace(tmp, self.path)
+
+
+def progress_eta(elapsed: float, completed: int, remaining: int) -> float:
+    """Seconds left at this run's pace (`completed` symbols in `elapsed` seconds); NaN before the first"""
+    return elapsed / completed * remaining if completed > 0 else float("nan")
+
+
+def warm_up(store: PriceStore, symbols: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE,
+            max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = 2.0,
+            checkpoint_path: Optional[Path] = None, resume: bool = True, force: bool = False) -> dict:
+    """
+    Fill/top up `store` for all symbols. Missing symbols get full history,
+    cached ones an incremental top-up (fresh ones are skipped unless force).
+    Failed symbols are re-queued in smaller batches with exponential backoff.
+    """
+    started = time.monotonic()
+    checkpoint = Checkpoint(checkpoint_path, store.interval, resume)
+    symbols = [s for s in dedupe_symbols(symbols) if s not in checkpoint.done]
+
+    # Tickers parked by the circuit breaker are only retried on a forced run
+    skipped = [] if force else [s for s in symbols if not store.health.allow(s)]
+    symbols = [s for s in symbols if s not in set(skipped)]
+    total = len(symbols) + len(checkpoint.done)
+
+    missing, stale = store.partition(symbols)
+    if force:
+        stale = [s for s in symbols if s not in set(missing)]
+    fresh = [s for s in symbols if s not in set(missing) and s not in set(stale)]
+    checkpoint.mark_done(fresh)
+    # Symbols restored from the checkpoint or already fresh are not work done by this run
+    baseline = len(checkpoint.done)
+
+    # (ready_at, seq, attempt, incremental, batch) - seq keeps heap ordering stable
+    queue: List[tuple] = []
+    seq = 0
+    for group, incremental in ((missing, False), (stale, True)):
+        for i in range(0, len(group), batch_size):
+            heapq.heappush(queue, (0.0, seq, 0, incremental, group[i:i + batch_size]))
+            seq += 1
+
+    while queue:
+        ready_at, _, attempt, incremental, batch = heapq.heappop(queue)
+        delay = ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+        start = store.top_up_start(batch) if incremental else store.coverage_start
+        try:
+            frames = store.fetch(batch, start, skip_blocked=False)
+        except Exception as e:
+            logger.warning(f"Batch download failed ({len(batch)} symbols): {e}")
+            frames = {}
+
+        fetched = [s for s in batch if s in frames]
+        store.ingest(fetched, frames, incremental)
+        checkpoint.mark_done(fetched)
+
+        failed = [s for s in batch if s not in frames]
+        if failed and attempt < max_retries:
+            backoff = base_delay * (2 ** attempt) * (1 + random.random())
+            # Split retries so one bad ticker does not sink a whole batch again
+            half = max(1, len(failed) // 2)
+            for i in range(0, len(failed), half):
+                heapq.heappush(queue, (time.monotonic() + backoff, seq, attempt + 1, incremental, failed[i:i + half]))
+                seq += 1
+        else:
+            for symbol in failed:
+                checkpoint.mark_failed(symbol, "no data after retries")
+            # Remember dead tickers as empty so the server does not refetch them until the TTL expires
+            if not incremental:
+                store.ingest(failed, {}, incremental=False)
+            else:
+                checkpoint.mark_done(failed)
+
+        checkpoint.save()
+        done = len(checkpoint.done)
+        elapsed = time.monotonic() - started
+        eta = progress_eta(elapsed, done - baseline, total - done)
+        logger.info(
+            f"[{store.interval}] {done}/{total} symbols, {len(checkpoint.data['failed'])} failed, "
+            f"{len(queue)} batches queued, {elapsed:.0f}s elapsed, ~{eta:.0f}s left"
+        )
+
+    checkpoint.save(completed=True)
+    return {
+        "interval": store.interval,
+        "symbols": total,
+        "done": len(checkpoint.done),
+        "failed": sorted(checkpoint.data["failed"]),
+        "skipped": sorted(skipped),
+        "seconds": round(time.monotonic() - started, 1),
+    }
+
+
+def checkpoint_path(checkpoint: Optional[Path], cache_dir: Path, interval: str, intervals: List[str]) -> Path:
+    """One checkpoint file per interval; an explicit path gets an -<interval> suffix when several intervals run"""
+    if checkpoint is None:
+        return cache_dir / f"warmup-{interval}.json"
+    if len(intervals) == 1:
+        return checkpoint
+    return checkpoint.with_name(f"{checkpoint.stem}-{interval}{checkpoint.suffix}")
+
+
+def _try_lock(cache_dir: Path, name: str = ".warmup.lock"):
+    """Node-wide lock so only one process runs the scheduled warm-up; None if held elsewhere"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    handle = open(cache_dir / name, "w")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def next_run_after_close(now: datetime, run_at: str = DEFAULT_RUN_AT) -> datetime:
+    """Next weekday `run_at` in BIST local time"""
+    hour, minute = map(int, run_at.split(":"))
+    tz = ZoneInfo(BIST_TZ)
+    local = now.astimezone(tz)
+    candidate = local.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if candidate <= local:
+        candidate += timedelta(days=1)
+    while candidate.weekday() >= 5:
+        candidate += timedelta(days=1)
+    return candidate
+
+
+async def run_after_close(stores: Iterable[PriceStore], symbols: List[str],
+                          cache_dir: Path = DEFAULT_CACHE_DIR, run_at: str = DEFAULT_RUN_AT,
+                          panel_dir: Optional[Path] = DEFAULT_PANEL_DIR):
+    """Background loop: top up every store once per trading day after the close, then republish the panel"""
+    stores = list(stores)
+    while True:
+        now = datetime.now(ZoneInfo(BIST_TZ))
+        next_run = next_run_after_close(now, run_at)
+        await asyncio.sleep((next_run - now).total_seconds())
+        lock = _try_lock(cache_dir)
+        if lock is None:
+            logger.info("Scheduled warm-up already running in another process")
+            continue
+        try:
+            for store in stores:
+                summary = await asyncio.to_thread(warm_up, store, symbols, force=True)
+                logger.info(f"Scheduled warm-up finished: {summary}")
+                if store.interval == "1d" and panel_dir is not None:
+                    await asyncio.to_thread(publish_panel, store, symbols, panel_dir)
+        except Exception as e:
+            logger.error(f"Scheduled warm-up failed: {e}")
+        finally:
+            lock.close()
+
+
+async def run_panel_publisher(store: PriceStore, symbols: List[str], panel_dir: Path = DEFAULT_PANEL_DIR,
+                              every: timedelta = timedelta(minutes=15)):
+    """
+    Background loop keeping the shared price panel current. Every worker runs it,
+    but only the one holding the publisher lock tops up and publishes; the others
+    take over if that worker exits.
+    """
+    lock = None
+    try:
+        while True:
+            if lock is None:
+                lock = _try_lock(panel_dir, ".publisher.lock")
+            if lock is not None:
+                try:
+                    await asyncio.to_thread(publish_panel, store, symbols, panel_dir)
+                except Exception as e:
+                    logger.error(f"Publishing the price panel failed: {e}")
+            await asyncio.sleep(every.total_seconds())
+    finally:
+        if lock is not None:
+            lock.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Warm up the local OHLCV cache")
+    parser.add_argument("--interval", choices=["1d", "1h", "all"], default="all")
+    parser.add_argument("--symbols", help="Comma-separated symbols (default: all BIST symbols)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES)
+    parser.add_argument("--cache-dir", type=Path, default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--checkpoint", type=Path,
+                        help="Checkpoint file (default: <cache-dir>/warmup-<interval>.json; "
+                             "with --interval all, <name>-<interval><ext> per interval)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an unfinished checkpoint")
+    parser.add_argument("--force", action="store_true", help="Top up symbols even if the cache is fresh")
+    parser.add_argument("--no-shared", action="store_true",
+                        help="Do not write bars to the shared MongoDB collections (MONGO_URL/DB_NAME)")
+    parser.add_argument("--panel-dir", type=Path, default=DEFAULT_PANEL_DIR,
+                        help="Where the daily price panel shared by workers is published")
+    parser.add_argument("--no-panel", action="store_true", help="Do not publish the shared price panel")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    provider = provider_from_env()
+    symbols = args.symbols.split(",") if args.symbols else provider.universe() or BIST_100_SYMBOLS
+    intervals = ["1d", "1h"] if args.interval == "all" else [args.interval]
+    shared_db = None
+    if not args.no_shared and os.environ.get("MONGO_URL") and os.environ.get("DB_NAME"):
+        from pymongo import MongoClient
+        shared_db = MongoClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+
+    lock = _try_lock(args.cache_dir)
+    if lock is None:
+        logger.error(f"Another warm-up is running on {args.cache_dir}")
+        return 1
+    summaries: Dict[str, dict] = {}
+    try:
+        for interval in intervals:
+            shared = None
+            if shared_db is not None:
+                shared = MongoBarStore(shared_db, interval)
+                shared.init()
+            store = build_store(interval, args.cache_dir, provider=provider, shared=shared)
+            checkpoint = checkpoint_path(args.checkpoint, args.cache_dir, interval, intervals)
+            summaries[interval] = warm_up(
+                store, symbols, batch_size=args.batch_size, max_retries=args.max_retries,
+                checkpoint_path=checkpoint, resume=not args.fresh, force=args.force,
+            )
+            if interval == "1d" and not args.no_panel:
+                publish_panel(store, symbols, args.panel_dir)
+    finally:
+        lock.close()
+    print(json.dumps(summaries, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,190 @@
+"""
+Async client for the Yahoo Finance chart endpoint (/v8/finance/chart/{ticker}).
+
+One pooled HTTP/2-capable httpx session is shared by all requests; each host
+gets its own concurrency limit, and transient failures (timeouts, 429, 5xx)
+are retried with exponential backoff and full jitter. Bars are auto-adjusted
+like yf.Ticker.history(), so results are interchangeable with yfinance.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+import pandas as pd
+
+from price_store import _clean_frame
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://query1.finance.yahoo.com"
+DEFAULT_HEADERS = {
+    # Yahoo rejects requests without a browser-like user agent
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "application/json",
+}
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class YahooChartError(Exception):
+    """Chart request failed for good (unknown ticker, bad range, retries exhausted)"""
+
+
+def _epoch(value) -> int:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(timezone.utc)
+    return int(ts.timestamp())
+
+
+def parse_chart(payload: dict, adjust: bool = True) -> pd.DataFrame:
+    """Chart JSON -> OHLCV frame on the exchange-local DatetimeIndex (empty if no bars)"""
+    chart = payload.get("chart") or {}
+    if chart.get("error"):
+        raise YahooChartError(chart["error"].get("description") or chart["error"].get("code"))
+    results = chart.get("result") or []
+    if not results or not results[0].get("timestamp"):
+        return pd.DataFrame()
+    result = results[0]
+    quote = result["indicators"]["quote"][0]
+    tz = result.get("meta", {}).get("exchangeTimezoneName") or "UTC"
+    index = pd.to_datetime(np.asarray(result["timestamp"], dtype=np.int64), unit="s", utc=True).tz_convert(tz)
+
+    # Missing values arrive as null
+    columns = {name: np.asarray(quote.get(name.lower()) or [], dtype=np.float64)
+               for name in ("Open", "High", "Low", "Close", "Volume")}
+    df = pd.DataFrame(columns, index=index)
+    adjclose = result["indicators"].get("adjclose")
+    if adjust and adjclose:
+        ratio = np.asarray(adjclose[0]["adjclose"], dtype=np.float64) / df["Close"].to_numpy()
+        for name in ("Open", "High", "Low"):
+            df[name] = df[name].to_numpy() * ratio
+        df["Close"] = np.asarray(adjclose[0]["adjclose"], dtype=np.float64)
+    return df
+
+
+class YahooChartClient:
+    """
+    Pooled async client for chart data.
+
+    max_per_host bounds in-flight requests per host so a fan-out over hundreds
+    of symbols does not trip Yahoo's rate limiting; max_connections bounds the
+    pool itself. Use as an async context manager or call aclose().
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, timeout: float = 10.0,
+                 max_connections: int = 20, max_per_host: int = 8, max_retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 30.0, http2: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.max_per_host = max_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, 5.0)),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            follow_redirects=True,
+        )
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    def _retry_delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # A server-sent Retry-After is honoured, but never beyond max_backoff
+        if response is not None and response.headers.get("retry-after", "").isdigit():
+            return min(float(response.headers["retry-after"]), self.max_backoff)
+        # Full jitter: spreads retries of a failed fan-out instead of re-synchronizing them
+        return random.uniform(0, min(self.backoff * (2 ** attempt), self.max_backoff))
+
+    async def _get_json(self, url: str, params: dict) -> dict:
+        limit = self._host_limit(url)
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                async with limit:
+                    response = await self._client.get(url, params=params)
+                if response.status_code not in RETRY_STATUS:
+                    if response.status_code == 404:
+                        # Unknown tickers come back as 404 with a chart.error body
+                        try:
+                            return response.json()
+                        except ValueError:
+                            raise YahooChartError(f"{url} not found (HTTP 404)") from None
+                    response.raise_for_status()
+                    return response.json()
+                reason = f"HTTP {response.status_code}"
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                reason = f"{type(e).__name__}: {e}"
+            if attempt == self.max_retries:
+                raise YahooChartError(f"{url} failed after {attempt + 1} attempts ({reason})")
+            delay = self._retry_delay(attempt, response)
+            logger.debug(f"Retrying {url} in {delay:.2f}s ({reason})")
+            await asyncio.sleep(delay)
+
+    async def chart(self, ticker: str, start, end=None, interval: str = "1d", adjust: bool = True) -> pd.DataFrame:
+        """Raw chart bars for one Yahoo ticker in [start, end)"""
+        params = {
+            "period1": _epoch(start),
+            "period2": _epoch(end) if end is not None else int(datetime.now(timezone.utc).timestamp()),
+            "interval": interval,
+            "events": "div,splits",
+            "includeAdjustedClose": "true",
+        }
+        payload = await self._get_json(f"{self.base_url}/v8/finance/chart/{ticker}", params)
+        return parse_chart(payload, adjust)
+
+    async def history(self, symbol: str, start, end=None, interval: str = "1d") -> pd.DataFrame:
+        """Cleaned OHLCV bars of a BIST symbol, same shape as price_store.download_history frames"""
+        df = await self.chart(f"{symbol}.IS", start, end, interval)
+        return _clean_frame(df, intraday=interval != "1d")
+
+    async def history_many(self, symbols: Iterable[str], start, end=None,
+                           interval: str = "1d") -> Dict[str, pd.DataFrame]:
+        """Concurrent history for many symbols; failed or empty symbols are left out"""
+        symbols = list(symbols)
+        results = await asyncio.gather(
+            *(self.history(s, start, end, interval) for s in symbols), return_exceptions=True
+        )
+        frames = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Chart download failed for {symbol}.IS: {result}")
+            elif not result.empty:
+                frames[symbol] = result
+        return frames
+
+    async def get_stock_data(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """Async counterpart of server.get_stock_data: 'Date' string column, empty frame on failure"""
+        ticker = f"{symbol}.IS"
+        try:
+            df = await self.history(symbol, start_date, end_date)
+        except Exception as e:
+            logger.error(f"Error fetching {ticker}: {e}")
+            return pd.DataFrame()
+        if df.empty:
+            logger.warning(f"No data for {ticker}")
+            return pd.DataFrame()
+        df = df.reset_index()
+        df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+        return df
+
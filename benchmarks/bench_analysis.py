@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the pattern analysis kernels (backend/analysis.py).
+
+Every case runs one kernel over seeded synthetic price series (providers.
+SyntheticProvider, fixed date range, so the inputs are identical on every run)
+at several series lengths and universe sizes, and records the median / min
+wall time of a number of repeats. Results are written as JSON and compared
+against a stored baseline: a case regresses when its best (min) time exceeds
+the baseline's by more than its threshold. The min is compared rather than
+the median because scheduler noise only ever adds time.
+
+    python benchmarks/bench_analysis.py                       # run, compare with baseline.json
+    python benchmarks/bench_analysis.py --quick               # smaller sizes, fewer repeats
+    python benchmarks/bench_analysis.py -o out.json           # also write the results
+    python benchmarks/bench_analysis.py --update-baseline     # accept current timings
+
+Baselines are machine-specific: regenerate baseline.json on the machine that
+runs the comparison (quick and full runs have separate case names). They
+also depend on the kernel backend (meta.kernels: numba when it is
+installed, see backend/kernels.py).
+Exit status is 1 when any case regresses.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from analysis import (  # noqa: E402
+    PatternCriteria, calculate_partial_similarity, calculate_similarity, find_best_matching_window,
+    find_peaks_troughs, find_peaks_troughs_with_criteria, scan_drawn,
+)
+from kernels import backend as kernel_backend  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+
+
+BASELINE = Path(__file__).with_name("baseline.json")
+# Allowed slowdown over the baseline min before a case counts as a regression
+DEFAULT_THRESHOLD = 0.25
+SEED = 42
+# Fixed range: bars do not depend on the day the benchmark runs
+DATA_START, DATA_END = "2015-01-01", "2022-01-01"
+
+LENGTHS = [250, 750, 1750]
+UNIVERSES = [10, 50]
+QUICK_LENGTHS = [250, 750]
+QUICK_UNIVERSES = [10]
+
+# Kalıp uzunlukları: ~3 aylık referans, 4 noktalı çizim
+REF_LENGTH = 60
+DRAWN_PRICES = [10.0, 13.0, 11.0, 14.0]
+# Loose enough that the criteria search walks the whole series
+BENCH_CRITERIA = PatternCriteria(
+    rise_1_min=5, rise_1_max=500, drop_1_min=5, drop_1_max=90, rise_2_min=5, rise_2_max=500,
+    drop_2_min=5, drop_2_max=90, rise_3_min=5, rise_3_max=500, drop_3_min=5, drop_3_max=90,
+)
+
+
+class SyntheticUniverse:
+    """Close series of the first N synthetic symbols, cut to a given length"""
+
+    def __init__(self, n_symbols: int, seed: int = SEED):
+        provider = SyntheticProvider(n_symbols=n_symbols, seed=seed)
+        frames = provider.download(provider.universe(), DATA_START, DATA_END)
+        self.series = [
+            (symbol, df["Close"].to_numpy(dtype=float), df.index.strftime('%Y-%m-%d').tolist())
+            for symbol, df in frames.items()
+        ]
+
+    def take(self, n_symbols: int, length: int):
+        return [(s, prices[:length], dates[:length]) for s, prices, dates in self.series[:n_symbols]]
+
+
+def _cases(universe: SyntheticUniverse, lengths: List[int], universes: List[int]) -> Dict[str, Callable[[], object]]:
+    """name -> zero-argument callable running the case once"""
+    _, ref_prices, _ = universe.take(1, REF_LENGTH)[0]
+    cases = {}
+
+    def add(name: str, kernel: Callable, inputs: list):
+        cases[name] = lambda: [kernel(*args) for args in inputs]
+
+    for length in lengths:
+        single = universe.take(1, length)
+        symbol, prices, dates = single[0]
+        add(f"calculate_similarity/len={length}", calculate_similarity, [(prices, prices[::-1])])
+        add(f"calculate_partial_similarity/len={length}", calculate_partial_similarity,
+            [(prices, prices[: length // 2])])
+        add(f"find_best_matching_window/len={length}", find_best_matching_window, [(ref_prices, prices, dates)])
+        add(f"find_peaks_troughs/len={length}", find_peaks_troughs, [(prices, dates)])
+        add(f"find_peaks_troughs_with_criteria/len={length}", find_peaks_troughs_with_criteria,
+            [(prices, dates, BENCH_CRITERIA)])
+        add(f"drawn_pattern/len={length}", scan_drawn, [(symbol, prices, dates, DRAWN_PRICES, 0.0)])
+
+    # Universe scans: one kernel over N symbols, as the scan endpoints run it
+    length = lengths[-1]
+    for n in universes:
+        series = universe.take(n, length)
+        add(f"find_best_matching_window/universe={n}/len={length}", find_best_matching_window,
+            [(ref_prices, prices, dates) for _, prices, dates in series])
+        add(f"find_peaks_troughs/universe={n}/len={length}", find_peaks_troughs,
+            [(prices, dates) for _, prices, dates in series])
+        add(f"drawn_pattern/universe={n}/len={length}", scan_drawn,
+            [(symbol, prices, dates, DRAWN_PRICES, 0.0) for symbol, prices, dates in series])
+    return cases
+
+
+def measure(run: Callable[[], object], repeats: int, min_time: float = 0.5) -> dict:
+    """Median/min seconds per run; fast cases are looped so each sample takes >= min_time / repeats"""
+    start = time.perf_counter()
+    run()
+    single = max(time.perf_counter() - start, 1e-9)
+    loops = max(1, int(min_time / repeats / single))
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        samples.append((time.perf_counter() - start) / loops)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "repeats": repeats, "loops": loops}
+
+
+def run_benchmarks(quick: bool = False, repeats: Optional[int] = None, pattern: Optional[str] = None) -> dict:
+    lengths = QUICK_LENGTHS if quick else LENGTHS
+    universes = QUICK_UNIVERSES if quick else UNIVERSES
+    repeats = repeats or (3 if quick else 7)
+    universe = SyntheticUniverse(max(universes))
+    prefix = "quick/" if quick else ""
+
+    results = {}
+    for name, run in _cases(universe, lengths, universes).items():
+        if pattern and pattern not in name:
+            continue
+        results[prefix + name] = measure(run, repeats)
+        print(f"{prefix + name:<60} {results[prefix + name]['median_s'] * 1000:10.3f} ms", file=sys.stderr)
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "seed": SEED,
+            "quick": quick,
+            "kernels": kernel_backend().name,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Per-case comparison with the baseline; a case's own threshold
+    (baseline["thresholds"][name]) overrides the default.
+    """
+    thresholds = baseline.get("thresholds", {})
+    rows = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append({"case": name, "status": "new", "min_s": result["min_s"]})
+            continue
+        allowed = thresholds.get(name, threshold)
+        ratio = result["min_s"] / base["min_s"]
+        rows.append({
+            "case": name,
+            "status": "regression" if ratio > 1 + allowed else "ok",
+            "min_s": result["min_s"],
+            "baseline_s": base["min_s"],
+            "ratio": round(ratio, 3),
+            "threshold": allowed,
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the pattern analysis kernels")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    parser.add_argument("--repeats", type=int, help="samples per case")
+    parser.add_argument("-k", dest="pattern", help="only cases whose name contains this")
+    parser.add_argument("-o", "--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown over baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="merge these results into the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.quick, args.repeats, args.pattern)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    report["comparison"] = compare(report, baseline, args.threshold)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    if args.update_baseline:
+        baseline.setdefault("results", {}).update(report["results"])
+        baseline["meta"] = report["meta"]
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = [row for row in report["comparison"] if row["status"] == "regression"]
+    for row in regressions:
+        print(f"REGRESSION {row['case']}: {row['min_s'] * 1000:.3f} ms vs {row['baseline_s'] * 1000:.3f} ms "
+              f"(x{row['ratio']}, allowed x{1 + row['threshold']:.2f})", file=sys.stderr)
+    print(json.dumps({"cases": len(report["comparison"]), "regressions": len(regressions)}))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark: import time and memory of a fresh worker.
+
+Every sample imports a module set in a new interpreter (as a uvicorn worker
+or a spawned scan process starts) and records the wall time of the import,
+the peak RSS of the process and which heavy optional packages got loaded.
+Cases:
+
+    server        import server (the API worker; offline synthetic provider)
+    scan_worker   import scan_pool (what a spawned scan process loads)
+
+Results use the bench_analysis.py report format and are compared against
+startup_baseline.json the same way (min time, per-case thresholds). A case
+also fails when it loads one of DEFERRED_MODULES, which must only be
+imported on first use.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from bench_analysis import DEFAULT_THRESHOLD, compare
+
+BACKEND = Path(__file__).resolve().parents[1] / "backend"
+BASELINE = Path(__file__).with_name("startup_baseline.json")
+
+# Packages the API must not pay for at import time
+DEFERRED_MODULES = ("scipy", "sklearn", "yfinance", "numba")
+
+CASES = {
+    "server": "server",
+    "scan_worker": "scan_pool",
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "deferred_loaded": [m for m in {deferred!r} if m in sys.modules],
+}}))
+"""
+
+
+def probe_env() -> dict:
+    """Offline settings: no network and no MongoDB round trips at import"""
+    env = dict(os.environ)
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "bench_startup")
+    env.setdefault("MARKET_DATA_PROVIDER", "synthetic")
+    return env
+
+
+def sample(module: str) -> dict:
+    code = PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=BACKEND, env=probe_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(repeats: int = 5) -> dict:
+    results = {}
+    for name, module in CASES.items():
+        sample(module)  # first run compiles .pyc files
+        samples = [sample(module) for _ in range(repeats)]
+        seconds = [s["seconds"] for s in samples]
+        results[f"startup/{name}"] = {
+            "median_s": statistics.median(seconds),
+            "min_s": min(seconds),
+            "repeats": repeats,
+            "max_rss_mb": round(max(s["max_rss_mb"] for s in samples), 1),
+            "modules": samples[-1]["modules"],
+            "deferred_loaded": samples[-1]["deferred_loaded"],
+        }
+        r = results[f"startup/{name}"]
+        print(f"startup/{name:<20} {r['median_s'] * 1000:9.1f} ms {r['max_rss_mb']:8.1f} MB "
+              f"{r['modules']:6d} modules", file=sys.stderr)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark worker cold start")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown over baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="merge these results into the baseline")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.repeats)
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    report["comparison"] = compare(report, baseline, args.threshold)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+    eager = {name: r["deferred_loaded"] for name, r in report["results"].items() if r["deferred_loaded"]}
+    for name, modules in eager.items():
+        print(f"EAGER IMPORT {name}: {', '.join(modules)}", file=sys.stderr)
+
+    if args.update_baseline:
+        baseline.setdefault("results", {}).update(report["results"])
+        baseline["meta"] = report["meta"]
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline updated: {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = [row for row in report["comparison"] if row["status"] == "regression"]
+    for row in regressions:
+        print(f"REGRESSION {row['case']}: {row['min_s'] * 1000:.1f} ms vs {row['baseline_s'] * 1000:.1f} ms "
+              f"(x{row['ratio']}, allowed x{1 + row['threshold']:.2f})", file=sys.stderr)
+    print(json.dumps({"cases": len(report["comparison"]), "regressions": len(regressions), "eager": len(eager)}))
+    return 1 if regressions or eager else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
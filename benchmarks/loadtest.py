@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the API in one process, with no network and no MongoDB.
+
+The FastAPI app is imported with the synthetic market data provider
+(MARKET_DATA_PROVIDER=synthetic) and its database swapped for an in-memory
+stand-in (tests/memory_mongo.py MemoryDatabase; enough of Motor for auth and the
+symbol registry). Requests go through httpx's ASGI transport, so each request runs
+the whole app on this event loop, as under uvicorn with one worker.
+
+Virtual analysts log in, then loop over a weighted mix of candlestick
+browsing, quotes, single-stock analysis, similarity scans and pattern
+searches. The test runs at increasing concurrency levels and reports, per
+level:
+- throughput
+- p50/p95/p99/max latency per endpoint
+- event-loop lag, sampled by a timer coroutine. Lag is how late a 10 ms
+  sleep wakes up: time the loop spent blocked in synchronous code.
+
+    python benchmarks/loadtest.py                            # 1,2,4,8,16 users, 20 s each
+    python benchmarks/loadtest.py -c 1,8,32 -d 60 -o load.json
+    python benchmarks/loadtest.py --mix candles=1 --think 0.5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+BACKEND_DIR = ROOT / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(ROOT))
+
+from tests.memory_mongo import MemoryDatabase  # noqa: E402  (shared with the test suite)
+
+
+def _configure_env(symbols: int, cache_dir: str):
+    """Offline settings; anything already set in the environment wins"""
+    defaults = {
+        "MONGO_URL": "mongodb://localhost:27017",  # never contacted: db is replaced
+        "DB_NAME": "loadtest",
+        "MARKET_DATA_PROVIDER": "synthetic",
+        "SYNTHETIC_SYMBOLS": str(symbols),
+        "PRICE_CACHE_DIR": cache_dir,
+        "WARMUP_AFTER_CLOSE": "0",
+        "SHARED_BARS": "0",
+        "SHARED_PANEL": "0",  # published once during warm-up instead
+        "SCAN_QUEUE": "0",
+    }
+    for key, value in defaults.items():
+        os.environ.setdefault(key, value)
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+
+PASSWORD = "LoadTest123!"
+
+
+class Stats:
+    """Latencies and errors per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, label: str, request) -> Optional[dict]:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        # The ASGI transport never waits on a socket; yield like a network client would
+        await asyncio.sleep(0)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            return None
+        if response.headers.get("content-type", "").startswith("application/json"):
+            return response.json()
+        return {}
+
+
+def _date(days_ago: int) -> str:
+    return (datetime.now() - timedelta(days=days_ago)).strftime('%Y-%m-%d')
+
+
+async def candles(client, headers, rng, stats, symbols):
+    symbol = rng.choice(symbols)
+    interval, period = rng.choice([("1d", "1y"), ("1d", "5y"), ("4h", "3mo"), ("1wk", "max")])
+    await stats.call("GET /stocks/{symbol}/candlestick", client.get(
+        f"/api/stocks/{symbol}/candlestick", params={"interval": interval, "period": period}, headers=headers))
+
+
+async def quotes(client, headers, rng, stats, symbols):
+    picked = ",".join(rng.sample(symbols, min(20, len(symbols))))
+    await stats.call("GET /stocks/quotes", client.get("/api/stocks/quotes", params={"symbols": picked}, headers=headers))
+
+
+async def analyze(client, headers, rng, stats, symbols):
+    await stats.call("POST /stocks/analyze", client.post("/api/stocks/analyze", json={
+        "symbol": rng.choice(symbols), "start_date": _date(365), "end_date": _date(0), "max_points": 500,
+    }, headers=headers))
+
+
+async def find_similar(client, headers, rng, stats, symbols):
+    start = rng.randint(90, 700)
+    await stats.call("POST /stocks/find-similar", client.post("/api/stocks/find-similar", json={
+        "symbol": rng.choice(symbols), "start_date": _date(start), "end_date": _date(start - 60),
+        "min_similarity": 0.7, "limit": 10,
+    }, headers=headers))
+
+
+async def advanced_pattern(client, headers, rng, stats, symbols):
+    await stats.call("POST /stocks/advanced-pattern", client.post("/api/stocks/advanced-pattern", json={
+        "criteria": {}, "start_date": _date(3 * 365), "end_date": _date(0), "min_points_match": 4, "limit": 20,
+    }, headers=headers))
+
+
+async def drawn_pattern(client, headers, rng, stats, symbols):
+    prices = [100.0]
+    for i in range(rng.randint(3, 6)):
+        prices.append(prices[-1] * (1 + rng.uniform(0.05, 0.3) * (1 if i % 2 == 0 else -1)))
+    points = [{"time": i, "price": p, "type": "tepe" if i % 2 else "dip"} for i, p in enumerate(prices)]
+    await stats.call("POST /stocks/search-by-pattern", client.post("/api/stocks/search-by-pattern", json={
+        "symbol": rng.choice(symbols), "points": points, "min_similarity": 0.6, "limit": 20,
+    }, headers=headers))
+
+
+SCENARIOS = {
+    "candles": candles,
+    "quotes": quotes,
+    "analyze": analyze,
+    "similar": find_similar,
+    "advanced": advanced_pattern,
+    "drawn": drawn_pattern,
+}
+# Çoğunlukla grafik gezintisi, arada taramalar
+DEFAULT_MIX = {"candles": 50, "quotes": 15, "analyze": 15, "similar": 8, "advanced": 6, "drawn": 6}
+
+
+async def analyst(client, email: str, mix: Dict[str, float], symbols: List[str], stats: Stats,
+                  stop_at: float, think: float, seed: int):
+    """One virtual user: log in, then run weighted scenarios until stop_at"""
+    rng = random.Random(seed)
+    body = await stats.call("POST /auth/login", client.post("/api/auth/login", json={"email": email, "password": PASSWORD}))
+    if not body:
+        return
+    headers = {"Authorization": f"Bearer {body['access_token']}"}
+    names, weights = list(mix), list(mix.values())
+    loop = asyncio.get_running_loop()
+    while loop.time() < stop_at:
+        await SCENARIOS[rng.choices(names, weights)[0]](client, headers, rng, stats, symbols)
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def loop_lag_monitor(samples: List[float], interval: float = 0.01):
+    """Record how late each `interval` sleep wakes up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {"p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "p99_ms": round(p99, 2),
+            "max_ms": round(max(values) * 1000, 2)}
+
+
+# ---------------------------------------------------------------------------
+# Runner
+
+
+async def run_level(client, users: List[str], mix, symbols, duration: float, think: float, seed: int) -> dict:
+    stats, lag = Stats(), []
+    monitor = asyncio.create_task(loop_lag_monitor(lag))
+    await asyncio.sleep(0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(
+        analyst(client, email, mix, symbols, stats, started + duration, think, seed + i)
+        for i, email in enumerate(users)
+    ))
+    elapsed = loop.time() - started
+    monitor.cancel()
+
+    endpoints = {}
+    for label in sorted(set(stats.latencies) | set(stats.errors)):
+        latencies = stats.latencies[label]
+        endpoints[label] = {"requests": len(latencies), "errors": stats.errors[label], **_percentiles(latencies)}
+    total = sum(len(v) for v in stats.latencies.values())
+    return {
+        "concurrency": len(users),
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(stats.errors.values()),
+        "throughput_rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+        "loop_lag": _percentiles(lag),
+    }
+
+
+def _print_level(level: dict):
+    lag = level["loop_lag"]
+    print(f"\n== {level['concurrency']} users: {level['requests']} requests in {level['elapsed_s']} s "
+          f"({level['throughput_rps']} req/s, {level['errors']} errors); "
+          f"loop lag p50 {lag['p50_ms']} / p99 {lag['p99_ms']} / max {lag['max_ms']} ms", file=sys.stderr)
+    print(f"{'endpoint':<36}{'n':>7}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}", file=sys.stderr)
+    for label, row in level["endpoints"].items():
+        cells = "".join(f"{row[k]:>10}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        print(f"{label:<36}{row['requests']:>7}{row['errors']:>6}{cells}", file=sys.stderr)
+
+
+async def run(levels: List[int], duration: float, mix: Dict[str, float], think: float, warm: bool, seed: int) -> dict:
+    import httpx
+    import server
+    from shared_panel import publish_panel
+
+    # In-memory database for every path the scenarios touch
+    server.db = MemoryDatabase()
+    server.symbol_registry._collection = server.db.symbols
+    password_hash = server.get_password_hash(PASSWORD)
+    users = [f"analyst{i}@example.com" for i in range(max(levels))]
+    for i, email in enumerate(users):
+        await server.db.users.insert_one({
+            "id": f"loadtest-{i}", "email": email, "full_name": f"Analyst {i}", "password_hash": password_hash,
+            "created_at": datetime.now(timezone.utc).isoformat(), "role": "user", "approved": True,
+        })
+
+    await server.app.router.startup()
+    try:
+        symbols = server.SCAN_SYMBOLS
+        if warm:
+            # Fill the stores and the shared panel first, as after a warm-up run
+            started = time.perf_counter()
+            await asyncio.to_thread(server.price_store.load, symbols)
+            await asyncio.to_thread(publish_panel, server.price_store, symbols, server.DEFAULT_PANEL_DIR)
+            print(f"Warm-up: {len(symbols)} symbols in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+
+        transport = httpx.ASGITransport(app=server.app)
+        results = []
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+            for concurrency in levels:
+                level = await run_level(client, users[:concurrency], mix, symbols, duration, think, seed)
+                _print_level(level)
+                results.append(level)
+    finally:
+        await server.app.router.shutdown()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "duration_s": duration,
+            "think_s": think,
+            "mix": mix,
+            "symbols": len(server.SCAN_SYMBOLS),
+            "scan_workers": server.SCAN_WORKERS,
+            "cpu_count": os.cpu_count(),
+            "warm": warm,
+        },
+        "levels": results,
+    }
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r} (choose from {', '.join(SCENARIOS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="In-process load test with synthetic data and in-memory MongoDB")
+    parser.add_argument("-c", "--concurrency", default="1,2,4,8,16", help="comma-separated user counts")
+    parser.add_argument("-d", "--duration", type=float, default=20, help="seconds per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="scenario weights, e.g. candles=50,similar=10 (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=0.0, help="mean think time between requests (s)")
+    parser.add_argument("--symbols", type=int, default=200, help="synthetic universe size")
+    parser.add_argument("--cold", action="store_true", help="skip the store/panel warm-up")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output", type=Path, help="write the report JSON here")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in re.split(r"[,\s]+", args.concurrency) if c]
+    with tempfile.TemporaryDirectory(prefix="bist-loadtest-") as cache_dir:
+        _configure_env(args.symbols, cache_dir)
+        report = asyncio.run(run(levels, args.duration, args.mix, args.think, not args.cold, args.seed))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
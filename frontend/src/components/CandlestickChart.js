@@ -3,6 +3,12 @@ import { createChart, CandlestickSeries, createSeriesMarkers } from 'lightweight
 import { Button } from './ui/button';
 import { Loader2 } from 'lucide-react';
 
+// Daily candle times are the UTC midnight of the session date; read them as calendar days
+const candleDay = (time) => {
+  const date = new Date(time * 1000);
+  return new Date(date.getUTCFullYear(), date.getUTCMonth(), date.getUTCDate());
+};
+
 const CandlestickChart = ({ 
   data, 
   loading, 
@@ -86,7 +92,7 @@ const CandlestickChart = ({
       if (!param.time) return;
       
       const clickTime = typeof param.time === 'object' 
-        ? new Date(param.time.year, param.time.month - 1, param.time.day).getTime() / 1000
+        ? Date.UTC(param.time.year, param.time.month - 1, param.time.day) / 1000
         : param.time;
       
       const currentState = selectionStateRef.current;
@@ -110,8 +116,8 @@ const CandlestickChart = ({
         // Call parent callback using ref to avoid stale closure
         if (onRangeSelectRef.current) {
           onRangeSelectRef.current({
-            start: new Date(finalStart * 1000),
-            end: new Date(finalEnd * 1000)
+            start: candleDay(finalStart),
+            end: candleDay(finalEnd)
           });
         }
       }
@@ -203,7 +209,8 @@ const CandlestickChart = ({
     return date.toLocaleDateString('tr-TR', { 
       day: '2-digit', 
       month: 'short', 
-      year: 'numeric' 
+      year: 'numeric',
+      timeZone: 'UTC'
     });
   };
 
@@ -829,7 +829,7 @@ const DrawPatternPage = () => {
                         <CardDescription className="text-[#7A6A5C]">
                           {selectedPoints.length > 0 && (
                             <>
-                              {new Date([...selectedPoints].sort((a,b) => a.time - b.time)[0].time * 1000).toLocaleDateString('tr-TR')} - {new Date([...selectedPoints].sort((a,b) => a.time - b.time)[selectedPoints.length - 1].time * 1000).toLocaleDateString('tr-TR')}
+                              {new Date([...selectedPoints].sort((a,b) => a.time - b.time)[0].time * 1000).toLocaleDateString('tr-TR', { timeZone: 'UTC' })} - {new Date([...selectedPoints].sort((a,b) => a.time - b.time)[selectedPoints.length - 1].time * 1000).toLocaleDateString('tr-TR', { timeZone: 'UTC' })}
                             </>
                           )}
                         </CardDescription>
@@ -903,7 +903,7 @@ const DrawPatternPage = () => {
                             )}
                             {i + 1}. {pt.type === 'tepe' ? 'Tepe' : 'Dip'}
                           </span>
-                          <span className="text-[#7A6A5C]">{new Date(pt.time * 1000).toLocaleDateString('tr-TR')}</span>
+                          <span className="text-[#7A6A5C]">{new Date(pt.time * 1000).toLocaleDateString('tr-TR', { timeZone: 'UTC' })}</span>
                           <span className="font-medium">₺{pt.price?.toLocaleString('tr-TR')}</span>
                         </div>
                       ))}
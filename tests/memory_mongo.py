@@ -0,0 +1,272 @@
+"""
+In-memory MongoDB stand-ins shared by the tests and benchmarks/loadtest.py.
+
+MemoryDatabase is enough of Motor for the server (auth, symbol registry, scan
+queue); SyncMemoryDatabase is the pymongo side used by MongoBarStore. Queries
+support equality, $in/$lt/$lte/$gt/$gte and $or; updates $set, $setOnInsert
+and $inc.
+"""
+from typing import Dict, List, Optional
+
+from pymongo import DeleteMany, InsertOne, UpdateOne
+from pymongo.errors import OperationFailure
+
+
+_COMPARISONS = {
+    "$in": lambda value, arg: value in arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+}
+
+
+def matches(doc: dict, query: Optional[dict]) -> bool:
+    for key, cond in (query or {}).items():
+        if key == "$or":
+            if not any(matches(doc, branch) for branch in cond):
+                return False
+            continue
+        value = doc.get(key)
+        if isinstance(cond, dict) and cond and all(op in _COMPARISONS for op in cond):
+            if not all(_COMPARISONS[op](value, arg) for op, arg in cond.items()):
+                return False
+        elif value != cond:
+            return False
+    return True
+
+
+def project(doc: dict, projection: Optional[dict]) -> dict:
+    doc = dict(doc)
+    if projection:
+        included = [k for k, v in projection.items() if v and k != "_id"]
+        if included:
+            doc = {k: doc[k] for k in included if k in doc}
+        for key, v in projection.items():
+            if not v:
+                doc.pop(key, None)
+    return doc
+
+
+def _sort(docs: List[dict], keys) -> List[dict]:
+    if isinstance(keys, str):
+        keys = [(keys, 1)]
+    for key, direction in reversed(list(keys)):
+        docs.sort(key=lambda d: d.get(key), reverse=direction < 0)
+    return docs
+
+
+class _Result:
+    def __init__(self, matched_count: int = 0, modified_count: int = 0, deleted_count: int = 0,
+                 inserted_id=None, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.deleted_count = deleted_count
+        self.inserted_id = inserted_id
+        self.upserted_id = upserted_id
+
+
+class MemoryCursor:
+    """find() result: sortable, iterable (sync and async) and to_list()"""
+
+    def __init__(self, docs: List[dict]):
+        self._docs = docs
+
+    def sort(self, keys, direction=None):
+        _sort(self._docs, [(keys, direction)] if direction is not None else keys)
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._docs:
+            yield doc
+
+    async def to_list(self, length=None):
+        return self._docs if length is None else self._docs[:length]
+
+
+def _apply(doc: dict, update: dict):
+    doc.update(update.get("$set", {}))
+    for key, step in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + step
+
+
+class SyncMemoryCollection:
+    """pymongo Collection stand-in"""
+
+    def __init__(self, database: Optional["SyncMemoryDatabase"] = None, name: str = ""):
+        self.database, self.name = database, name
+        self.docs: List[dict] = []
+        self.indexes = []
+        self.bulk_writes = 0
+
+    def create_index(self, keys, unique: bool = False, **kwargs):
+        self.indexes.append((keys, unique))
+
+    def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> Optional[dict]:
+        for doc in self.docs:
+            if matches(doc, query):
+                return project(doc, projection)
+        return None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return MemoryCursor([project(d, projection) for d in self.docs if matches(d, query)])
+
+    def insert_one(self, doc: dict) -> _Result:
+        self.docs.append(dict(doc))
+        return _Result(inserted_id=len(self.docs))
+
+    def insert_many(self, docs: List[dict]) -> _Result:
+        for doc in docs:
+            self.insert_one(doc)
+        return _Result()
+
+    def update_one(self, query: dict, update: dict, upsert: bool = False) -> _Result:
+        for doc in self.docs:
+            if matches(doc, query):
+                _apply(doc, update)
+                return _Result(matched_count=1, modified_count=1)
+        if upsert:
+            fields = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            doc = {**fields, **update.get("$setOnInsert", {})}
+            _apply(doc, update)
+            self.docs.append(doc)
+            return _Result(upserted_id=len(self.docs))
+        return _Result()
+
+    def update_many(self, query: dict, update: dict) -> _Result:
+        matched = [doc for doc in self.docs if matches(doc, query)]
+        for doc in matched:
+            _apply(doc, update)
+        return _Result(matched_count=len(matched), modified_count=len(matched))
+
+    def find_one_and_update(self, query: dict, update: dict, sort=None, projection: Optional[dict] = None,
+                            return_document: bool = False, upsert: bool = False) -> Optional[dict]:
+        candidates = [doc for doc in self.docs if matches(doc, query)]
+        if sort:
+            candidates = _sort(candidates, sort)
+        if not candidates:
+            return None
+        doc = candidates[0]
+        before = dict(doc)
+        _apply(doc, update)
+        # ReturnDocument.AFTER is True
+        return project(doc if return_document else before, projection)
+
+    def delete_many(self, query: dict) -> _Result:
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return _Result(deleted_count=deleted)
+
+    def count_documents(self, query: dict) -> int:
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    def bulk_write(self, ops, ordered: bool = True) -> _Result:
+        self.bulk_writes += 1
+        for op in ops:
+            # pymongo keeps the operation's arguments in private slots
+            if isinstance(op, DeleteMany):
+                if self.database is not None and self.database.reject_range_delete and "date" in op._filter:
+                    raise OperationFailure("time-series deletes may only filter on the metaField")
+                self.delete_many(op._filter)
+            elif isinstance(op, InsertOne):
+                self.insert_one(op._doc)
+            elif isinstance(op, UpdateOne):
+                self.update_one(op._filter, op._doc, upsert=op._upsert)
+        return _Result()
+
+
+class MemoryCollection:
+    """Motor collection stand-in: the same operations, awaitable"""
+
+    def __init__(self):
+        self._sync = SyncMemoryCollection()
+
+    @property
+    def docs(self) -> List[dict]:
+        return self._sync.docs
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> MemoryCursor:
+        return self._sync.find(query, projection)
+
+    async def create_index(self, *args, **kwargs):
+        return self._sync.create_index(*args, **kwargs)
+
+    async def find_one(self, *args, **kwargs):
+        return self._sync.find_one(*args, **kwargs)
+
+    async def insert_one(self, *args, **kwargs):
+        return self._sync.insert_one(*args, **kwargs)
+
+    async def insert_many(self, *args, **kwargs):
+        return self._sync.insert_many(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return self._sync.update_one(*args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return self._sync.update_many(*args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return self._sync.find_one_and_update(*args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return self._sync.delete_many(*args, **kwargs)
+
+    async def count_documents(self, *args, **kwargs):
+        return self._sync.count_documents(*args, **kwargs)
+
+
+class MemoryDatabase:
+    """Motor database stand-in: collections by attribute or item"""
+
+    def __init__(self):
+        self._collections: Dict[str, MemoryCollection] = {}
+
+    def __getattr__(self, name: str) -> MemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> MemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = MemoryCollection()
+        return self._collections[name]
+
+
+class SyncMemoryDatabase:
+    """
+    pymongo database stand-in. timeseries=False behaves like a server without
+    time-series collections; reject_range_delete like one before MongoDB 7
+    (time-series deletes filtered on the time field fail).
+    """
+
+    def __init__(self, timeseries: bool = True, reject_range_delete: bool = False):
+        self.supports_timeseries = timeseries
+        self.reject_range_delete = reject_range_delete
+        self.types: Dict[str, str] = {}
+        self._collections: Dict[str, SyncMemoryCollection] = {}
+
+    def list_collections(self, filter: dict):
+        name = filter["name"]
+        return [{"name": name, "type": self.types[name]}] if name in self.types else []
+
+    def create_collection(self, name: str, timeseries: Optional[dict] = None):
+        if timeseries is not None and not self.supports_timeseries:
+            raise OperationFailure("unknown option to create collection: timeseries")
+        self.types[name] = "timeseries" if timeseries is not None else "collection"
+
+    def __getattr__(self, name: str) -> SyncMemoryCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name: str) -> SyncMemoryCollection:
+        if name not in self._collections:
+            self._collections[name] = SyncMemoryCollection(self, name)
+        return self._collections[name]
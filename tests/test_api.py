@@ -0,0 +1,255 @@
+"""
+API handlers end to end on synthetic data and the in-memory database (offline)
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+os.environ.update({
+    "MONGO_URL": "mongodb://localhost:27017",  # never contacted: db is replaced
+    "DB_NAME": "api-test",
+    "MARKET_DATA_PROVIDER": "synthetic",
+    "SYNTHETIC_SYMBOLS": "8",
+    "PRICE_CACHE_DIR": tempfile.mkdtemp(prefix="bist-api-test-"),
+    "WARMUP_AFTER_CLOSE": "0",
+    "SHARED_BARS": "0",
+    "SHARED_PANEL": "0",
+    "SCAN_QUEUE": "0",
+    "SCAN_WORKERS": "0",
+})
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+from shared_panel import SharedPanel, publish_panel  # noqa: E402
+from symbol_health import SymbolHealth  # noqa: E402
+from symbol_registry import SymbolRegistry  # noqa: E402
+from tests.memory_mongo import MemoryDatabase  # noqa: E402
+from warmup import build_store  # noqa: E402
+
+USER = {"id": "test-user", "email": "analyst@example.com", "role": "user", "approved": True}
+
+
+def _store(interval="1d"):
+    """In-memory store on the synthetic provider (a new one = another worker loading the same data)"""
+    return build_store(interval, None, timedelta(minutes=15), server.data_provider, SymbolHealth())
+
+
+@pytest.fixture(autouse=True)
+def api(tmp_path, monkeypatch):
+    """Fresh in-memory stores, registry and panel directory per test; auth bypassed"""
+    db = MemoryDatabase()
+    monkeypatch.setattr(server, "db", db)
+    monkeypatch.setattr(server, "symbol_registry",
+                        SymbolRegistry(db, server.SCAN_SYMBOLS, provider=server.data_provider))
+    monkeypatch.setattr(server, "price_store", _store("1d"))
+    monkeypatch.setattr(server, "hourly_store", _store("1h"))
+    monkeypatch.setattr(server, "shared_panel", SharedPanel(tmp_path / "panel"))
+    server.app.dependency_overrides[server.get_current_user] = lambda: USER
+    yield
+    server.app.dependency_overrides.clear()
+
+
+def request(method: str, url: str, **kwargs) -> httpx.Response:
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(method, url, **kwargs)
+    return asyncio.run(run())
+
+
+class TestQuotes:
+
+    def test_batch_quotes_match_the_store(self):
+        symbols = server.SCAN_SYMBOLS[:3]
+        response = request("GET", "/api/stocks/quotes", params={"symbols": ",".join(s.lower() for s in symbols)})
+        assert response.status_code == 200
+        body = response.json()
+        assert body["symbols"] == symbols and body["missing"] == []
+        for i, symbol in enumerate(symbols):
+            close = server.price_store.get(symbol)["Close"]
+            assert body["price"][i] == round(close.iloc[-1], 2) and body["prev_close"][i] == round(close.iloc[-2], 2)
+            assert body["change_percent"][i] == round((close.iloc[-1] / close.iloc[-2] - 1) * 100, 2)
+
+    def test_all_registry_symbols_by_default(self):
+        body = request("GET", "/api/stocks/quotes").json()
+        assert body["symbols"] == sorted(server.SCAN_SYMBOLS)
+
+    def test_unknown_symbols_are_rejected_before_fetching(self):
+        response = request("GET", "/api/stocks/quotes", params={"symbols": f"{server.SCAN_SYMBOLS[0]},NOPE"})
+        assert response.status_code == 400 and "NOPE" in response.json()["detail"]
+        assert not server.price_store.is_cached("NOPE") and not server.price_store.is_cached(server.SCAN_SYMBOLS[0])
+
+    def test_panel_symbols_are_not_loaded_into_the_worker(self, tmp_path, monkeypatch):
+        symbols = server.SCAN_SYMBOLS[:6]
+        expected = server.price_store.quotes(symbols)
+        # The panel is published by another process; this worker's store starts empty
+        publish_panel(_store(), symbols[:4], tmp_path / "panel")
+        monkeypatch.setattr(server, "price_store", _store())
+        loaded = []
+        quotes = server.price_store.quotes
+        monkeypatch.setattr(server.price_store, "quotes",
+                            lambda requested: loaded.append(requested) or quotes(requested))
+        body = request("GET", "/api/stocks/quotes", params={"symbols": ",".join(reversed(symbols))}).json()
+        assert loaded == [list(reversed(symbols[4:]))]
+        assert not any(server.price_store.is_cached(s) for s in symbols[:4])
+        order = [expected["symbols"].index(s) for s in reversed(symbols)]
+        assert body == {key: [values[i] for i in order] if key != "missing" else values
+                        for key, values in expected.items()}
+
+    def test_too_many_symbols(self):
+        symbols = ",".join(f"S{i}" for i in range(server.MAX_QUOTE_SYMBOLS + 1))
+        assert request("GET", "/api/stocks/quotes", params={"symbols": symbols}).status_code == 400
+
+
+class TestCandles:
+
+    def test_etag_is_the_same_on_every_worker(self, monkeypatch):
+        url, params = f"/api/stocks/{server.SCAN_SYMBOLS[0]}/candlestick", {"period": "1y", "indicators": "rsi"}
+        first = request("GET", url, params=params)
+        assert first.status_code == 200 and "last-modified" not in first.headers
+        monkeypatch.setattr(server, "price_store", _store())
+        again = request("GET", url, params=params, headers={"If-None-Match": first.headers["etag"]})
+        assert again.status_code == 304 and again.headers["etag"] == first.headers["etag"]
+        other = request("GET", url, params={**params, "format": "columnar"}, headers={"If-None-Match": "*, x"})
+        assert other.status_code == 304
+        assert request("GET", url, params={**params, "indicators": "rsi:10"},
+                       headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+    def test_revised_last_bar_changes_the_etag_and_since_returns_it(self):
+        symbol = server.SCAN_SYMBOLS[0]
+        url = f"/api/stocks/{symbol}/candlestick"
+        first = request("GET", url, params={"period": "6mo"})
+        candles = first.json()["candles"]
+        last = candles[-1]
+        # Daily candle times are the session date at UTC midnight
+        assert last["time"] == int(server.price_store.get(symbol).index[-1].tz_localize("UTC").timestamp())
+
+        bars = server.price_store.get(symbol).copy()
+        bars.iloc[-1, bars.columns.get_loc("Close")] += 1
+        server.price_store.put(symbol, bars, changed_from=bars.index[-1])
+        revised = request("GET", url, params={"period": "6mo"}, headers={"If-None-Match": first.headers["etag"]})
+        assert revised.status_code == 200 and revised.json()["candles"][-1]["close"] == round(last["close"] + 1, 2)
+
+        delta = request("GET", url, params={"period": "6mo", "since": last["time"]})
+        assert delta.json()["since"] == last["time"] and delta.json()["candles"] == revised.json()["candles"][-1:]
+        assert delta.headers["etag"] != revised.headers["etag"]
+        older = request("GET", url, params={"period": "6mo", "since": candles[-3]["time"]}).json()["candles"]
+        assert [c["time"] for c in older] == [c["time"] for c in candles[-3:]]
+
+
+    def test_unknown_symbols_never_reach_the_store(self):
+        dates = {"start_date": "2024-01-01", "end_date": "2024-06-01"}
+        assert request("GET", "/api/stocks/MADEUP/candlestick").status_code == 404
+        assert request("POST", "/api/stocks/analyze", json={"symbol": "MADEUP", **dates}).status_code == 404
+        for path in ("find-similar", "find-partial-match"):
+            assert request("POST", f"/api/stocks/{path}", json={"symbol": "MADEUP", **dates}).status_code == 404
+        assert not server.price_store.is_cached("MADEUP") and not server.hourly_store.is_cached("MADEUP")
+
+
+    def test_downsampled_binary_headers_are_exposed(self):
+        response = request("GET", f"/api/stocks/{server.SCAN_SYMBOLS[0]}/candlestick",
+                           params={"period": "2y", "format": "binary", "max_points": 50},
+                           headers={"Origin": "http://frontend.test"})
+        assert response.headers["x-candle-max-points"] == "50" and response.headers["x-candle-count"] == "50"
+        exposed = {h.strip().lower() for h in response.headers["access-control-expose-headers"].split(",")}
+        assert {"x-candle-max-points", "x-candle-count", "etag"} <= exposed and "last-modified" not in exposed
+
+
+class TestQuick:
+
+    def test_quick_quote_and_metadata(self):
+        symbol = server.SCAN_SYMBOLS[0]
+        body = request("GET", f"/api/stocks/{symbol}/quick").json()
+        close = server.price_store.get(symbol)["Close"]
+        assert body["name"] == f"{symbol} (synthetic)" and body["current_price"] == round(close.iloc[-1], 2)
+
+    def test_no_data_is_404(self, monkeypatch):
+        monkeypatch.setattr(server.price_store, "get", lambda symbol: pd.DataFrame())
+        assert request("GET", f"/api/stocks/{server.SCAN_SYMBOLS[0]}/quick").status_code == 404
+
+    def test_unknown_symbol_is_404_without_side_effects(self):
+        response = request("GET", "/api/stocks/MADEUP/quick")
+        assert response.status_code == 404 and "MADEUP" in response.json()["detail"]
+        assert server.symbol_registry.get("MADEUP")["status"] == "unknown"
+        assert not server.price_store.is_cached("MADEUP")
+
+
+class TestMaxPoints:
+
+    def test_too_small_max_points_is_422(self):
+        symbol = server.SCAN_SYMBOLS[0]
+        for max_points in (0, -1, 2):
+            assert request("GET", f"/api/stocks/{symbol}/candlestick",
+                           params={"period": "1y", "max_points": max_points}).status_code == 422
+            assert request("POST", "/api/stocks/analyze",
+                           json={"symbol": symbol, "start_date": "2024-01-01", "end_date": "2024-06-01",
+                                 "max_points": max_points}).json()["detail"][0]["loc"][-1] == "max_points"
+
+    def test_long_ranges_are_capped(self):
+        body = request("GET", f"/api/stocks/{server.SCAN_SYMBOLS[0]}/candlestick",
+                       params={"period": "2y", "max_points": 50}).json()
+        assert body["max_points"] == 50 and len(body["candles"]) == 50
+
+
+class TestScans:
+
+    def test_in_process_scan_runs_off_the_event_loop(self, monkeypatch):
+        threads = set()
+        get_price_series = server.get_price_series
+
+        def recording(symbol, start_date, end_date):
+            threads.add(threading.current_thread())
+            return get_price_series(symbol, start_date, end_date)
+
+        monkeypatch.setattr(server, "get_price_series", recording)
+        symbol = server.SCAN_SYMBOLS[0]
+        response = request("POST", "/api/stocks/find-similar", json={
+            "symbol": symbol, "start_date": "2024-01-01", "end_date": "2024-03-01", "min_similarity": 0.0})
+        assert response.status_code == 200 and response.json()
+        assert threads and threading.main_thread() not in threads
+
+    def _window(self, days=120):
+        end = pd.Timestamp.now().normalize() - pd.Timedelta(days=30)
+        return (end - pd.Timedelta(days=days)).strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+    def _frame_peaks(self, symbol, start_date, end_date):
+        """Reference: the DataFrame path scans took before PriceSeries"""
+        df = server.get_stock_data(symbol, start_date, end_date)
+        return df, [p.model_dump() for p in server.find_peaks_troughs(df["Close"].values, df["Date"].tolist())]
+
+    def test_partial_match_on_price_series(self):
+        start_date, end_date = self._window()
+        ref = server.SCAN_SYMBOLS[0]
+        response = request("POST", "/api/stocks/find-partial-match", json={
+            "symbol": ref, "start_date": start_date, "end_date": end_date, "min_similarity": 0.0, "limit": 50})
+        results = response.json()
+        assert response.status_code == 200 and results and ref not in {r["symbol"] for r in results}
+        recent_start = (pd.Timestamp(end_date) - pd.Timedelta(days=180)).strftime("%Y-%m-%d")
+        ref_prices = server.get_stock_data(ref, start_date, end_date)["Close"].values
+        for result in results:
+            df, peaks = self._frame_peaks(result["symbol"], recent_start, end_date)
+            similarity, _, _ = server.calculate_partial_similarity(ref_prices, df["Close"].values, 30)
+            assert result["similarity_score"] == round(similarity * 100, 2)
+            assert result["peaks_troughs"] == peaks and result["current_price"] == round(df["Close"].iloc[-1], 2)
+
+    def test_custom_pattern_on_price_series(self):
+        start_date, end_date = self._window(365)
+        criteria = {"min_rise_1": 0, "max_rise_1": 1e9, "min_drop_1": 0, "max_drop_1": 100}
+        response = request("POST", "/api/stocks/custom-pattern", json={
+            "pattern_criteria": criteria, "start_date": start_date, "end_date": end_date, "limit": 50})
+        results = response.json()
+        assert response.status_code == 200 and results
+        for result in results:
+            df, peaks = self._frame_peaks(result["symbol"], start_date, end_date)
+            assert result["peaks_troughs"] == peaks and result["matching_criteria_count"] == 2
+            assert all(isinstance(p["date"], str) and p["date"] in set(df["Date"]) for p in peaks)
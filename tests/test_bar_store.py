@@ -0,0 +1,148 @@
+"""
+Shared MongoDB bar store on the in-memory pymongo stand-in (offline)
+"""
+import asyncio
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from pymongo import DeleteMany
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from bar_store import MongoBarStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from tests.memory_mongo import SyncMemoryDatabase  # noqa: E402
+
+
+def _bars(symbol="GARAN", interval="1d", start="2024-01-01", end="2024-04-01"):
+    return SyntheticProvider(n_symbols=3).history(symbol, start, end, interval=interval)
+
+
+def _store(db, interval="1d"):
+    store = MongoBarStore(db, interval)
+    store.init()
+    return store
+
+
+class TestMongoBarStore:
+
+    @pytest.mark.parametrize("timeseries", [True, False])
+    def test_write_read_round_trip(self, timeseries):
+        db = SyncMemoryDatabase(timeseries=timeseries)
+        store = _store(db)
+        assert store.ready and store.timeseries is timeseries
+        assert db.bars_1d.indexes[0] == ([("symbol", 1), ("date", 1)], not timeseries)
+        daily = {s: _bars(s) for s in ("GARAN", "AKBNK")}
+        store.write({s: (df, None) for s, df in daily.items()}, fetched=daily)
+        frames = store.read(["GARAN", "AKBNK", "NOPE"], "2024-01-01")
+        assert sorted(frames) == ["AKBNK", "GARAN"]
+        for symbol, df in daily.items():
+            pd.testing.assert_frame_equal(frames[symbol], df, check_freq=False)
+        assert store.read(["GARAN"], "2024-03-01")["GARAN"].index[0] >= pd.Timestamp("2024-03-01")
+        fetched = store.fetched_at(["GARAN", "NOPE"])
+        assert list(fetched) == ["GARAN"] and abs(fetched["GARAN"] - datetime.now()) < timedelta(minutes=1)
+
+    @pytest.mark.parametrize("timeseries", [True, False])
+    def test_partial_update_replaces_only_changed_bars(self, timeseries):
+        db = SyncMemoryDatabase(timeseries=timeseries)
+        store = _store(db)
+        bars = _bars()
+        store.write({"GARAN": (bars, None)}, fetched=["GARAN"])
+        revised = bars.copy()
+        revised.iloc[-3:, revised.columns.get_loc("Close")] += 1
+        store.write({"GARAN": (revised, revised.index[-3])}, fetched=["GARAN"])
+        assert len(db.bars_1d.docs) == len(bars)
+        pd.testing.assert_frame_equal(store.read(["GARAN"], "2024-01-01")["GARAN"], revised, check_freq=False)
+
+    def test_range_delete_rejected_rewrites_the_whole_series(self):
+        db = SyncMemoryDatabase(reject_range_delete=True)
+        store = _store(db)
+        bars = _bars()
+        store.write({"GARAN": (bars, None)}, fetched=[])
+        revised = bars.copy()
+        revised.iloc[-1, revised.columns.get_loc("Close")] += 1
+        store.write({"GARAN": (revised, revised.index[-1])}, fetched=[])
+        assert db.bars_1d.bulk_writes == 3 and len(db.bars_1d.docs) == len(bars)
+        pd.testing.assert_frame_equal(store.read(["GARAN"], "2024-01-01")["GARAN"], revised, check_freq=False)
+
+    def test_falls_back_to_a_regular_collection(self, caplog):
+        db = SyncMemoryDatabase(timeseries=False)
+        store = _store(db)
+        assert db.types["bars_1d"] == "collection" and not store.timeseries
+        assert "Time-series collections unavailable" in caplog.text
+        # A second worker finds the existing collection and does not create it again
+        assert not _store(db).timeseries
+
+    def test_hourly_bars_and_closes(self):
+        db = SyncMemoryDatabase()
+        hourly = _store(db, "1h")
+        bars = _bars(interval="1h", start="2024-03-01", end="2024-03-08")
+        hourly.write({"GARAN": (bars, None)}, fetched=["GARAN"])
+        read = hourly.read(["GARAN"], "2024-03-01")["GARAN"]
+        assert str(read.index.tz) == str(bars.index.tz)
+        pd.testing.assert_frame_equal(read, bars, check_freq=False)
+
+        daily = _store(db)
+        closes = _bars(end="2024-02-01")
+        daily.write({"GARAN": (closes, None)}, fetched=["GARAN"])
+        series = asyncio.run(daily.closes(["GARAN", "NOPE"], "2024-01-01", "2024-02-01"))
+        assert list(series) == ["GARAN"]
+        np.testing.assert_allclose(series["GARAN"].close, closes["Close"].to_numpy())
+        stale = asyncio.run(daily.closes(["GARAN"], "2024-01-01", "2024-02-01",
+                                         fetched_after=datetime.now() + timedelta(minutes=1)))
+        assert stale == {}
+
+    def test_concurrent_time_series_rewrites_do_not_duplicate_bars(self):
+        db = SyncMemoryDatabase()
+        first, second = _store(db), _store(db)
+        bars = _bars()
+        first.write({"GARAN": (bars, None)}, fetched=[])
+        revised = bars.copy()
+        revised["Close"] += 1
+
+        # The first writer stalls between its delete and its inserts while the second one writes
+        collection, bulk_write = db.bars_1d, db.bars_1d.bulk_write
+        deleted, resume = threading.Event(), threading.Event()
+
+        def stalling(ops, ordered=True):
+            if threading.current_thread().name == "first":
+                bulk_write([op for op in ops if isinstance(op, DeleteMany)], ordered)
+                deleted.set()
+                resume.wait(5)
+                ops = [op for op in ops if not isinstance(op, DeleteMany)]
+            return bulk_write(ops, ordered)
+
+        collection.bulk_write = stalling
+        writers = [threading.Thread(target=first.write, args=({"GARAN": (bars, None)}, []), name="first"),
+                   threading.Thread(target=second.write, args=({"GARAN": (revised, None)}, []), name="second")]
+        writers[0].start()
+        assert deleted.wait(5)
+        writers[1].start()
+        time.sleep(0.2)  # the second writer is waiting for the lease, not rewriting
+        assert writers[1].is_alive()
+        resume.set()
+        for writer in writers:
+            writer.join(5)
+
+        assert len(collection.docs) == len(bars)
+        pd.testing.assert_frame_equal(first.read(["GARAN"], "2024-01-01")["GARAN"], revised, check_freq=False)
+        assert db.locks.find_one({"_id": "bars_1d:GARAN"})["owner"] is None
+
+    def test_closes_drop_duplicate_dates(self):
+        db = SyncMemoryDatabase()
+        store = _store(db)
+        bars = _bars(end="2024-02-01")
+        store.write({"GARAN": (bars, None)}, fetched=[])
+        # Duplicates left behind by racing writers before the per-symbol lease
+        for doc in list(db.bars_1d.docs[-3:]):
+            db.bars_1d.insert_one({**doc, "close": doc["close"] + 1})
+        series = asyncio.run(store.closes(["GARAN"], "2024-01-01", "2024-02-01"))["GARAN"]
+        assert len(series) == len(bars) and len(np.unique(series.days)) == len(bars)
+        np.testing.assert_allclose(series.close[-3:], bars["Close"].to_numpy()[-3:] + 1)
@@ -0,0 +1,46 @@
+"""
+Benchmark harness tests (offline): report format and baseline comparison
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from bench_analysis import compare, main, run_benchmarks  # noqa: E402
+
+
+class TestBenchmarks:
+
+    def test_report_and_regression_check(self, tmp_path):
+        report = run_benchmarks(quick=True, repeats=1, pattern="calculate_similarity")
+        assert set(report["results"]) == {"quick/calculate_similarity/len=250", "quick/calculate_similarity/len=750"}
+        assert all(r["min_s"] > 0 for r in report["results"].values())
+        json.dumps(report)
+
+        fast = {"results": {name: {"min_s": r["min_s"] / 10} for name, r in report["results"].items()}}
+        rows = compare(report, fast)
+        assert {row["status"] for row in rows} == {"regression"}
+        # Per-case thresholds override the default
+        fast["thresholds"] = {name: 100.0 for name in report["results"]}
+        assert {row["status"] for row in compare(report, fast)} == {"ok"}
+        assert {row["status"] for row in compare(report, {})} == {"new"}
+
+    def test_cli_updates_baseline_then_passes(self, tmp_path):
+        baseline = tmp_path / "baseline.json"
+        args = ["--quick", "--repeats", "1", "-k", "find_peaks_troughs/len=250", "--baseline", str(baseline)]
+        assert main(args + ["--update-baseline"]) == 0
+        assert list(json.loads(baseline.read_text())["results"]) == ["quick/find_peaks_troughs/len=250"]
+        assert main(args + ["--threshold", "100", "-o", str(tmp_path / "out.json")]) == 0
+        assert json.loads((tmp_path / "out.json").read_text())["comparison"][0]["status"] == "ok"
+
+
+class TestStartup:
+
+    def test_workers_do_not_import_deferred_packages(self):
+        from bench_startup import CASES, DEFERRED_MODULES, sample
+
+        for module in CASES.values():
+            result = sample(module)
+            assert result["seconds"] > 0
+            assert not set(result["deferred_loaded"]) & set(DEFERRED_MODULES), module
@@ -0,0 +1,93 @@
+"""
+Downsampling tests: OHLC buckets, pinned bars, LTTB selection (offline)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from downsample import MIN_POINTS, downsample_frame, downsample_ohlcv, lttb_indices  # noqa: E402
+
+
+def _bars(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    open_ = close + rng.standard_normal(n) * 0.5
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) + rng.random(n),
+        "Low": np.minimum(open_, close) - rng.random(n),
+        "Close": close,
+        "Volume": rng.integers(1, 1000, n).astype(float),
+    }, index=pd.bdate_range("2020-01-01", periods=n, name="Date"))
+
+
+def _reference(df, starts):
+    """Bucket aggregation with pandas groupby over bucket labels"""
+    labels = np.searchsorted(starts, np.arange(len(df)), side="right") - 1
+    grouped = df.groupby(labels)
+    out = pd.DataFrame({
+        "Open": grouped["Open"].first(), "High": grouped["High"].max(), "Low": grouped["Low"].min(),
+        "Close": grouped["Close"].last(), "Volume": grouped["Volume"].sum(),
+    })
+    out.index = df.index[starts]
+    return out
+
+
+class TestOhlcBuckets:
+
+    def test_matches_groupby_and_keeps_extremes(self):
+        df = _bars()
+        out = downsample_ohlcv(df, 100)
+        assert len(out) == 100 and out.index[0] == df.index[0]
+        starts = df.index.get_indexer(out.index)
+        pd.testing.assert_frame_equal(out, _reference(df, starts), check_freq=False)
+        assert out["High"].max() == df["High"].max() and out["Low"].min() == df["Low"].min()
+        assert out["Volume"].sum() == df["Volume"].sum()
+        assert out["Open"].iloc[0] == df["Open"].iloc[0] and out["Close"].iloc[-1] == df["Close"].iloc[-1]
+
+    def test_pinned_bars_survive_unchanged(self):
+        df = _bars()
+        pinned = [0, 137, 138, 500, 999, 5000]
+        out = downsample_ohlcv(df, 50, pinned)
+        for position in pinned[:-1]:
+            pd.testing.assert_series_equal(out.loc[df.index[position]], df.iloc[position])
+        starts = df.index.get_indexer(out.index)
+        pd.testing.assert_frame_equal(out, _reference(df, starts), check_freq=False)
+
+    def test_short_frames_are_returned_as_is(self):
+        df = _bars(40)
+        assert downsample_ohlcv(df, 40) is df and downsample_frame(df, 100) is df and downsample_frame(df, None) is df
+
+
+class TestLttb:
+
+    def test_keeps_ends_and_spikes(self):
+        y = np.sin(np.linspace(0, 20, 2000))
+        y[777] = 50.0
+        indices = lttb_indices(y, 100)
+        assert len(indices) == 100 and indices[0] == 0 and indices[-1] == 1999
+        assert 777 in indices and np.all(np.diff(indices) > 0)
+
+    def test_pinned_points_and_small_inputs(self):
+        y = np.random.default_rng(1).standard_normal(500)
+        indices = lttb_indices(y, 20, pinned=[3, 250, 499, -1, 900])
+        assert {0, 3, 250, 499} <= set(indices.tolist()) and indices.max() == 499
+        np.testing.assert_array_equal(lttb_indices(y[:10], 20), np.arange(10))
+
+    def test_frame_selection_keeps_whole_bars(self):
+        df = _bars()
+        out = downsample_frame(df, 60, "lttb", pinned=[10])
+        assert 60 <= len(out) <= 61 and df.index[10] in out.index
+        pd.testing.assert_frame_equal(out, df.loc[out.index])
+
+    def test_max_points_must_be_positive(self):
+        df = _bars()
+        for max_points in (0, -5, MIN_POINTS - 1):
+            with pytest.raises(ValueError):
+                downsample_frame(df, max_points)
+        assert len(downsample_frame(df, MIN_POINTS, "lttb")) == MIN_POINTS
@@ -0,0 +1,121 @@
+"""
+Technical indicators: loop references, incremental updates and the store cache (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from indicators import IndicatorSeries, IndicatorSpec, attach, compute, detach, parse_indicators  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+
+
+def _bars(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        "Open": close,
+        "High": close + rng.random(n) * 2,
+        "Low": close - rng.random(n) * 2,
+        "Close": close,
+        "Volume": rng.integers(1, 1000, n).astype(float),
+    }, index=pd.bdate_range("2022-01-03", periods=n, name="Date"))
+
+
+def _smoothed_ref(values, n, alpha):
+    out = np.full(len(values), np.nan)
+    out[n - 1] = values[:n].mean()
+    for i in range(n, len(values)):
+        out[i] = (1 - alpha) * out[i - 1] + alpha * values[i]
+    return out
+
+
+class TestIndicators:
+
+    def test_parse(self):
+        specs = parse_indicators("SMA:50, rsi ,bb:20:2.5,sma:50")
+        assert specs == [IndicatorSpec("sma", 50), IndicatorSpec("rsi", 14), IndicatorSpec("bb", 20, 2.5)]
+        assert [s.key for s in specs] == ["sma:50", "rsi:14", "bb:20:2.5"]
+        assert parse_indicators(None) == [] and parse_indicators("") == []
+        for bad in ("macd", "sma:0", "sma:x", "rsi:14:2", "sma:1001", ",".join(f"sma:{i}" for i in range(1, 10))):
+            with pytest.raises(ValueError):
+                parse_indicators(bad)
+
+    def test_match_loop_references(self):
+        df = _bars()
+        close, high, low = df["Close"].to_numpy(), df["High"].to_numpy(), df["Low"].to_numpy()
+        values = compute(df, parse_indicators("sma:10,ema:10,rsi:14,bb:20:2,atr:14,vma:5"))
+        values = {spec.key: lines for spec, lines in values.items()}
+
+        np.testing.assert_allclose(values["sma:10"]["sma:10"], df["Close"].rolling(10).mean(), rtol=1e-12)
+        np.testing.assert_allclose(values["vma:5"]["vma:5"], df["Volume"].rolling(5).mean(), rtol=1e-12)
+        np.testing.assert_allclose(values["ema:10"]["ema:10"], _smoothed_ref(close, 10, 2 / 11), rtol=1e-12)
+        bands = values["bb:20:2"]
+        std = df["Close"].rolling(20).std(ddof=0)
+        np.testing.assert_allclose(bands["upper"], bands["middle"] + 2 * std, rtol=1e-9)
+        np.testing.assert_allclose(bands["lower"], bands["middle"] - 2 * std, rtol=1e-9)
+
+        change = np.diff(close)
+        gain = _smoothed_ref(np.maximum(change, 0), 14, 1 / 14)
+        loss = _smoothed_ref(np.maximum(-change, 0), 14, 1 / 14)
+        rsi = values["rsi:14"]["rsi:14"]
+        assert np.isnan(rsi[:14]).all()
+        np.testing.assert_allclose(rsi[1:], 100 - 100 / (1 + gain / loss), rtol=1e-12)
+
+        previous = np.r_[np.nan, close[:-1]]
+        true_range = np.nanmax(np.c_[high - low, np.abs(high - previous), np.abs(low - previous)], axis=1)
+        np.testing.assert_allclose(values["atr:14"]["atr:14"], _smoothed_ref(true_range, 14, 1 / 14), rtol=1e-12)
+
+    def test_incremental_updates_match_full_recompute(self):
+        df = _bars()
+        for spec in parse_indicators("sma:10,ema:10,rsi:14,bb:20:2,atr:14,vma:5"):
+            series = IndicatorSeries(spec)
+            series.update(df.iloc[:300])
+            for end in range(301, len(df) + 1):
+                bars = df.iloc[:end]
+                revised = bars.copy()
+                revised.iloc[-1, revised.columns.get_loc("Close")] += 0.5
+                series.update(revised, revised.index[-1])
+                series.update(bars, bars.index[-1])
+            expected = compute(df, [spec])[spec]
+            for name, line in expected.items():
+                np.testing.assert_array_equal(series.values[name], line)
+
+    def test_attach_and_detach(self):
+        df = _bars(60)
+        specs = parse_indicators("sma:5,bb:10:2")
+        out = attach(df, compute(df, specs)).iloc[-20:]
+        payload = detach(out, specs)
+        assert set(payload) == {"sma:5", "bb:10:2"} and set(payload["bb:10:2"]) == {"upper", "middle", "lower"}
+        assert len(payload["sma:5"]) == 20 and not np.isnan(payload["sma:5"]).any()
+
+
+class TestStoreIndicators:
+
+    def test_cached_and_refreshed_on_new_bars(self):
+        provider = SyntheticProvider(n_symbols=2)
+        store = PriceStore(history=timedelta(days=400), provider=provider)
+        symbol = provider.universe()[0]
+        specs = parse_indicators("ema:20,rsi")
+        for interval in ("1d", "1wk"):
+            values = store.indicators(symbol, interval, specs)
+            assert len(values[specs[0]]["ema:20"]) == len(store.bars(symbol, interval))
+
+        bars = store.get(symbol)
+        extra = bars.iloc[[-1]].copy()
+        extra.index = extra.index + pd.Timedelta(days=7)
+        extra["Close"] *= 1.1
+        store.ingest([symbol], {symbol: extra}, incremental=True)
+        for interval in ("1d", "1wk"):
+            frame = store.bars(symbol, interval)
+            values = store.indicators(symbol, interval, specs)
+            expected = compute(frame, specs)
+            for spec in specs:
+                for name, line in expected[spec].items():
+                    np.testing.assert_array_equal(values[spec][name], line)
@@ -0,0 +1,88 @@
+"""
+Analysis kernel backends: loop vs NumPy versions, and numba vs Python when numba is installed
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import kernels  # noqa: E402
+from analysis import PatternCriteria, find_peaks_troughs, find_peaks_troughs_with_criteria  # noqa: E402
+
+
+def _series(rng, n):
+    walk = np.exp(np.cumsum(rng.normal(0, 0.04, n))) * 10
+    flats = np.repeat(np.round(rng.random(n // 5 + 1) * 20 + 1), 5)[:n]
+    return [walk, np.round(walk, 1), flats]
+
+
+def _cases(seed=7):
+    rng = np.random.default_rng(seed)
+    for n in (12, 60, 250, 900):
+        for prices in _series(rng, n):
+            yield prices
+
+
+def _points(backend, prices):
+    is_min, is_max = backend.extrema(prices, 5)
+    candidates = np.flatnonzero(is_min | is_max)
+    bounds = [np.full(5, v) for v in (5.0, 300.0, 5.0, 80.0)]
+    return (
+        backend.classic(prices, candidates, is_min, is_max, 12),
+        backend.criteria(prices, candidates, is_min, is_max, *bounds),
+    )
+
+
+def _assert_same_points(a, b):
+    for x, y in zip(a, b):
+        for u, v in zip(x, y):
+            np.testing.assert_array_equal(u, v)
+
+
+class TestKernels:
+
+    def test_loops_match_numpy_versions(self):
+        for prices in _cases():
+            for got, expected in zip(kernels._extrema_loop(prices, 5), kernels._extrema_numpy(prices, 5)):
+                np.testing.assert_array_equal(got, expected)
+            ref = prices[:10]
+            for step in (1, 3):
+                assert kernels._best_window_loop(ref, prices, step) == kernels._best_window_numpy(ref, prices, step)
+
+    def test_classic_points(self):
+        prices = np.array([5.0] * 11 + [12.0] * 6 + [5.0] * 6)
+        points = find_peaks_troughs(prices, [f"d{i}" for i in range(len(prices))])
+        assert [(p.point_type, p.point_number, p.date, p.price, p.percentage_change) for p in points] == [
+            ("dip", 1, "d5", 5.0, None), ("tepe", 1, "d11", 12.0, 140.0), ("dip", 2, "d17", 5.0, -58.33),
+        ]
+
+    def test_python_fallback(self, monkeypatch):
+        monkeypatch.setenv("ANALYSIS_JIT", "0")
+        assert kernels._compile() is None
+        assert kernels.python_backend().name == "python"
+
+    def test_numba_matches_python(self, monkeypatch):
+        pytest.importorskip("numba")
+        monkeypatch.delenv("ANALYSIS_JIT", raising=False)
+        compiled = kernels._compile()
+        assert compiled is not None and compiled.name == "numba"
+        python = kernels.python_backend()
+        for prices in _cases():
+            _assert_same_points(_points(compiled, prices), _points(python, prices))
+            ref = prices[-20:]
+            assert compiled.best_window(ref, prices, 2) == python.best_window(ref, prices, 2)
+
+    def test_points_from_either_backend(self, monkeypatch):
+        prices = next(p for p in _cases() if len(p) == 900)
+        dates = [f"d{i}" for i in range(len(prices))]
+        criteria = PatternCriteria(rise_1_min=5, rise_1_max=300, drop_1_min=5, drop_1_max=80)
+        monkeypatch.delenv("ANALYSIS_JIT", raising=False)
+        results = []
+        for backend in filter(None, (kernels.python_backend(), kernels._compile())):
+            monkeypatch.setattr(kernels, "_backend", backend)
+            results.append((find_peaks_troughs(prices, dates), find_peaks_troughs_with_criteria(prices, dates, criteria)))
+        assert results[0][0] and results[0][1]
+        assert all(r == results[0] for r in results)
@@ -0,0 +1,28 @@
+"""
+Load-test harness smoke test (offline): one short level in a subprocess
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+class TestLoadTest:
+
+    def test_short_run_reports_latency_and_loop_lag(self, tmp_path):
+        out = tmp_path / "load.json"
+        env = {**os.environ, "SCAN_WORKERS": "0"}
+        subprocess.run(
+            [sys.executable, str(ROOT / "benchmarks" / "loadtest.py"), "-c", "2", "-d", "1", "--symbols", "5",
+             "--mix", "candles=1,analyze=1", "-o", str(out)],
+            check=True, env=env, capture_output=True, timeout=300,
+        )
+        report = json.loads(out.read_text())
+        level = report["levels"][0]
+        assert level["concurrency"] == 2 and level["errors"] == 0
+        assert level["endpoints"]["POST /auth/login"]["requests"] == 2
+        assert level["endpoints"]["GET /stocks/{symbol}/candlestick"]["p99_ms"] is not None
+        assert level["throughput_rps"] > 0 and level["loop_lag"]["max_ms"] is not None
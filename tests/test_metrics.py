@@ -0,0 +1,72 @@
+"""
+Phase timers and Prometheus exposition (offline)
+"""
+import sys
+import time
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from metrics import (  # noqa: E402
+    CACHE_REQUESTS, MetricsMiddleware, add_phases, phase, recording, render, timed_phase,
+)
+
+
+class TestPhases:
+
+    def test_nested_phases_record_self_time(self):
+        with recording() as totals:
+            with phase("fetch"):
+                time.sleep(0.02)
+                with phase("score"):
+                    time.sleep(0.05)
+                time.sleep(0.02)
+        assert set(totals) == {"fetch", "score"}
+        assert 0.04 <= totals["fetch"] < 0.065
+        assert totals["score"] >= 0.05
+
+    def test_decorator_and_worker_totals(self):
+        @timed_phase("pivots")
+        def work():
+            return 42
+
+        assert work() == 42  # no recorder: plain call
+        with recording() as totals:
+            assert work() == 42
+            add_phases({"pivots": 1.0, "fetch": 0.5})
+        assert totals["pivots"] > 1.0 and totals["fetch"] == 0.5
+        add_phases({"fetch": 1.0})  # outside a request: ignored
+
+
+class TestExposition:
+
+    def test_middleware_labels_route_template(self):
+        app = FastAPI()
+
+        @app.get("/api/items/{item_id}")
+        def item(item_id: str):
+            with phase("fetch"):
+                return {"id": item_id}
+
+        app.add_middleware(MetricsMiddleware)
+        client = TestClient(app)
+        assert client.get("/api/items/AKBNK").json() == {"id": "AKBNK"}
+        assert client.get("/nowhere").status_code == 404
+
+        body, content_type = render()
+        text = body.decode()
+        assert content_type.startswith("text/plain")
+        assert ('bist_request_duration_seconds_count{endpoint="/api/items/{item_id}",method="GET",status="200"}'
+                in text)
+        assert 'endpoint="unmatched",method="GET",status="404"' in text
+        assert 'bist_phase_duration_seconds_count{endpoint="/api/items/{item_id}",phase="fetch"}' in text
+        assert 'endpoint="/api/items/{item_id}",phase="other"' in text
+
+    def test_cache_hit_ratio(self):
+        CACHE_REQUESTS.labels("test_cache", "hit").inc(3)
+        CACHE_REQUESTS.labels("test_cache", "miss").inc(1)
+        text = render()[0].decode()
+        assert 'bist_cache_hit_ratio{cache="test_cache"} 0.75' in text
@@ -0,0 +1,72 @@
+"""
+Admin request profiling: gating, stored reports, callgrind export (offline)
+"""
+import json
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from profiling import ProfileStore, ProfilingMiddleware, profile_mode  # noqa: E402
+
+
+def _busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+def _client(store):
+    app = FastAPI()
+
+    @app.get("/api/work")
+    async def work(n: int = 20000):
+        blocks = [bytearray(1024) for _ in range(200)]
+        return {"total": _busy_work(n), "kept": len(blocks)}
+
+    async def authorize(authorization):
+        return "admin@example.com" if authorization == "Bearer admin" else None
+
+    app.add_middleware(ProfilingMiddleware, authorize=authorize, store=store)
+    return TestClient(app)
+
+
+class TestProfiling:
+
+    def test_profile_mode(self):
+        assert profile_mode({"headers": [], "query_string": b"n=1"}) is None
+        assert profile_mode({"headers": [], "query_string": b"profile=1"}) == "cpu"
+        assert profile_mode({"headers": [], "query_string": b"profile=0"}) is None
+        assert profile_mode({"headers": [(b"x-profile", b"memory")], "query_string": b""}) == "memory"
+
+    def test_only_admins_can_profile(self, tmp_path):
+        client = _client(ProfileStore(tmp_path))
+        assert client.get("/api/work").json()["total"] == _busy_work(20000)
+        response = client.get("/api/work?profile=cpu", headers={"Authorization": "Bearer user"})
+        assert response.status_code == 403
+        assert "x-profile-id" not in response.headers
+        assert not list(tmp_path.iterdir())
+
+    def test_reports_are_stored(self, tmp_path):
+        store = ProfileStore(tmp_path, keep=2)
+        client = _client(store)
+        response = client.get("/api/work?profile=memory", headers={"Authorization": "Bearer admin"})
+        assert response.status_code == 200 and response.json()["kept"] == 200
+        report_id = response.headers["x-profile-id"]
+
+        report = json.loads(store.path(report_id).read_text())
+        assert report["user"] == "admin@example.com" and report["status"] == 200 and report["mode"] == "memory"
+        assert any("_busy_work" in row["function"] for row in report["functions"])
+        assert report["memory"]["traced_peak_bytes"] > 200 * 1024
+        assert report["allocations"]
+        assert "fn=_busy_work:" in store.path(report_id, "callgrind").read_text()
+        assert "_busy_work" in store.path(report_id, "txt").read_text()
+        assert store.path(report_id, "prof") is not None
+        assert store.path(report_id, "exe") is None and store.path("../etc", "json") is None
+
+        for _ in range(2):
+            client.get("/api/work", headers={"Authorization": "Bearer admin", "X-Profile": "cpu"})
+        listed = store.list()
+        assert len(listed) == 2 and report_id not in [r["id"] for r in listed]
+        assert "functions" not in listed[0]
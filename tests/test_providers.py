@@ -0,0 +1,52 @@
+"""
+Market data provider tests (offline)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from providers import ReplayProvider, SyntheticProvider, record_fixtures  # noqa: E402
+from warmup import build_store, warm_up  # noqa: E402
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class TestProviders:
+
+    def test_synthetic_bars_do_not_depend_on_range_or_universe(self):
+        small, large = SyntheticProvider(n_symbols=10, seed=7), SyntheticProvider(n_symbols=500, seed=7)
+        assert len(large.universe()) == 500 and large.universe()[:10] == small.universe()
+        full = small.history("THYAO", "2020-01-01")
+        window = large.history("THYAO", "2021-03-01", "2021-06-01")
+        pd.testing.assert_frame_equal(window, full.loc["2021-03-01":"2021-05-31"])
+        assert (full["High"] >= full[["Open", "Close"]].max(axis=1)).all()
+        assert (full["Low"] <= full[["Open", "Close"]].min(axis=1)).all()
+        assert not np.allclose(full["Close"].iloc[:50], SyntheticProvider(seed=8).history("THYAO", "2020-01-01")["Close"].iloc[:50])
+
+        hourly = small.history("THYAO", "2024-01-01", "2024-01-03", interval="1h")
+        assert list(hourly.index.hour[:9]) == list(range(10, 19))
+
+    def test_store_and_warm_up_run_offline(self, tmp_path):
+        provider = SyntheticProvider(n_symbols=30)
+        store = build_store("1d", tmp_path, provider=provider)
+        summary = warm_up(store, provider.universe(), batch_size=8)
+        assert summary["done"] == 30 and not summary["failed"]
+        quotes = store.quotes(provider.universe()[:5])
+        assert quotes["symbols"] == provider.universe()[:5] and not quotes["missing"]
+
+    def test_replay_serves_recorded_fixtures(self, tmp_path):
+        replay = ReplayProvider(FIXTURES)
+        assert "THYAO" in replay.universe()
+        assert len(replay.history("THYAO", "2024-01-01", "2024-01-12")) == 5
+
+        recorded = record_fixtures(SyntheticProvider(n_symbols=3), ["AKBNK", "GARAN"], "2023-01-01", tmp_path)
+        assert recorded == ["AKBNK", "GARAN"]
+        replayed = ReplayProvider(tmp_path).history("GARAN", "2023-06-01", "2023-07-01")
+        expected = SyntheticProvider(n_symbols=3).history("GARAN", "2023-06-01", "2023-07-01")
+        np.testing.assert_allclose(replayed.to_numpy(), expected.to_numpy())
+        assert replayed.index.equals(expected.index)
@@ -0,0 +1,85 @@
+"""
+RangeStats / sliding_min_max: constant-time range summaries vs NumPy reductions (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from range_stats import RangeStats, sliding_min_max  # noqa: E402
+
+
+def _prices(n=700, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.exp(np.cumsum(rng.normal(0, 0.03, n))) * 250
+
+
+class TestRangeStats:
+
+    def test_ranges_match_numpy(self):
+        prices = _prices()
+        stats = RangeStats(prices)
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            lo = int(rng.integers(0, len(prices) - 1))
+            hi = int(rng.integers(lo + 1, len(prices) + 1))
+            window = prices[lo:hi]
+            assert stats.min(lo, hi) == window.min() and stats.max(lo, hi) == window.max()
+            assert stats.mean(lo, hi) == pytest.approx(window.mean(), rel=1e-12)
+            assert stats.std(lo, hi) == pytest.approx(window.std(), rel=1e-9, abs=1e-9)
+            expected = {
+                "min_price": round(window.min(), 2),
+                "max_price": round(window.max(), 2),
+                "avg_price": round(window.mean(), 2),
+                "volatility": round(window.std() / window.mean() * 100, 2),
+                "total_return": round((window[-1] - window[0]) / window[0] * 100, 2),
+                "data_points": len(window),
+            }
+            assert stats.summary(lo, hi) == expected
+
+    def test_bounds(self):
+        stats = RangeStats(np.array([3.0, 1.0, 2.0]))
+        assert len(stats) == 3 and stats.min(1, 2) == 1.0 and stats.std(0, 1) == 0.0
+        with pytest.raises(IndexError):
+            stats.mean(2, 2)
+        with pytest.raises(IndexError):
+            stats.max(0, 4)
+
+    def test_sliding_min_max(self):
+        prices = _prices(90)
+        prices[40] = np.nan
+        for width in (1, 2, 5, 16, 33, 90):
+            lows, highs = sliding_min_max(prices, width)
+            windows = np.lib.stride_tricks.sliding_window_view(prices, width)
+            np.testing.assert_array_equal(lows, windows.min(axis=1))
+            np.testing.assert_array_equal(highs, windows.max(axis=1))
+        assert len(sliding_min_max(prices, 91)[0]) == 0
+
+
+class TestStoreRangeStats:
+
+    def test_located_summary_and_refresh(self):
+        provider = SyntheticProvider(n_symbols=2)
+        store = PriceStore(history=timedelta(days=400), provider=provider)
+        symbol = provider.universe()[0]
+        start = (pd.Timestamp(store.coverage_start) + pd.Timedelta(days=60)).strftime('%Y-%m-%d')
+        end = (pd.Timestamp.now() - pd.Timedelta(days=30)).strftime('%Y-%m-%d')
+        df = store.history(symbol, start, end)
+        stats = store.range_stats(symbol)
+        assert store.range_stats(symbol) is stats
+        lo, hi = stats.locate(start, end)
+        assert hi - lo == len(df) and stats.summary(lo, hi)["data_points"] == len(df)
+        assert stats.min(lo, hi) == df["Close"].min()
+
+        bars = store.get(symbol).copy()
+        bars.iloc[-1, bars.columns.get_loc("Close")] *= 2
+        store.put(symbol, bars, changed_from=pd.Timestamp(bars.index[-1]))
+        refreshed = store.range_stats(symbol)
+        assert refreshed is not stats and refreshed.max(0, len(refreshed)) == bars["Close"].max()
@@ -0,0 +1,67 @@
+"""
+OHLCV resampler tests (offline)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from resample import ResampledSeries, resample_ohlcv  # noqa: E402
+
+
+def _daily_frame(n=1200, seed=0):
+    rng = np.random.default_rng(seed)
+    idx = pd.bdate_range("2020-01-01", periods=n, name="Date")
+    close = 100 + rng.standard_normal(n).cumsum()
+    return pd.DataFrame({
+        "Open": close + rng.random(n),
+        "High": close + 2,
+        "Low": close - 2,
+        "Close": close,
+        "Volume": rng.integers(1, 1000, n).astype(float),
+    }, index=idx)
+
+
+def _hourly_frame(days=20, seed=1):
+    rng = np.random.default_rng(seed)
+    stamps = []
+    for day in pd.bdate_range("2024-01-01", periods=days):
+        # 09:55 pre-open print and 18:00 closing auction belong to the same session
+        stamps += [day + pd.Timedelta(hours=9, minutes=55)]
+        stamps += [day + pd.Timedelta(hours=h) for h in range(10, 19)]
+    idx = pd.DatetimeIndex(stamps, name="Datetime").tz_localize("Europe/Istanbul")
+    close = 50 + rng.standard_normal(len(idx)).cumsum()
+    return pd.DataFrame({
+        "Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1.0
+    }, index=idx)
+
+
+class TestResample:
+
+    def test_weekly_monthly_match_pandas(self):
+        df = _daily_frame()
+        agg = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+        monthly = df.resample("MS").agg(agg).dropna()
+        weekly = df.resample("W-MON", label="left", closed="left").agg(agg).dropna()
+        assert np.allclose(resample_ohlcv(df, "1mo").values, monthly.values)
+        assert np.allclose(resample_ohlcv(df, "1wk").values, weekly.values)
+
+    def test_intraday_buckets_stay_inside_session(self):
+        df = _hourly_frame()
+        four_hour = resample_ohlcv(df, "4h")
+        local_hours = four_hour.index.tz_convert("Europe/Istanbul").hour
+        assert set(local_hours) == {10, 14}
+        assert len(four_hour) == 2 * 20
+        assert four_hour["Volume"].sum() == df["Volume"].sum()
+
+    def test_incremental_update_matches_full_recompute(self):
+        for df, interval in ((_daily_frame(), "1wk"), (_daily_frame(), "1mo"), (_hourly_frame(), "4h")):
+            series = ResampledSeries(interval)
+            series.update(df.iloc[:-37])
+            revised = df.copy()
+            revised.iloc[-40:, revised.columns.get_loc("Close")] += 1.0
+            series.update(revised, changed_from=revised.index[-40])
+            pd.testing.assert_frame_equal(series.frame, resample_ohlcv(revised, interval))
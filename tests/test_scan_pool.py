@@ -0,0 +1,64 @@
+"""
+Process-pool scan tests (offline): pooled results match a sequential pass
+"""
+import asyncio
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from analysis import SCAN_KERNELS, PatternCriteria, rank_results  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from scan_pool import ScanPool  # noqa: E402
+from shared_panel import publish_panel  # noqa: E402
+
+
+class TestScanPool:
+
+    def test_pooled_scans_match_sequential(self, tmp_path):
+        provider = SyntheticProvider(n_symbols=16)
+        store = PriceStore(history=timedelta(days=500), provider=provider)
+        symbols = provider.universe()
+        publish_panel(store, symbols, tmp_path)
+        start, end = store.coverage_start, pd.Timestamp.now().strftime('%Y-%m-%d')
+
+        ref = store.history(symbols[0], start, end)["Close"].values[-60:]
+        scans = {
+            "similar": {"ref_prices": ref.tolist(), "min_similarity": 0.0},
+            "advanced": {"criteria": PatternCriteria(rise_1_min=1, drop_1_min=1).model_dump(), "min_points_match": 1},
+            "drawn": {"drawn_prices": [10.0, 12.0, 9.0, 11.0], "min_similarity": 0.0},
+        }
+        order = {s: i for i, s in enumerate(symbols)}
+
+        pool = ScanPool(2, tmp_path)
+        try:
+            for kind, params in scans.items():
+                expected = []
+                for symbol in symbols:
+                    df = store.history(symbol, start, end)
+                    result = SCAN_KERNELS[kind](symbol, df["Close"].values, df["Date"].tolist(), **params)
+                    if result is not None:
+                        expected.append(result)
+                expected = rank_results(expected, kind, 5, order)
+                assert expected, kind
+
+                results, unscanned = asyncio.run(pool.scan(kind, params, symbols, start, end, 5))
+                assert unscanned == []
+                assert len(pool.chunks(symbols)) == 8
+                assert rank_results(results, kind, 5, order) == expected
+        finally:
+            pool.shutdown()
+
+    def test_chunks_without_panel_are_reported_unscanned(self, tmp_path):
+        pool = ScanPool(1, tmp_path)
+        try:
+            results, unscanned = asyncio.run(pool.scan("advanced", {
+                "criteria": PatternCriteria().model_dump(), "min_points_match": 4,
+            }, ["THYAO", "GARAN"], "2024-01-01", "2024-06-01", 5))
+        finally:
+            pool.shutdown()
+        assert results == [] and unscanned == ["THYAO", "GARAN"]
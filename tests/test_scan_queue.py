@@ -0,0 +1,144 @@
+"""
+Scan work queue on the in-memory Motor stand-in: claiming, leases, lease loss and cleanup (offline)
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from scan_queue import ScanQueue, _plain, kernel_params, merge_results, split_tasks  # noqa: E402
+from tests.memory_mongo import MemoryDatabase  # noqa: E402
+
+
+def _queue(**kwargs):
+    return ScanQueue(MemoryDatabase(), **kwargs)
+
+
+class TestScanQueueHelpers:
+
+    def test_split_and_kernel_params(self):
+        symbols = [f"S{i:02d}" for i in range(10)]
+        tasks = split_tasks(symbols, 4)
+        assert [len(t) for t in tasks] == [4, 4, 2]
+        assert sum(tasks, []) == symbols
+        assert kernel_params("similar") == ["ref_prices", "min_similarity"]
+        assert kernel_params("advanced") == ["criteria", "min_points_match"]
+
+    def test_merge_ranks_partial_top_k_in_universe_order(self):
+        job = {"kind": "advanced", "limit": 3, "symbols": ["A", "B", "C", "D", "E"]}
+        tasks = [
+            {"results": [{"symbol": "D", "match_score": 50.0}, {"symbol": "E", "match_score": 40.0}]},
+            {"results": None},  # failed task
+            {"results": [{"symbol": "B", "match_score": 50.0}, {"symbol": "A", "match_score": 10.0}]},
+        ]
+        assert [r["symbol"] for r in merge_results(job, tasks)] == ["B", "D", "E"]
+
+    def test_results_are_bson_encodable(self):
+        plain = _plain([{"score": np.float64(1.5), "points": [{"n": np.int64(2)}]}])
+        assert plain == [{"score": 1.5, "points": [{"n": 2}]}]
+        assert type(plain[0]["score"]) is float and type(plain[0]["points"][0]["n"]) is int
+
+
+class TestScanQueueWorker:
+
+    def test_claim_leases_tasks_in_order_and_reclaims_expired_ones(self):
+        async def run():
+            queue = _queue(task_size=2, max_attempts=2)
+            job = await queue.submit("similar", {}, ["A", "B", "C", "D", "E"], "2024-01-01", "2024-06-01", 5)
+            first, second = await queue.claim("w1"), await queue.claim("w2")
+            assert (first["index"], first["lease_owner"], first["attempts"]) == (0, "w1", 1)
+            assert (second["index"], second["symbols"]) == (1, ["C", "D"])
+            third = await queue.claim("w1")
+            assert third["index"] == 2 and await queue.claim("w3") is None
+            assert first["lease_expires"] > datetime.now(timezone.utc) and "_id" not in first
+
+            # w1's lease on task 0 expires: w3 takes it over and w1 is fenced out
+            await queue._tasks.update_one({"id": first["id"]},
+                                          {"$set": {"lease_expires": datetime.now(timezone.utc) - timedelta(1)}})
+            taken = await queue.claim("w3")
+            assert (taken["id"], taken["lease_owner"], taken["attempts"]) == (first["id"], "w3", 2)
+            assert not await queue.extend(first, "w1") and await queue.extend(taken, "w3")
+            assert not await queue.complete(first, [{"symbol": "A"}], "w1")
+            assert await queue.complete(taken, [{"symbol": "B", "similarity_score": 1.0}], "w3")
+
+            # Expired on its last attempt: no longer claimable, the coordinator fails it
+            expire = {"$set": {"lease_expires": datetime.now(timezone.utc) - timedelta(1)}}
+            await queue._tasks.update_one({"id": second["id"]}, expire)
+            assert (await queue.claim("w4"))["attempts"] == 2
+            await queue._tasks.update_one({"id": second["id"]}, expire)
+            assert await queue.claim("w4") is None and await queue.reap() == 1
+            assert (await queue._tasks.find_one({"id": second["id"]}))["status"] == "failed"
+            assert job["task_count"] == 3
+        asyncio.run(run())
+
+    def test_lost_lease_cancels_the_run(self):
+        async def run():
+            queue = _queue(lease=timedelta(seconds=0.03))
+            renewals, cancelled = [], asyncio.Event()
+
+            async def extend(task, worker_id):
+                renewals.append(task["id"])
+                return len(renewals) < 3
+
+            async def execute(job, task):
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+
+            queue.extend = extend
+            assert await queue._execute_leased(execute, {}, {"id": "t1"}, "w1") is None
+            assert renewals == ["t1"] * 3 and cancelled.is_set()
+
+            async def quick(job, task):
+                await asyncio.sleep(0.05)
+                return [{"symbol": "A"}]
+
+            renewals.clear()
+            queue.extend = lambda task, worker_id: asyncio.sleep(0, result=True)
+            assert await queue._execute_leased(quick, {}, {"id": "t2"}, "w1") == [{"symbol": "A"}]
+        asyncio.run(run())
+
+    def test_stopping_the_worker_cancels_the_run(self):
+        async def run():
+            queue = _queue()
+            started, cancelled = asyncio.Event(), asyncio.Event()
+
+            async def execute(job, task):
+                started.set()
+                try:
+                    await asyncio.sleep(10)
+                except asyncio.CancelledError:
+                    cancelled.set()
+                    raise
+
+            worker = asyncio.create_task(queue._execute_leased(execute, {}, {"id": "t1"}, "w1"))
+            await started.wait()
+            worker.cancel()
+            await asyncio.gather(worker, return_exceptions=True)
+            assert cancelled.is_set()
+        asyncio.run(run())
+
+    def test_finished_jobs_are_purged_after_retention(self):
+        async def run():
+            queue = _queue(retention=timedelta(hours=1))
+            now = datetime.now(timezone.utc)
+            for job_id, status, finished_at in (("old", "done", now - timedelta(hours=2)),
+                                                ("old-partial", "partial", now - timedelta(hours=3)),
+                                                ("recent", "done", now - timedelta(minutes=5)),
+                                                ("running", "running", None)):
+                await queue._jobs.insert_one({"id": job_id, "status": status, "finished_at": finished_at})
+                await queue._tasks.insert_one({"id": f"{job_id}-0", "job_id": job_id, "status": "done"})
+            assert await queue.purge() == 2
+            assert await queue.purge() == 0
+            remaining = await queue._jobs.find({}).to_list(None)
+            assert sorted(j["id"] for j in remaining) == ["recent", "running"]
+            tasks = await queue._tasks.find({}).to_list(None)
+            assert sorted(t["job_id"] for t in tasks) == ["recent", "running"]
+        asyncio.run(run())
@@ -0,0 +1,111 @@
+"""
+Technical screener over the aligned price panel: parity with indicators.py, conditions, ranking (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from indicators import compute  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from screener import Screener, parse_condition, parse_operand  # noqa: E402
+from shared_panel import SharedPanel, publish_panel  # noqa: E402
+
+
+def _panel(columns, volume=None):
+    """Screener over hand-made close columns (NaN = no bar)"""
+    close = np.array(columns, dtype=np.float64).T
+    fields = {"Close": close, "Volume": np.ones_like(close) if volume is None else np.array(volume, float).T}
+    days = np.arange(len(close), dtype=np.int32) + 19000
+    return Screener([f"S{j}" for j in range(close.shape[1])], days, fields.__getitem__)
+
+
+class TestConditions:
+
+    def test_parse_errors(self):
+        for bad in (
+            [], {"all": []}, {"all": [{}], "any": [{}]}, {"left": "close", "op": "=", "right": 1},
+            {"left": "close", "op": "<"}, {"left": "macd", "op": "<", "right": 1},
+            {"left": "sma:20.upper", "op": "<", "right": 1}, {"left": "bb.wide", "op": "<", "right": 1},
+            {"left": "close", "op": "<", "right": True}, {"left": "close", "op": "<", "right": 1, "extra": 0},
+            {"all": [{"all": [{"all": [{"all": [{"left": "close", "op": "<", "right": 1}]}]}]}]},
+        ):
+            with pytest.raises(ValueError):
+                parse_condition(bad)
+        assert parse_operand("BB:20:2").line == "middle" and parse_operand("max").period == 252
+
+    def test_comparisons_crosses_and_groups(self):
+        screener = _panel([
+            [10, 10, 10, 12],   # S0: crosses above its 3-bar SMA on the last bar
+            [10, 12, 13, 13],   # S1: was above, still above the SMA
+            [12, 12, 12, 9],    # S2: crosses below
+        ])
+        crosses = {"left": "close", "op": "crosses_above", "right": "sma:3"}
+        assert screener.evaluate(parse_condition(crosses)).tolist() == [True, False, False]
+        below = {"left": "close", "op": "crosses_below", "right": "sma:3"}
+        assert screener.evaluate(parse_condition(below)).tolist() == [False, False, True]
+        near_high = {"left": "close", "op": ">=", "right": "max:4", "factor": 0.9}
+        assert screener.evaluate(parse_condition(near_high)).tolist() == [True, True, False]
+        both = {"all": [crosses, near_high]}
+        either = {"any": [below, {"left": "change:1", "op": "<", "right": -5}]}
+        assert screener.evaluate(parse_condition(both)).tolist() == [True, False, False]
+        assert screener.evaluate(parse_condition(either)).tolist() == [False, False, True]
+
+    def test_ranking_staleness_and_warm_up(self):
+        nan = np.nan
+        screener = _panel(
+            [[1, 2, 3, 4, 5, 6, 7, 8], [8, 7, 6, 5, 4, 3, 2, 1], [5, 6, nan, nan, nan, nan, nan, nan],
+             [nan, nan, nan, nan, nan, nan, 3, 4]],
+            volume=[[1] * 8, [1] * 7 + [9], [1] * 8, [1] * 8],
+        )
+        # S2's last bar is 6 sessions old; S3 has too few bars for sma:3 but matches on volume
+        condition = parse_condition({"any": [
+            {"left": "close", "op": ">", "right": 0},
+            {"left": "volume", "op": ">", "right": "vma:3", "factor": 2},
+            {"left": "close", "op": ">", "right": "sma:3"},
+        ]})
+        results, matched = screener.run(condition)
+        assert matched == 3
+        assert [(r["symbol"], r["conditions_met"]) for r in results] == [("S0", 2), ("S1", 2), ("S3", 1)]
+        assert results[-1]["values"]["sma:3"] is None and results[0]["date"] == results[-1]["date"]
+        ranked, _ = screener.run(condition, parse_operand("change:1"), descending=False, limit=2)
+        assert [r["symbol"] for r in ranked] == ["S1", "S0"]
+
+
+class TestPanelParity:
+
+    def test_matches_indicators_for_every_symbol(self, tmp_path):
+        provider = SyntheticProvider(n_symbols=12)
+        store = PriceStore(history=timedelta(days=700), provider=provider)
+        symbols = provider.universe()
+        store.load(symbols)
+        # Gaps and a late listing: panel rows no longer line up with the symbols' own bars
+        gappy = store.get(symbols[0])
+        store.put(symbols[0], gappy.drop(gappy.index[10:60:4]))
+        store.put(symbols[1], store.get(symbols[1]).iloc[300:])
+        publish_panel(store, symbols, tmp_path)
+        operands = [parse_operand(text) for text in (
+            "sma:20", "ema:30", "rsi:14", "bb:20:2.upper", "atr:14", "vma:10", "max:252", "change:5", "volume",
+        )]
+        snapshot = SharedPanel(tmp_path).current()
+        for screener in (Screener.from_store(store, symbols), Screener.from_snapshot(snapshot, symbols)):
+            assert sorted(screener.symbols) == sorted(symbols)
+            for operand in operands:
+                values = screener.value(operand)
+                for j, symbol in enumerate(screener.symbols):
+                    bars = store.get(symbol)
+                    close = bars["Close"]
+                    if operand.kind == "indicator":
+                        expected = compute(bars, [operand.spec])[operand.spec][operand.line]
+                    elif operand.kind == "max":
+                        expected = close.rolling(operand.period).max().to_numpy()
+                    elif operand.kind == "change":
+                        expected = ((close / close.shift(operand.period) - 1) * 100).to_numpy()
+                    else:
+                        expected = bars[operand.field].to_numpy()
+                    np.testing.assert_array_equal(values[:, j], expected[-2:], err_msg=f"{operand.text} {symbol}")
@@ -0,0 +1,139 @@
+"""
+Candle/analysis serialization tests (offline)
+"""
+import gzip
+import sys
+from pathlib import Path
+
+import numpy as np
+import orjson
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from serialization import (  # noqa: E402
+    BINARY_CANDLE_LAYOUT, MIN_COMPRESS_SIZE, ORJSONResponse, brotli, cache_headers, candle_response,
+    compressed_response, frame_to_candles, frame_to_price_history, is_not_modified, make_etag, ohlcv_columns,
+    pack_candles, unpack_candles,
+)
+from starlette.requests import Request  # noqa: E402
+
+
+def _frame(n=5, intraday=False):
+    rng = np.random.default_rng(0)
+    close = 100 + rng.standard_normal(n).cumsum()
+    if intraday:
+        index = pd.date_range("2024-03-04 10:00", periods=n, freq="h", tz="Europe/Istanbul", name="Datetime")
+    else:
+        index = pd.bdate_range("2024-03-04", periods=n, name="Date")
+    return pd.DataFrame({
+        "Open": close + 0.123, "High": close + 1.005, "Low": close - 1.0049, "Close": close,
+        "Volume": rng.integers(1, 1000, n).astype(float),
+    }, index=index)
+
+
+def _request(accept_encoding=None, if_none_match=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestColumns:
+
+    def test_daily_and_intraday_times(self):
+        df = _frame()
+        columns = ohlcv_columns(df)
+        assert columns["time"].tolist() == [int(t.timestamp()) for t in df.index]
+        intraday = _frame(intraday=True)
+        # Intraday bars keep their real instant (10:00 Istanbul = 07:00 UTC)
+        assert ohlcv_columns(intraday)["time"][0] == int(pd.Timestamp("2024-03-04 07:00", tz="UTC").timestamp())
+        # reset_index() columns are used like the index
+        np.testing.assert_array_equal(ohlcv_columns(df.reset_index())["time"], columns["time"])
+
+    def test_rounding_volume_and_dates(self):
+        df = _frame()
+        df.iloc[1, df.columns.get_loc("Volume")] = np.nan
+        columns = ohlcv_columns(df, decimals=1)
+        np.testing.assert_array_equal(columns["high"], np.round(df["High"].to_numpy(), 1))
+        assert columns["volume"].dtype == np.int64 and columns["volume"][1] == 0
+        history = frame_to_price_history(df)
+        assert [row["date"] for row in history] == [d.strftime("%Y-%m-%d") for d in df.index]
+        assert list(history[0]) == ["date", "open", "high", "low", "close", "volume"]
+        # String dates (get_stock_data frames) pass through unchanged
+        strings = df.reset_index().assign(Date=lambda f: f["Date"].dt.strftime("%Y-%m-%d"))
+        assert frame_to_price_history(strings) == history
+
+    def test_candles_are_plain_python_values(self):
+        candles = frame_to_candles(_frame())
+        assert len(candles) == 5 and {type(v) for c in candles for v in c.values()} <= {int, float}
+        assert candles[0]["close"] == round(_frame()["Close"].iloc[0], 2)
+
+    def test_orjson_response_serializes_numpy(self):
+        body = ORJSONResponse({"values": np.arange(3), "x": np.float64(1.5), 7: "key"}).body
+        assert orjson.loads(body) == {"values": [0, 1, 2], "x": 1.5, "7": "key"}
+
+
+class TestBinaryAndCompression:
+
+    def test_pack_unpack_round_trip(self):
+        df = _frame(300)
+        columns = ohlcv_columns(df)
+        buffer = pack_candles(columns)
+        row_size = sum(np.dtype(dtype).itemsize for _, dtype in BINARY_CANDLE_LAYOUT)
+        assert len(buffer) == 300 * row_size
+        unpacked = unpack_candles(buffer)
+        assert list(unpacked) == [name for name, _ in BINARY_CANDLE_LAYOUT]
+        np.testing.assert_array_equal(unpacked["time"], columns["time"])
+        np.testing.assert_array_equal(unpacked["volume"], columns["volume"])
+        # Prices travel as float32
+        np.testing.assert_array_equal(unpacked["close"], columns["close"].astype(np.float32))
+        assert all(len(v) == 0 for v in unpack_candles(pack_candles(ohlcv_columns(_frame(0)))).values())
+
+    def test_encoding_negotiation(self):
+        body = b"x" * MIN_COMPRESS_SIZE
+        # brotli is optional: without it gzip is the best encoding on offer
+        best = ("br", brotli.decompress) if brotli is not None else ("gzip", gzip.decompress)
+        for accept, encoding, decode in (
+            ("gzip, deflate, br", *best),
+            ("gzip;q=1.0, identity", "gzip", gzip.decompress),
+            ("deflate", None, None),
+            (None, None, None),
+        ):
+            response = compressed_response(_request(accept), body, "application/json")
+            assert response.headers.get("content-encoding") == encoding
+            assert response.headers["vary"] == "Accept-Encoding"
+            assert (decode(response.body) if decode else response.body) == body
+
+    def test_small_bodies_are_not_compressed(self):
+        body = b"x" * (MIN_COMPRESS_SIZE - 1)
+        response = compressed_response(_request("br, gzip"), body, "application/json", {"ETag": 'W/"1"'})
+        assert "content-encoding" not in response.headers and response.body == body
+        assert response.headers["etag"] == 'W/"1"'
+
+    def test_candle_formats(self):
+        df = _frame(200).reset_index()
+        meta = {"symbol": "GARAN", "interval": "1d", "max_points": 200}
+        binary = candle_response(_request("gzip"), df, "binary", meta)
+        assert binary.headers["x-candle-count"] == "200" and binary.headers["x-candle-symbol"] == "GARAN"
+        assert binary.headers["x-candle-max-points"] == "200"
+        assert binary.headers["x-candle-layout"].startswith("time:<i8,open:<f4")
+        np.testing.assert_array_equal(unpack_candles(gzip.decompress(binary.body))["time"], ohlcv_columns(df)["time"])
+
+        columnar = orjson.loads(gzip.decompress(candle_response(_request("gzip"), df, "columnar", meta).body))
+        candles = orjson.loads(candle_response(_request(), df, "json", meta).body)
+        assert columnar["format"] == "columnar" and columnar["columns"]["close"][-1] == candles["candles"][-1]["close"]
+        assert candles["symbol"] == "GARAN" and len(candles["candles"]) == 200
+
+
+class TestConditionalRequests:
+
+    def test_etag_matching(self):
+        etag = make_etag("GARAN", "1d", None, 42)
+        assert etag.startswith('W/"') and etag == make_etag("GARAN", "1d", None, 42)
+        assert etag != make_etag("GARAN", "1d", None, 43)
+        assert cache_headers(etag) == {"ETag": etag, "Cache-Control": "private, no-cache"}
+        strong = etag.removeprefix("W/")
+        for header, expected in ((etag, True), (strong, True), (f'"other", {etag}', True), ("*", True),
+                                 ('W/"other"', False), (None, False)):
+            assert is_not_modified(_request(if_none_match=header), etag) is expected
@@ -0,0 +1,71 @@
+"""
+PriceSeries / DayDates: scan input without DataFrames or date string lists (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from analysis import SCAN_KERNELS, PatternCriteria  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from series import DayDates, PriceSeries, day_string, epoch_days  # noqa: E402
+
+
+class TestDayDates:
+
+    def test_sequence_of_date_strings(self):
+        strings = ["1999-12-31", "2024-02-28", "2024-02-29", "2024-03-01"]
+        days = epoch_days(strings)
+        assert days.dtype == np.int32 and day_string(days[0]) == "1999-12-31"
+        dates = DayDates(days)
+        assert len(dates) == 4 and dates[2] == "2024-02-29" and dates[-1] == "2024-03-01"
+        assert list(dates) == strings and dates.tolist() == strings
+        assert isinstance(dates[1:3], DayDates) and dates[1:3].tolist() == strings[1:3]
+        assert "2024-02-29" in dates and "2024-02-27" not in dates and None not in dates
+        assert dates.index("2024-03-01") == 3
+        with pytest.raises(ValueError):
+            dates.index("2024-02-27")
+
+    def test_from_frame_and_window(self):
+        index = pd.DatetimeIndex(["2024-01-02", "2024-01-03", "2024-01-05"], name="Date")
+        df = pd.DataFrame({"Close": [1.0, 2.0, 3.0], "Volume": [10, 20, 30]}, index=index)
+        series = PriceSeries.from_frame("AKBNK", df)
+        assert series.open is None and series.volume.dtype == np.float64
+        window = series.window("2024-01-03", "2024-01-05")
+        assert window.dates.tolist() == ["2024-01-03"] and window.close.tolist() == [2.0]
+        # get_stock_data format (Date strings) round-trips
+        again = PriceSeries.from_frame("AKBNK", series.to_frame())
+        assert np.array_equal(again.days, series.days) and np.array_equal(again.close, series.close)
+        assert PriceSeries.from_frame("X", pd.DataFrame()).is_empty
+
+
+class TestScanParity:
+
+    def test_kernels_match_the_frame_path(self):
+        provider = SyntheticProvider(n_symbols=8)
+        store = PriceStore(history=timedelta(days=500), provider=provider)
+        start, end = store.coverage_start, pd.Timestamp.now().strftime('%Y-%m-%d')
+        symbols = provider.universe()
+        ref = store.history(symbols[0], start, end)["Close"].values[-60:]
+        scans = {
+            "similar": {"ref_prices": ref.tolist(), "min_similarity": 0.0},
+            "advanced": {"criteria": PatternCriteria(rise_1_min=1, drop_1_min=1), "min_points_match": 1},
+            "drawn": {"drawn_prices": [10.0, 12.0, 9.0, 11.0], "min_similarity": 0.0},
+        }
+        matched = 0
+        for symbol in symbols:
+            df = store.history(symbol, start, end)
+            series = store.series(symbol, start, end)
+            assert series.dates.tolist() == df["Date"].tolist()
+            for kind, params in scans.items():
+                expected = SCAN_KERNELS[kind](symbol, df["Close"].values, df["Date"].tolist(), **params)
+                assert SCAN_KERNELS[kind](symbol, series.close, series.dates, **params) == expected
+                matched += expected is not None
+        assert matched
+        assert store.series(symbols[0], "1990-01-01", end) is None
@@ -0,0 +1,52 @@
+"""
+Shared memory-mapped price panel tests (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from shared_panel import SharedPanel, publish_panel  # noqa: E402
+
+
+class TestSharedPanel:
+
+    def test_publish_attach_and_follow_new_versions(self, tmp_path):
+        provider = SyntheticProvider(n_symbols=12)
+        store = PriceStore(history=timedelta(days=400), provider=provider)
+        symbols = provider.universe()
+        manifest = publish_panel(store, symbols, tmp_path)
+        assert publish_panel(store, symbols, tmp_path)["version"] == manifest["version"]
+
+        reader = SharedPanel(tmp_path)
+        snapshot = reader.current()
+        assert snapshot.version == manifest["version"] and snapshot.symbols == sorted(symbols)
+        close = snapshot.field("Close")
+        assert isinstance(snapshot.data, np.memmap)
+        with pytest.raises(ValueError):
+            close[0, 0] = 1.0
+
+        start, end = store.coverage_start, pd.Timestamp.now().strftime('%Y-%m-%d')
+        expected = store.history(symbols[3], start, end)
+        got = snapshot.closes(symbols[3], start, end)
+        assert got["Date"].tolist() == expected["Date"].tolist()
+        np.testing.assert_allclose(got["Close"], expected["Close"])
+
+        # New data -> new version; the old snapshot stays readable
+        revised = store.get(symbols[3]).copy()
+        revised.iloc[-1, revised.columns.get_loc("Close")] += 5
+        store.put(symbols[3], revised)
+        new_manifest = publish_panel(store, symbols, tmp_path)
+        assert new_manifest["version"] != manifest["version"]
+        assert reader.current().version == new_manifest["version"]
+        assert np.isfinite(snapshot.field("Close")).any()
+
+        publish_panel(store, symbols[:-1], tmp_path)
+        assert len(list(tmp_path.glob("panel-*.npy"))) == 2
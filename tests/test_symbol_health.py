@@ -0,0 +1,58 @@
+"""
+Negative cache / circuit breaker tests (offline)
+"""
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from price_store import PriceStore  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from symbol_health import SymbolHealth  # noqa: E402
+
+
+class _DeadTickerProvider(SyntheticProvider):
+    """Synthetic bars, except DEAD never returns data; records requested symbols"""
+
+    def __init__(self):
+        super().__init__(n_symbols=5)
+        self.requested = []
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        self.requested.extend(symbols)
+        return super().download([s for s in symbols if s != "DEAD"], start, end, interval)
+
+
+class TestSymbolHealth:
+
+    def test_dead_ticker_is_parked_after_repeated_failures(self):
+        provider = _DeadTickerProvider()
+        health = SymbolHealth(negative_ttl=timedelta(0), threshold=3, cooldown=timedelta(hours=1))
+        # Zero TTL: every load is a fresh download attempt
+        store = PriceStore(ttl=timedelta(0), provider=provider, health=health)
+
+        for _ in range(5):
+            assert store.get("DEAD").empty
+            assert not store.get("THYAO").empty
+        assert provider.requested.count("DEAD") == 3
+        assert provider.requested.count("THYAO") == 5
+
+        report = {row["symbol"]: row for row in health.snapshot()}
+        assert list(report) == ["DEAD"]
+        assert report["DEAD"]["state"] == "open" and report["DEAD"]["failures"] == 3
+        assert health.allowed(["THYAO", "DEAD", "GARAN"]) == ["THYAO", "GARAN"]
+
+        assert health.reset("DEAD") == 1
+        store.get("DEAD")
+        assert provider.requested.count("DEAD") == 4
+
+    def test_negative_entry_blocks_until_ttl_then_success_clears(self):
+        health = SymbolHealth(negative_ttl=timedelta(minutes=5), threshold=3)
+        health.record_failure("ABC", "no data")
+        assert not health.allow("ABC")
+        assert health.snapshot()[0]["state"] == "negative"
+        health._entries["ABC"]["blocked_until"] -= timedelta(minutes=10)
+        assert health.allow("ABC")
+        health.record_success("ABC")
+        assert health.snapshot() == []
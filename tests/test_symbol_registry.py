@@ -0,0 +1,85 @@
+"""
+Symbol registry: shared metadata, cross-worker refresh lease and negative entries (offline, in-memory db)
+"""
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "backend"))
+
+from symbol_registry import REFRESH_LEASE, SymbolRegistry, dedupe_symbols  # noqa: E402
+from tests.memory_mongo import MemoryDatabase  # noqa: E402
+
+
+class CountingProvider:
+    """Metadata source counting fetches; symbols in `failing` raise"""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    def metadata(self, symbol):
+        self.calls.append(symbol)
+        if symbol in self.failing:
+            raise RuntimeError("no data")
+        return {"symbol": symbol, "name": f"{symbol} AS", "sector": "Banks", "market_cap": 10,
+                "status": "active", "first_bar_date": "2020-01-02", "last_bar_date": "2024-05-03"}
+
+
+def _registry(db, provider, symbols=("GARAN", "AKBNK", "THYAO")):
+    return SymbolRegistry(db, symbols, provider=provider)
+
+
+class TestSymbolRegistry:
+
+    def test_symbols_and_placeholders(self):
+        registry = _registry(MemoryDatabase(), CountingProvider(), [" garan", "AKBNK", "GARAN", ""])
+        assert dedupe_symbols(["a", " A ", "b"]) == ["A", "B"]
+        assert registry.symbols() == ["AKBNK", "GARAN"] and "GARAN" in registry and "XYZ" not in registry
+        assert registry.get("GARAN")["status"] == "unknown" and registry.symbols("active") == []
+
+    def test_refresh_is_shared_through_the_collection(self):
+        async def run():
+            db, first, second = MemoryDatabase(), CountingProvider(), CountingProvider()
+            registry = _registry(db, first)
+            await registry.init()
+            assert await registry.refresh() == 3
+            assert await registry.refresh() == 0
+            # Another worker on the same database finds fresh entries and fetches nothing
+            other = _registry(db, second)
+            await other.init()
+            assert await other.refresh() == 0 and second.calls == []
+            assert other.get("THYAO")["name"] == "THYAO AS" and other.symbols("active") == other.symbols()
+            assert sorted(first.calls) == ["AKBNK", "GARAN", "THYAO"]
+        asyncio.run(run())
+
+    def test_lease_held_by_another_worker_skips_refresh(self):
+        async def run():
+            db, provider = MemoryDatabase(), CountingProvider()
+            registry = _registry(db, provider)
+            await registry.init()
+            expires = datetime.now(timezone.utc) + timedelta(minutes=5)
+            await db.locks.update_one({"_id": REFRESH_LEASE}, {"$set": {"owner": "other:1", "expires": expires}},
+                                      upsert=True)
+            assert await registry.refresh() == 0 and provider.calls == []
+            # Expired lease: taken over, then released for the next refresh
+            await db.locks.update_one({"_id": REFRESH_LEASE}, {"$set": {"expires": datetime.now(timezone.utc)}})
+            assert await registry.refresh() == 3
+            lease = await db.locks.find_one({"_id": REFRESH_LEASE})
+            assert lease["owner"] is None and lease["expires"] <= datetime.now(timezone.utc)
+        asyncio.run(run())
+
+    def test_failed_fetch_is_not_retried_within_negative_ttl(self):
+        async def run():
+            provider = CountingProvider(failing={"XYZ"})
+            registry = _registry(MemoryDatabase(), provider)
+            for _ in range(3):
+                assert (await registry.ensure("XYZ"))["status"] == "unknown"
+            assert provider.calls == ["XYZ"]
+            registry.negative_ttl = timedelta(0)
+            provider.failing.clear()
+            assert (await registry.ensure("XYZ"))["name"] == "XYZ AS"
+            assert (await registry.ensure("XYZ"))["name"] == "XYZ AS" and provider.calls == ["XYZ", "XYZ"]
+        asyncio.run(run())
@@ -0,0 +1,133 @@
+"""
+Warm-up: checkpoint resume, backoff retry queue and the node-wide lock (offline, synthetic provider)
+"""
+import json
+import math
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import warmup  # noqa: E402
+from providers import SyntheticProvider  # noqa: E402
+from warmup import Checkpoint, _try_lock, build_store, checkpoint_path, main, progress_eta, warm_up  # noqa: E402
+
+
+class FlakyProvider(SyntheticProvider):
+    """Synthetic bars; a symbol in `failing` ({symbol: n}) is left out of its first n downloads"""
+
+    def __init__(self, failing=None, **kwargs):
+        super().__init__(**kwargs)
+        self.failing = dict(failing or {})
+        self.batches = []
+
+    def download(self, symbols, start, end=None, interval="1d"):
+        self.batches.append(list(symbols))
+        frames = super().download(symbols, start, end, interval)
+        for symbol in symbols:
+            if self.failing.get(symbol, 0) > 0:
+                self.failing[symbol] -= 1
+                frames.pop(symbol, None)
+        return frames
+
+
+def _requested(provider):
+    return sorted(s for batch in provider.batches for s in batch)
+
+
+class TestCheckpoint:
+
+    def test_interrupted_run_resumes_where_it_stopped(self, tmp_path):
+        provider = FlakyProvider(n_symbols=12)
+        symbols = provider.universe()
+        path = tmp_path / "warmup-1d.json"
+        checkpoint = Checkpoint(path, "1d")
+        checkpoint.mark_done(symbols[:5])
+        checkpoint.save()
+
+        summary = warm_up(build_store("1d", tmp_path / "cache", provider=provider), symbols,
+                          batch_size=4, checkpoint_path=path)
+        assert _requested(provider) == sorted(symbols[5:])
+        assert summary["done"] == summary["symbols"] == 12 and not summary["failed"]
+        saved = json.loads(path.read_text())
+        assert saved["completed_at"] and sorted(saved["done"]) == sorted(symbols)
+
+    def test_completed_or_other_interval_checkpoints_start_over(self, tmp_path):
+        path = tmp_path / "warmup.json"
+        finished = Checkpoint(path, "1d")
+        finished.mark_done(["GARAN"])
+        finished.save(completed=True)
+        assert Checkpoint(path, "1d").done == set()
+
+        unfinished = Checkpoint(path, "1d")
+        unfinished.mark_done(["GARAN"])
+        unfinished.save()
+        assert Checkpoint(path, "1h").done == set() and Checkpoint(path, "1d", resume=False).done == set()
+        assert Checkpoint(path, "1d").done == {"GARAN"}
+
+
+    def test_eta_only_counts_this_runs_progress(self, tmp_path, monkeypatch):
+        assert progress_eta(10.0, 2, 8) == 40.0 and math.isnan(progress_eta(10.0, 0, 8))
+        provider = FlakyProvider(n_symbols=12)
+        symbols = provider.universe()
+        checkpoint = Checkpoint(tmp_path / "warmup.json", "1d")
+        checkpoint.mark_done(symbols[:8])
+        checkpoint.save()
+        calls = []
+        monkeypatch.setattr(warmup, "progress_eta", lambda elapsed, completed, remaining: calls.append(
+            (completed, remaining)) or 0.0)
+        warm_up(build_store("1d", tmp_path / "cache", provider=provider), symbols,
+                batch_size=2, checkpoint_path=tmp_path / "warmup.json")
+        # The 8 restored symbols are not progress of this run
+        assert calls == [(2, 2), (4, 0)]
+
+    def test_each_interval_gets_its_own_checkpoint(self, tmp_path, monkeypatch):
+        assert checkpoint_path(None, tmp_path, "1h", ["1d", "1h"]) == tmp_path / "warmup-1h.json"
+        assert checkpoint_path(tmp_path / "cp.json", tmp_path, "1d", ["1d"]) == tmp_path / "cp.json"
+        monkeypatch.setenv("MARKET_DATA_PROVIDER", "synthetic")
+        monkeypatch.setenv("SYNTHETIC_SYMBOLS", "3")
+        assert main(["--symbols", "GARAN,AKBNK", "--cache-dir", str(tmp_path / "cache"),
+                     "--checkpoint", str(tmp_path / "cp.json"), "--no-shared", "--no-panel"]) == 0
+        for interval in ("1d", "1h"):
+            saved = json.loads((tmp_path / f"cp-{interval}.json").read_text())
+            assert saved["interval"] == interval and sorted(saved["done"]) == ["AKBNK", "GARAN"]
+        assert not (tmp_path / "cp.json").exists()
+
+
+class TestRetryQueue:
+
+    def test_failed_symbols_are_retried_in_smaller_batches(self, tmp_path):
+        provider = FlakyProvider(n_symbols=8)
+        symbols = provider.universe()
+        provider.failing = {symbols[0]: 1, symbols[1]: 1, symbols[2]: 2, symbols[3]: 1}
+        summary = warm_up(build_store("1d", tmp_path, provider=provider), symbols,
+                          batch_size=8, base_delay=0)
+        assert summary["done"] == 8 and not summary["failed"]
+        # One full batch, the four failures split in two, then the one still failing alone
+        assert provider.batches == [symbols, symbols[:2], symbols[2:4], [symbols[2]]]
+
+    def test_symbols_failing_every_attempt_are_reported(self, tmp_path):
+        provider = FlakyProvider(n_symbols=4)
+        symbols = provider.universe()
+        provider.failing = {symbols[3]: 100}
+        store = build_store("1d", tmp_path, provider=provider)
+        summary = warm_up(store, symbols, batch_size=4, max_retries=2, base_delay=0,
+                          checkpoint_path=tmp_path / "warmup.json")
+        assert summary["failed"] == [symbols[3]] and summary["done"] == 3
+        assert sum(symbols[3] in batch for batch in provider.batches) == 3
+        assert store.is_cached(symbols[3]) and store.get(symbols[3]).empty
+
+
+class TestLock:
+
+    def test_only_one_holder_at_a_time(self, tmp_path):
+        lock = _try_lock(tmp_path / "cache")
+        assert lock is not None and _try_lock(tmp_path / "cache") is None
+        # A different lock name is independent
+        other = _try_lock(tmp_path / "cache", ".publisher.lock")
+        assert other is not None
+        other.close()
+        lock.close()
+        again = _try_lock(tmp_path / "cache")
+        assert again is not None
+        again.close()
@@ -0,0 +1,126 @@
+"""
+Yahoo chart client tests against a local stub server serving recorded fixtures (offline)
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from yahoo_chart import YahooChartClient, YahooChartError  # noqa: E402
+
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+class _ChartStub(BaseHTTPRequestHandler):
+    """
+    Serves fixtures/yahoo_chart_<ticker>.json; FLAKY.IS fails twice with 503 first,
+    LIMITED.IS once with 429 and a huge Retry-After, GONE.IS is a 404 HTML page
+    """
+    failures = {}
+
+    def do_GET(self):
+        ticker = urlsplit(self.path).path.rsplit("/", 1)[-1]
+        if ticker == "GONE.IS":
+            self._send(404, None, b"<html>Not Found</html>", "text/html")
+            return
+        if ticker == "LIMITED.IS" and not self.failures.get(ticker):
+            self.failures[ticker] = 1
+            self._send(429, {}, headers={"Retry-After": "3600"})
+            return
+        if ticker == "LIMITED.IS":
+            ticker = "THYAO.IS"
+        if ticker == "FLAKY.IS" and self.failures.get(ticker, 0) < 2:
+            self.failures[ticker] = self.failures.get(ticker, 0) + 1
+            self._send(503, {})
+            return
+        if ticker == "FLAKY.IS":
+            ticker = "THYAO.IS"
+        fixture = FIXTURES / f"yahoo_chart_{ticker}.json"
+        if fixture.exists():
+            self._send(200, json.loads(fixture.read_text()))
+        else:
+            self._send(404, {"chart": {"result": None, "error": {
+                "code": "Not Found", "description": "No data found, symbol may be delisted"}}})
+
+    def _send(self, status, payload, body=None, content_type="application/json", headers=None):
+        body = body if body is not None else json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChartStub)
+    _ChartStub.failures = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def _run(coro_fn, base_url, **kwargs):
+    async def runner():
+        async with YahooChartClient(base_url, backoff=0.01, **kwargs) as client:
+            return await coro_fn(client)
+    return asyncio.run(runner())
+
+
+class TestYahooChartClient:
+
+    def test_get_stock_data_matches_server_format(self, stub_url):
+        df = _run(lambda c: c.get_stock_data("THYAO", "2024-01-01", "2024-01-12"), stub_url)
+        # The last bar has a null close and is dropped
+        assert list(df["Date"]) == ["2024-01-04", "2024-01-05", "2024-01-08", "2024-01-09", "2024-01-10"]
+        assert list(df.columns) == ["Date", "Open", "High", "Low", "Close", "Volume"]
+        # Bars before the dividend are back-adjusted like yfinance's auto_adjust
+        assert df["Close"].iloc[0] == pytest.approx(250.88)
+        assert df["Open"].iloc[0] == pytest.approx(254.0 * 250.88 / 256.0)
+        assert df["Close"].iloc[3] == pytest.approx(258.5)
+
+    def test_retries_transient_errors_and_reports_unknown_tickers(self, stub_url):
+        frames = _run(lambda c: c.history_many(["FLAKY", "THYAO", "NOPE"], "2024-01-01", "2024-01-12"), stub_url)
+        assert sorted(frames) == ["FLAKY", "THYAO"]
+        assert np.allclose(frames["FLAKY"]["Close"], frames["THYAO"]["Close"])
+        with pytest.raises(YahooChartError):
+            _run(lambda c: c.history("NOPE", "2024-01-01", "2024-01-12"), stub_url)
+        _ChartStub.failures = {}
+        with pytest.raises(YahooChartError):
+            _run(lambda c: c.history("FLAKY", "2024-01-01", "2024-01-12"), stub_url, max_retries=0)
+
+    def test_retry_after_is_capped_and_non_json_404_is_an_error(self, stub_url):
+        started = time.monotonic()
+        df = _run(lambda c: c.history("LIMITED", "2024-01-01", "2024-01-12"), stub_url, max_backoff=0.05)
+        assert len(df) == 5 and time.monotonic() - started < 5
+        with pytest.raises(YahooChartError, match="404"):
+            _run(lambda c: c.history("GONE", "2024-01-01", "2024-01-12"), stub_url)
+        frames = _run(lambda c: c.history_many(["GONE", "THYAO"], "2024-01-01", "2024-01-12"), stub_url)
+        assert list(frames) == ["THYAO"]
+
+    def test_retry_delay_bounds(self):
+        async def delays():
+            async with YahooChartClient(backoff=1.0, max_backoff=4.0) as client:
+                limited = httpx.Response(429, headers={"Retry-After": "120"})
+                soon = httpx.Response(503, headers={"Retry-After": "2"})
+                jitter = [client._retry_delay(attempt) for attempt in range(10) for _ in range(20)]
+                return client._retry_delay(0, limited), client._retry_delay(0, soon), jitter
+        limited, soon, jitter = asyncio.run(delays())
+        assert limited == 4.0 and soon == 2.0 and max(jitter) <= 4.0 and min(jitter) >= 0